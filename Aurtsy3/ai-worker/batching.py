@@ -0,0 +1,74 @@
+"""
+Dynamic batching for concurrent inference requests.
+
+Requests queue their decoded image and await a future. A single loop takes
+whatever has queued up (up to max_batch_size, waiting at most max_wait_ms
+for more) and runs it as one model call on a dedicated inference thread.
+While one batch runs, the next one fills up, so batches grow with load and
+a lone request only pays max_wait_ms.
+"""
+from typing import Any, Callable, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+
+class DynamicBatcher:
+    def __init__(self, infer: Callable[[List[Any]], List[Any]], max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        self.infer = infer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # One inference at a time; the model already uses every core
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.stats = {"images": 0, "batches": 0, "inference_seconds": 0.0}
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requests whose caller gave up are dropped before inference
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self._executor, self.infer, [item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.stats["inference_seconds"] += time.perf_counter() - start
+
+            self.stats["images"] += len(batch)
+            self.stats["batches"] += 1
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
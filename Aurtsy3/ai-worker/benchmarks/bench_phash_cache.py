@@ -0,0 +1,203 @@
+"""
+Perceptual-hash cache: hash cost, robustness to recompression, lookup
+speed of multi-index hashing against a linear Hamming scan, and PRE/POST
+meal photos: how far a partly eaten plate hashes from its pre-meal photo,
+that it is never served the pre-meal detections, and that it pairs with the
+right pre-meal photo.
+
+    python benchmarks/bench_phash_cache.py --entries 100000
+    MODEL_PATH=yolov8n.onnx python benchmarks/bench_phash_cache.py --model   # also time hit vs inference
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from detector import decode_image
+from phash_cache import AnalysisCache, MultiIndexHash, DUPLICATE_DISTANCE, hamming, phash
+
+
+def synthetic_plate(seed: int, size=(1280, 960)) -> Image.Image:
+    rng = random.Random(seed)
+    image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        r = rng.randrange(40, 300)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+    return image
+
+
+def synthetic_meal(seed: int, eaten: float = 0.0, size=(1280, 960), items: int = 10) -> Image.Image:
+    """A plate of food blobs on a table; `eaten` is the share of blobs gone, the same ones for a seed."""
+    rng = random.Random(seed)
+    image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    cx, cy, plate = size[0] // 2, size[1] // 2, min(size) * 0.45
+    draw.ellipse((cx - plate, cy - plate, cx + plate, cy + plate), fill=(235, 235, 230))
+    blobs = []
+    for _ in range(items):
+        x, y = cx + rng.uniform(-0.6, 0.6) * plate, cy + rng.uniform(-0.6, 0.6) * plate
+        r = rng.uniform(0.12, 0.3) * plate
+        blobs.append(((x - r, y - r, x + r, y + r), tuple(rng.randrange(256) for _ in range(3))))
+    gone = set(random.Random(seed + 1_000_000).sample(range(items), round(eaten * items)))
+    for i, (box, color) in enumerate(blobs):
+        if i not in gone:
+            draw.ellipse(box, fill=color)
+    return image
+
+
+def jpeg(image: Image.Image, quality: int, scale: float = 1.0) -> bytes:
+    if scale != 1.0:
+        image = image.resize((int(image.width * scale), int(image.height * scale)), Image.BILINEAR)
+    buf = BytesIO()
+    image.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def bench_robustness(count: int):
+    same, different = [], []
+    hashes = []
+    for seed in range(count):
+        plate = synthetic_plate(seed)
+        original = phash(decode_image(jpeg(plate, 92)))
+        copy = phash(decode_image(jpeg(plate, 60, scale=0.5)))
+        same.append(hamming(original, copy))
+        hashes.append(original)
+    for a, b in zip(hashes, hashes[1:]):
+        different.append(hamming(a, b))
+    print(f"Re-upload (q92 vs q60 at half size): mean {np.mean(same):.1f} bits, max {max(same)}")
+    print(f"Different plates:                    mean {np.mean(different):.1f} bits, min {min(different)}")
+    print(f"Duplicate threshold {DUPLICATE_DISTANCE} bits: "
+          f"{sum(d <= DUPLICATE_DISTANCE for d in same)}/{len(same)} re-uploads hit, "
+          f"{sum(d <= DUPLICATE_DISTANCE for d in different)}/{len(different)} false hits")
+
+
+def bench_pre_post(children: int):
+    """
+    Each child has a breakfast and a lunch plate: logged one meal at a time
+    (PRE, POST, PRE, POST), or with both pre-meal plates open before either
+    post-meal photo. Post-meal plates are partly or mostly eaten.
+    """
+    print(f"PRE/POST meal photos, {children} children with two meals each:")
+    for order in ("one meal at a time", "both plates open"):
+        for label, low, high in (("10-30% eaten", 0.1, 0.3), ("60-90% eaten", 0.6, 0.9)):
+            rng = random.Random(7)
+            cache = AnalysisCache()
+            distances, near, reused, paired = [], 0, 0, 0
+
+            def post_meal(child_id: str, plate: int, pre: int):
+                nonlocal near, reused, paired
+                post = phash(decode_image(jpeg(synthetic_meal(plate, rng.uniform(low, high)), 85)))
+                distances.append(hamming(pre, post))
+                near += distances[-1] <= DUPLICATE_DISTANCE
+                hit = cache.lookup(post, "POST_MEAL")
+                reused += hit is not None and hit.meal_type == "PRE_MEAL"
+                partner = cache.match_pair(cache.add(post, [], plate + 1_000_000, child_id, "POST_MEAL"))
+                paired += partner is not None and partner.meal_id == plate
+
+            for child in range(children):
+                child_id = f"child-{child}"
+                plates = [2 * child, 2 * child + 1]
+                pre_hashes = {}
+                for plate in plates:
+                    pre_hashes[plate] = phash(decode_image(jpeg(synthetic_meal(plate), 90)))
+                    cache.add(pre_hashes[plate], [], plate, child_id, "PRE_MEAL")
+                    if order == "one meal at a time":
+                        post_meal(child_id, plate, pre_hashes[plate])
+                if order == "both plates open":
+                    for plate in plates:
+                        post_meal(child_id, plate, pre_hashes[plate])
+            print(f"  {order}, {label}: {np.mean(distances):4.1f} bits from the pre-meal photo "
+                  f"(min {min(distances)}, max {max(distances)}), {near} within the duplicate threshold, "
+                  f"{reused} served pre-meal detections, {paired}/{len(distances)} paired with the right plate")
+
+
+def bench_hash_cost(count: int):
+    images = [decode_image(jpeg(synthetic_plate(seed), 90)) for seed in range(count)]
+    start = time.perf_counter()
+    for image in images:
+        phash(image)
+    print(f"phash of a decoded {images[0].shape[1]}x{images[0].shape[0]} image: "
+          f"{(time.perf_counter() - start) / count * 1000:.2f}ms")
+
+
+def flip_bits(value: int, bits: int, rng: random.Random) -> int:
+    for position in rng.sample(range(64), bits):
+        value ^= 1 << position
+    return value
+
+
+def bench_lookup(entries: int, queries: int):
+    rng = random.Random(1)
+    values = [rng.getrandbits(64) for _ in range(entries)]
+    index = MultiIndexHash(DUPLICATE_DISTANCE)
+    start = time.perf_counter()
+    for key, value in enumerate(values):
+        index.add(key, value)
+    build = time.perf_counter() - start
+
+    probes = [flip_bits(rng.choice(values), rng.randrange(DUPLICATE_DISTANCE + 1), rng) for _ in range(queries // 2)]
+    probes += [rng.getrandbits(64) for _ in range(queries - len(probes))]
+
+    start = time.perf_counter()
+    mih_results = [index.search(p) for p in probes]
+    mih = time.perf_counter() - start
+
+    linear_probes = probes[:max(queries // 20, 10)]
+    start = time.perf_counter()
+    linear_results = [
+        sorted((hamming(p, v), k) for k, v in enumerate(values) if hamming(p, v) <= DUPLICATE_DISTANCE)
+        for p in linear_probes
+    ]
+    linear = (time.perf_counter() - start) / len(linear_probes)
+    assert linear_results == mih_results[:len(linear_probes)], "MIH must return exactly the linear-scan matches"
+
+    print(f"{entries} hashes (build {build:.2f}s), radius {DUPLICATE_DISTANCE}:")
+    print(f"  multi-index lookup {mih / queries * 1e6:8.1f}us")
+    print(f"  linear scan        {linear * 1e6:8.1f}us  ({linear / (mih / queries):.0f}x slower)")
+
+
+def bench_hit_vs_inference(model_path: str, count: int):
+    from detector import Detector
+    detector = Detector(model_path)
+    detector.load()
+    detector.warmup()
+    cache = AnalysisCache()
+    images = [decode_image(jpeg(synthetic_plate(seed), 90)) for seed in range(count)]
+    start = time.perf_counter()
+    for image in images:
+        cache.add(phash(image), detector.predict([image])[0])
+    miss = (time.perf_counter() - start) / count
+    start = time.perf_counter()
+    for image in images:
+        assert cache.lookup(phash(image)) is not None
+    hit = (time.perf_counter() - start) / count
+    print(f"Per image: inference {miss * 1000:.1f}ms, cache hit (hash + lookup) {hit * 1000:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--model", action="store_true", help="Also compare cache hits with inference")
+    args = parser.parse_args()
+
+    bench_hash_cost(args.images)
+    bench_robustness(args.images)
+    bench_pre_post(args.images)
+    bench_lookup(args.entries, args.queries)
+    if args.model:
+        bench_hit_vs_inference(os.getenv("MODEL_PATH", "yolov8n.onnx"), args.images)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Inference throughput in images/sec.
+
+1. Raw model throughput at several batch sizes (decode excluded).
+2. Concurrent requests: one model call per request (the old behaviour, minus
+   the per-request model load) against the dynamic batcher.
+3. The old per-request `YOLO("yolov8n.pt")` load, when ultralytics is installed.
+
+    MODEL_PATH=yolov8n.onnx python benchmarks/bench_throughput.py --images 256 --concurrency 32
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from batching import DynamicBatcher
+from detector import Detector, decode_image
+
+
+def synthetic_jpeg(seed: int, size=(1280, 960)) -> bytes:
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 255, (size[1] // 8, size[0] // 8, 3), dtype=np.uint8)
+    buf = BytesIO()
+    Image.fromarray(pixels).resize(size, Image.BILINEAR).save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+def bench_batch_sizes(detector: Detector, images, batch_sizes):
+    print("Model throughput (preprocess + inference + postprocess):")
+    for batch_size in batch_sizes:
+        detector.predict(images[:batch_size])
+        start = time.perf_counter()
+        for i in range(0, len(images), batch_size):
+            detector.predict(images[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+        print(f"  batch={batch_size:<3} {len(images) / elapsed:7.1f} images/sec")
+
+
+async def bench_concurrent(detector: Detector, payloads, concurrency: int, max_batch_size: int, max_wait_ms: float):
+    loop = asyncio.get_running_loop()
+
+    async def unbatched(payload):
+        image = await loop.run_in_executor(None, decode_image, payload)
+        return await loop.run_in_executor(None, detector.predict, [image])
+
+    batcher = DynamicBatcher(detector.predict, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    batcher.start()
+
+    async def batched(payload):
+        image = await loop.run_in_executor(None, decode_image, payload)
+        return await batcher.submit(image)
+
+    print(f"Concurrent requests (decode + inference, concurrency={concurrency}):")
+    for name, handler in (("per-request", unbatched), ("dynamic batch", batched)):
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one(payload):
+            async with semaphore:
+                start = time.perf_counter()
+                await handler(payload)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(p) for p in payloads))
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+        print(f"  {name:<14} {len(payloads) / elapsed:7.1f} images/sec  p50 {p50:6.0f}ms  p99 {p99:6.0f}ms")
+
+    stats = batcher.stats
+    print(f"  avg batch size {stats['images'] / max(stats['batches'], 1):.1f}")
+    await batcher.stop()
+
+
+def bench_model_per_request(requests: int):
+    try:
+        from ultralytics import YOLO
+    except ImportError:
+        print("Per-request model load: ultralytics not installed, skipped")
+        return
+    start = time.perf_counter()
+    for _ in range(requests):
+        YOLO("yolov8n.pt")
+    elapsed = time.perf_counter() - start
+    print(f"Per-request model load (old handler): {elapsed / requests * 1000:.0f}ms per request before inference")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=os.getenv("MODEL_PATH", "yolov8n.onnx"))
+    parser.add_argument("--backend", default=os.getenv("INFERENCE_BACKEND", "onnxruntime"))
+    parser.add_argument("--images", type=int, default=128)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    detector = Detector(args.model, backend=args.backend)
+    start = time.perf_counter()
+    detector.load()
+    detector.warmup(args.max_batch)
+    print(f"Model load + warmup: {time.perf_counter() - start:.2f}s ({args.backend}, {detector.threads} threads)")
+
+    payloads = [synthetic_jpeg(i) for i in range(args.images)]
+    start = time.perf_counter()
+    images = [decode_image(p) for p in payloads]
+    print(f"Decode 1280x960 JPEG: {(time.perf_counter() - start) / len(payloads) * 1000:.1f}ms per image")
+
+    bench_batch_sizes(detector, images, [1, 4, 8, 16])
+    asyncio.run(bench_concurrent(detector, payloads, args.concurrency, args.max_batch, args.max_wait_ms))
+    bench_model_per_request(3)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+YOLOv8 food detector for CPU inference.
+
+The model is an ONNX export of yolov8n (`yolo export model=yolov8n.pt format=onnx dynamic=True`),
+run with onnxruntime or OpenVINO. It is loaded once and reused for every request;
+pre- and post-processing are plain numpy so a batch of images is one model call.
+"""
+from typing import List, Optional, Tuple, Union
+from io import BytesIO
+import os
+
+import numpy as np
+from PIL import Image, ImageOps
+
+COCO_NAMES = [
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat", "traffic light",
+    "fire hydrant", "stop sign", "parking meter", "bench", "bird", "cat", "dog", "horse", "sheep", "cow",
+    "elephant", "bear", "zebra", "giraffe", "backpack", "umbrella", "handbag", "tie", "suitcase", "frisbee",
+    "skis", "snowboard", "sports ball", "kite", "baseball bat", "baseball glove", "skateboard", "surfboard",
+    "tennis racket", "bottle", "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple",
+    "sandwich", "orange", "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair", "couch",
+    "potted plant", "bed", "dining table", "toilet", "tv", "laptop", "mouse", "remote", "keyboard",
+    "cell phone", "microwave", "oven", "toaster", "sink", "refrigerator", "book", "clock", "vase",
+    "scissors", "teddy bear", "hair drier", "toothbrush",
+]
+
+# Typical calories per detected serving (USDA reference portions); a rough estimate only
+CALORIES_PER_ITEM = {
+    "banana": 105, "apple": 95, "sandwich": 350, "orange": 62, "broccoli": 30,
+    "carrot": 25, "hot dog": 290, "pizza": 285, "donut": 250, "cake": 350,
+}
+FOOD_CLASSES = set(CALORIES_PER_ITEM)
+TABLEWARE_CLASSES = {"bottle", "wine glass", "cup", "fork", "knife", "spoon", "bowl"}
+
+PAD_VALUE = 114  # Letterbox grey used in YOLOv8 training
+
+ImageSource = Union[str, bytes]
+
+def decode_image(source: ImageSource, max_side: int = 640) -> np.ndarray:
+    """
+    Decode a local path or raw bytes to an RGB uint8 array.
+    JPEGs are decoded straight at reduced scale (libjpeg DCT scaling), which is
+    much cheaper than decoding a 12MP phone photo and resizing it.
+    """
+    image = Image.open(BytesIO(source) if isinstance(source, bytes) else source)
+    image.draft("RGB", (max_side, max_side))
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    return np.asarray(image)
+
+def letterbox(image: np.ndarray, size: int) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """Resize keeping aspect ratio and pad to size x size. Returns (image, scale, (pad_x, pad_y))."""
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    if (new_w, new_h) != (w, h):
+        image = np.asarray(Image.fromarray(image).resize((new_w, new_h), Image.BILINEAR))
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    canvas = np.full((size, size, 3), PAD_VALUE, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = image
+    return canvas, scale, (pad_x, pad_y)
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> List[int]:
+    """Greedy non-maximum suppression on xyxy boxes."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(int(i))
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-9)
+        order = order[1:][iou <= iou_threshold]
+    return keep
+
+class Detector:
+    def __init__(
+        self,
+        model_path: str,
+        backend: str = "onnxruntime",
+        input_size: int = 640,
+        conf_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+        max_detections: int = 100,
+        threads: Optional[int] = None
+    ):
+        self.model_path = model_path
+        self.backend = backend
+        self.input_size = input_size
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+        self.threads = threads or os.cpu_count()
+        self._run = None
+        self.fixed_batch: Optional[int] = None
+
+    def load(self):
+        """Load (and if needed export) the model once; call at startup."""
+        if not os.path.exists(self.model_path):
+            self._export()
+
+        if self.backend == "openvino":
+            import openvino as ov
+            core = ov.Core()
+            model = core.read_model(self.model_path)
+            compiled = core.compile_model(model, "CPU", {
+                "PERFORMANCE_HINT": "THROUGHPUT",
+                "INFERENCE_NUM_THREADS": self.threads
+            })
+            batch_dim = model.inputs[0].get_partial_shape()[0]
+            self.fixed_batch = batch_dim.get_length() if batch_dim.is_static else None
+            output = compiled.outputs[0]
+            self._run = lambda batch: compiled(batch)[output]
+        else:
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.intra_op_num_threads = self.threads
+            session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+            model_input = session.get_inputs()[0]
+            batch_dim = model_input.shape[0]
+            self.fixed_batch = batch_dim if isinstance(batch_dim, int) else None
+            self._run = lambda batch: session.run(None, {model_input.name: batch})[0]
+
+    def warmup(self, batch_size: int = 1):
+        """Run a dummy batch so the first real request doesn't pay for allocation and kernel selection."""
+        self.predict([np.zeros((self.input_size, self.input_size, 3), dtype=np.uint8)] * batch_size)
+
+    def predict(self, images: List[np.ndarray]) -> List[List[dict]]:
+        """Detections per image: [{"label", "confidence", "box": [x1, y1, x2, y2]}] in image pixels."""
+        if not images:
+            return []
+        prepared = [letterbox(image, self.input_size) for image in images]
+        batch = np.stack([p[0] for p in prepared]).transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+
+        if self.fixed_batch:
+            # Static-shape export: run in model-sized slices
+            outputs = np.concatenate([
+                self._run(np.ascontiguousarray(batch[i:i + self.fixed_batch]))
+                for i in range(0, len(batch), self.fixed_batch)
+            ])
+        else:
+            outputs = self._run(np.ascontiguousarray(batch))
+
+        return [
+            self._postprocess(output, scale, pad, image.shape[:2])
+            for output, (_, scale, pad), image in zip(outputs, prepared, images)
+        ]
+
+    def _postprocess(self, output: np.ndarray, scale: float, pad: Tuple[int, int], shape: Tuple[int, int]) -> List[dict]:
+        # YOLOv8 output is (4 + classes, anchors): cx, cy, w, h, then class scores
+        predictions = output.T
+        class_scores = predictions[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        confidences = class_scores[np.arange(len(class_ids)), class_ids]
+        mask = confidences >= self.conf_threshold
+        if not mask.any():
+            return []
+
+        cx, cy, w, h = predictions[mask, :4].T
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        class_ids, confidences = class_ids[mask], confidences[mask]
+
+        # Class-aware NMS in one pass: offset each class into its own coordinate range
+        keep = nms(boxes + class_ids[:, None] * (self.input_size * 2), confidences, self.iou_threshold)
+        keep = keep[:self.max_detections]
+
+        height, width = shape
+        boxes = boxes[keep]
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad[0]) / scale).clip(0, width)
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad[1]) / scale).clip(0, height)
+        return [
+            {
+                "label": COCO_NAMES[int(class_ids[i])],
+                "confidence": round(float(confidences[i]), 3),
+                "box": [round(float(v), 1) for v in box]
+            }
+            for i, box in zip(keep, boxes)
+        ]
+
+    def _export(self):
+        """Export yolov8n.pt to ONNX next to model_path (needs ultralytics, one time)."""
+        try:
+            from ultralytics import YOLO
+        except ImportError:
+            raise RuntimeError(
+                f"Model {self.model_path} not found. Export it once with: "
+                "yolo export model=yolov8n.pt format=onnx dynamic=True"
+            )
+        weights = os.path.splitext(self.model_path)[0] + ".pt"
+        exported = YOLO(weights).export(format="onnx", dynamic=True, imgsz=self.input_size)
+        if os.path.abspath(exported) != os.path.abspath(self.model_path):
+            os.replace(exported, self.model_path)
+
+def summarize_meal(detections: List[dict], image_shape: Tuple[int, int]) -> dict:
+    """Meal analysis stored in Meal.analysis_json."""
+    foods = [d for d in detections if d["label"] in FOOD_CLASSES]
+    height, width = image_shape
+    food_area = sum((d["box"][2] - d["box"][0]) * (d["box"][3] - d["box"][1]) for d in foods)
+    return {
+        "items_detected": sorted({d["label"] for d in foods}),
+        "item_counts": {label: sum(1 for d in foods if d["label"] == label) for label in {d["label"] for d in foods}},
+        "calories_estimated": sum(CALORIES_PER_ITEM[d["label"]] for d in foods),
+        "tableware_detected": sorted({d["label"] for d in detections if d["label"] in TABLEWARE_CLASSES}),
+        # Share of the frame covered by food boxes; comparable across photo sizes
+        "food_coverage": round(min(food_area / float(width * height), 1.0), 4) if width and height else 0.0,
+        "detections": detections,
+        "consumption_percentage": None
+    }
+
+def consumption_percentage(pre: dict, post: dict) -> Optional[float]:
+    """How much of the pre-meal plate is gone in the post-meal photo, from food coverage."""
+    before = pre.get("food_coverage") or 0.0
+    if before <= 0:
+        return None
+    after = post.get("food_coverage") or 0.0
+    return round(max(0.0, min(1.0, 1 - after / before)) * 100, 1)
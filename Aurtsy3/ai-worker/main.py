@@ -1,70 +1,153 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
-import random
+import os
 
-app = FastAPI(title="Aurtsy AI Worker", version="0.1.0")
+from detector import Detector, ImageSource, decode_image, summarize_meal, consumption_percentage
+from batching import DynamicBatcher
+from results import MealResultWriter
+from phash_cache import AnalysisCache, MEAL_PAIRS, phash
+
+MODEL_PATH = os.getenv("MODEL_PATH", "yolov8n.onnx")
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "onnxruntime")  # onnxruntime, openvino
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "8"))
+MAX_BATCH_WAIT_MS = float(os.getenv("MAX_BATCH_WAIT_MS", "10"))
+# Photos are stored on the shared volume; /media/... URLs resolve under MEDIA_ROOT
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", "/data/media")
+DATABASE_URL = os.getenv("DATABASE_URL")
+REDIS_URL = os.getenv("REDIS_URL")  # Bumps the backend's per-child versions after result writes
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "20000"))
+
+app = FastAPI(title="Aurtsy AI Worker", version="0.2.0")
+
+detector = Detector(MODEL_PATH, backend=INFERENCE_BACKEND)
+batcher = DynamicBatcher(detector.predict, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS)
+result_writer = MealResultWriter(DATABASE_URL, REDIS_URL)
+analysis_cache = AnalysisCache(capacity=ANALYSIS_CACHE_SIZE)
 
 class AnalysisRequest(BaseModel):
     image_url: str
     analysis_type: str # "MEAL", "BEHAVIOR"
+    meal_id: Optional[int] = None # Write the result back to meals.analysis_json
+    meal_type: Optional[str] = None # PRE_MEAL/POST_MEAL photos are paired for consumption
+    child_id: Optional[str] = None
 
 class AnalysisResult(BaseModel):
     status: str
     data: dict
 
+@app.on_event("startup")
+async def load_model():
+    # Load once and keep warm: the first request must not pay for model load or graph optimization
+    await run_in_threadpool(detector.load)
+    await run_in_threadpool(detector.warmup, MAX_BATCH_SIZE)
+    batcher.start()
+    result_writer.start()
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    await batcher.stop()
+
 @app.get("/")
 def root():
     return {"message": "Aurtsy AI Worker Ready"}
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "model": os.path.basename(MODEL_PATH), "backend": INFERENCE_BACKEND}
+
+@app.get("/stats")
+def inference_stats():
+    stats = dict(batcher.stats)
+    stats["avg_batch_size"] = round(stats["images"] / stats["batches"], 2) if stats["batches"] else 0
+    stats["cache"] = dict(analysis_cache.stats, size=len(analysis_cache))
+    return stats
+
+def resolve_image_path(image_url: str) -> str:
+    """Map a /media/... URL to its file under MEDIA_ROOT; anything else is rejected."""
+    if not image_url.startswith("/media/"):
+        raise ValueError("Pass a /media/... photo URL or upload the bytes")
+    root = os.path.realpath(MEDIA_ROOT)
+    # realpath resolves ".." and symlinks, so the check sees where the file really is
+    path = os.path.realpath(os.path.join(root, image_url[len("/media/"):]))
+    if path == root or os.path.commonpath([root, path]) != root:
+        raise ValueError("Photo URL is outside the media volume")
+    return path
+
+def decode_and_hash(source: ImageSource):
+    image = decode_image(source)
+    return image, phash(image)
+
+async def analyze_meal(
+    source: ImageSource,
+    meal_id: Optional[int],
+    meal_type: Optional[str] = None,
+    child_id: Optional[str] = None
+) -> dict:
+    try:
+        image, image_hash = await run_in_threadpool(decode_and_hash, source)
+    except (OSError, ValueError) as e:
+        if meal_id is not None:
+            result_writer.submit(meal_id, "FAILED", {"error": str(e)})
+        raise HTTPException(status_code=422, detail=f"Could not decode image: {e}")
+
+    if meal_id is not None:
+        result_writer.submit(meal_id, "PROCESSING")
+
+    # Re-uploads and near-identical photos reuse earlier detections instead of running the model;
+    # a post-meal photo never reuses its pre-meal plate's (or the reverse)
+    cached = analysis_cache.lookup(image_hash, meal_type)
+    if cached:
+        detections = cached.detections
+    else:
+        try:
+            detections = await batcher.submit(image)
+        except Exception as e:
+            if meal_id is not None:
+                result_writer.submit(meal_id, "FAILED", {"error": str(e)})
+            raise HTTPException(status_code=500, detail=f"Inference failed: {e}")
+
+    data = summarize_meal(detections, image.shape[:2])
+    data["perceptual_hash"] = f"{image_hash:016x}"
+    data["cache_hit"] = cached is not None
+
+    if not cached or meal_type in MEAL_PAIRS:
+        entry = analysis_cache.add(image_hash, detections, meal_id, child_id, meal_type, data)
+        pair_meal_photos(entry)
+        data = entry.data
+
+    if meal_id is not None:
+        result_writer.submit(meal_id, "COMPLETED", data)
+    return {"status": "COMPLETED", "data": data}
+
+def pair_meal_photos(entry):
+    """Fill consumption_percentage on the POST_MEAL side of a matched PRE/POST pair."""
+    partner = analysis_cache.match_pair(entry)
+    if not partner:
+        return
+    pre, post = (partner, entry) if entry.meal_type == "POST_MEAL" else (entry, partner)
+    if post.data.get("consumption_percentage") is not None:
+        return
+    # Replace rather than mutate: the earlier dict may still be queued in the result writer
+    post.data = dict(
+        post.data,
+        consumption_percentage=consumption_percentage(pre.data, post.data),
+        paired_meal_id=pre.meal_id
+    )
+    # The post-meal photo was analyzed first: rewrite its stored result
+    if post is partner and post.meal_id is not None:
+        result_writer.submit(post.meal_id, "COMPLETED", post.data)
 
 @app.post("/analyze/", response_model=AnalysisResult)
-def analyze_image(request: AnalysisRequest):
+async def analyze_image(request: AnalysisRequest):
     if request.analysis_type == "MEAL":
         try:
-            # Try to load YOLO model (requires ultralytics installed)
-            from ultralytics import YOLO
-            import cv2
-            import numpy as np
-            import requests
-            
-            # Load model (will download on first run)
-            model = YOLO("yolov8n.pt") 
-            
-            # Download image from URL (in production, this would be a local path from NAS)
-            # For now, we assume it's a reachable URL or local path
-            # img = ... load image logic ...
-            
-            # Mocking the inference for now to avoid crashing if dependencies aren't present
-            # In real deployment on 4090:
-            # results = model(img)
-            # items = [model.names[int(c)] for c in results[0].boxes.cls]
-            
-            items = ["sandwich", "apple"] # Placeholder until image loading is implemented
-            
-            return {
-                "status": "COMPLETED",
-                "data": {
-                    "calories_estimated": 450, # Placeholder
-                    "items_detected": items,
-                    "consumption_percentage": 100 if "post" in request.image_url else 0
-                }
-            }
-        except ImportError:
-            # Fallback if ultralytics is not installed
-            print("Ultralytics not found, using stub")
-            return {
-                "status": "COMPLETED",
-                "data": {
-                    "calories_estimated": random.randint(200, 800),
-                    "items_detected": ["stub_food_item"],
-                    "consumption_percentage": 50
-                }
-            }
-            
+            path = resolve_image_path(request.image_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return await analyze_meal(path, request.meal_id, request.meal_type, request.child_id)
+
     elif request.analysis_type == "BEHAVIOR":
         return {
             "status": "COMPLETED",
@@ -73,5 +156,15 @@ def analyze_image(request: AnalysisRequest):
                 "confidence": 0.95
             }
         }
-    
+
     raise HTTPException(status_code=400, detail="Unknown analysis type")
+
+@app.post("/analyze/upload", response_model=AnalysisResult)
+async def analyze_upload(
+    file: UploadFile = File(...),
+    meal_id: Optional[int] = Form(None),
+    meal_type: Optional[str] = Form(None),
+    child_id: Optional[str] = Form(None)
+):
+    """Analyze raw image bytes (multipart upload) without going through the media volume."""
+    return await analyze_meal(await file.read(), meal_id, meal_type, child_id)
@@ -0,0 +1,184 @@
+"""
+Perceptual-hash cache of detection results.
+
+Each decoded image gets a 64-bit DCT perceptual hash. Re-uploads and
+recompressed copies land within a few bits of each other, so a cache hit
+(Hamming distance <= DUPLICATE_DISTANCE) returns the earlier detections
+without running the model.
+
+Lookups use multi-index hashing: the 64 bits are split into radius + 1
+substrings, and by pigeonhole any hash within `radius` bits matches at least
+one substring exactly. A search probes one bucket per substring and verifies
+the few candidates, instead of scanning every entry.
+
+A post-meal plate hashes close to its pre-meal photo (a few bits when
+little was eaten), so a lookup never returns an entry of the opposite
+PRE/POST type: its detections describe different food.
+
+The cache also keeps each child's recent PRE_MEAL/POST_MEAL entries so a
+post-meal photo can be paired with its pre-meal plate to compute
+consumption. Candidates are the same child's opposite-type photos inside
+PAIR_WINDOW_SECONDS not already paired with another meal; a mostly eaten plate can hash as far from its pre-meal
+photo as an unrelated one, so distance only picks the nearest candidate.
+"""
+from collections import OrderedDict, defaultdict, deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+import itertools
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+HASH_BITS = 64
+DCT_SIZE = 32
+LOW_FREQ = 8
+
+DUPLICATE_DISTANCE = 4
+PAIR_WINDOW_SECONDS = 4 * 3600
+RECENT_PER_CHILD = 20
+
+MEAL_PAIRS = {"PRE_MEAL": "POST_MEAL", "POST_MEAL": "PRE_MEAL"}
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+
+_DCT = _dct_matrix(DCT_SIZE)
+
+def phash(image: np.ndarray) -> int:
+    """64-bit perceptual hash: sign of the low-frequency DCT terms against their median."""
+    gray = Image.fromarray(image).convert("L").resize((DCT_SIZE, DCT_SIZE), Image.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:LOW_FREQ, :LOW_FREQ].flatten()
+    # The DC term (overall brightness) would dominate the median, so leave it out
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+class MultiIndexHash:
+    """Hamming-radius search over 64-bit hashes with radius + 1 exact-match substring tables."""
+    def __init__(self, radius: int, bits: int = HASH_BITS):
+        self.radius = radius
+        chunks = radius + 1
+        sizes = [bits // chunks + (1 if i < bits % chunks else 0) for i in range(chunks)]
+        self._slices: List[Tuple[int, int]] = []
+        shift = bits
+        for size in sizes:
+            shift -= size
+            self._slices.append((shift, (1 << size) - 1))
+        self._tables: List[Dict[int, Set[int]]] = [defaultdict(set) for _ in self._slices]
+        self._hashes: Dict[int, int] = {}
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def add(self, key: int, value: int):
+        self._hashes[key] = value
+        for table, (shift, mask) in zip(self._tables, self._slices):
+            table[(value >> shift) & mask].add(key)
+
+    def remove(self, key: int):
+        value = self._hashes.pop(key, None)
+        if value is None:
+            return
+        for table, (shift, mask) in zip(self._tables, self._slices):
+            bucket = table[(value >> shift) & mask]
+            bucket.discard(key)
+            if not bucket:
+                del table[(value >> shift) & mask]
+
+    def search(self, value: int, radius: Optional[int] = None) -> List[Tuple[int, int]]:
+        """(distance, key) pairs within radius (at most the index radius), nearest first."""
+        radius = self.radius if radius is None else min(radius, self.radius)
+        candidates: Set[int] = set()
+        for table, (shift, mask) in zip(self._tables, self._slices):
+            candidates |= table.get((value >> shift) & mask, set())
+        matches = []
+        for key in candidates:
+            distance = hamming(value, self._hashes[key])
+            if distance <= radius:
+                matches.append((distance, key))
+        matches.sort()
+        return matches
+
+class CacheEntry:
+    def __init__(self, key: int, phash: int, detections: List[dict], meal_id: Optional[int],
+                 child_id: Optional[str], meal_type: Optional[str], data: Optional[dict]):
+        self.key = key
+        self.phash = phash
+        self.detections = detections
+        self.meal_id = meal_id
+        self.child_id = child_id
+        self.meal_type = meal_type
+        self.data = data  # Analysis as written to meals.analysis_json
+        self.paired_meal_id: Optional[int] = None
+        self.created_at = time.time()
+
+class AnalysisCache:
+    def __init__(self, capacity: int = 20000, duplicate_distance: int = DUPLICATE_DISTANCE):
+        self.capacity = capacity
+        self.duplicate_distance = duplicate_distance
+        self._index = MultiIndexHash(duplicate_distance)
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._recent: Dict[str, Deque[int]] = defaultdict(lambda: deque(maxlen=RECENT_PER_CHILD))
+        self._keys = itertools.count()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "pairs": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, value: int, meal_type: Optional[str] = None) -> Optional[CacheEntry]:
+        """Nearest cached image within duplicate_distance, if any, skipping the opposite PRE/POST type."""
+        opposite = MEAL_PAIRS.get(meal_type)
+        with self._lock:
+            for _, key in self._index.search(value, self.duplicate_distance):
+                entry = self._entries[key]
+                if opposite and entry.meal_type == opposite:
+                    continue
+                self._entries.move_to_end(entry.key)
+                self.stats["hits"] += 1
+                return entry
+            self.stats["misses"] += 1
+            return None
+
+    def add(self, value: int, detections: List[dict], meal_id: Optional[int] = None,
+            child_id: Optional[str] = None, meal_type: Optional[str] = None, data: Optional[dict] = None) -> CacheEntry:
+        with self._lock:
+            entry = CacheEntry(next(self._keys), value, detections, meal_id, child_id, meal_type, data)
+            self._entries[entry.key] = entry
+            self._index.add(entry.key, value)
+            if child_id and meal_type in MEAL_PAIRS:
+                self._recent[child_id].append(entry.key)
+            while len(self._entries) > self.capacity:
+                old_key, _ = self._entries.popitem(last=False)
+                self._index.remove(old_key)
+            return entry
+
+    def match_pair(self, entry: CacheEntry) -> Optional[CacheEntry]:
+        """The same child's unpaired opposite-type (PRE/POST) meal photo within the pairing window, nearest hash first."""
+        wanted = MEAL_PAIRS.get(entry.meal_type)
+        if not wanted or not entry.child_id:
+            return None
+        with self._lock:
+            best = None
+            for key in self._recent.get(entry.child_id, ()):
+                other = self._entries.get(key)
+                if (
+                    other is None or other.meal_type != wanted or other.meal_id == entry.meal_id
+                    or other.paired_meal_id not in (None, entry.meal_id)  # Taken by another photo
+                    or abs(entry.created_at - other.created_at) > PAIR_WINDOW_SECONDS
+                ):
+                    continue
+                distance = hamming(entry.phash, other.phash)
+                if best is None or distance < best[0]:
+                    best = (distance, other)
+            if best:
+                self.stats["pairs"] += 1
+                entry.paired_meal_id, best[1].paired_meal_id = best[1].meal_id, entry.meal_id
+                return best[1]
+            return None
@@ -0,0 +1,96 @@
+"""
+Write meal analysis results back to the backend database (meals.analysis_json,
+meals.analysis_status). Results are buffered and written with one executemany
+UPDATE per flush instead of one transaction per image.
+
+After each flush the children's meal versions are bumped in Redis, as the
+backend does for its own writes (app/core/http_cache.py), so conditional GETs
+of their meal listings see the new analysis.
+"""
+from typing import List, Optional, Tuple
+import json
+import logging
+import queue
+import secrets
+import threading
+import time
+
+import redis
+from sqlalchemy import bindparam, create_engine, text
+
+logger = logging.getLogger(__name__)
+
+FLUSH_BATCH_SIZE = 100
+FLUSH_INTERVAL_SECONDS = 0.2
+
+UPDATE_MEAL = text(
+    "UPDATE meals SET analysis_status = :status, "
+    "analysis_json = COALESCE(CAST(:analysis AS JSON), analysis_json), "
+    "updated_at = now(), change_xid = pg_current_xact_id()::text::bigint WHERE id = :meal_id"
+)
+MEAL_CHILDREN = text("SELECT DISTINCT child_id FROM meals WHERE id IN :meal_ids").bindparams(
+    bindparam("meal_ids", expanding=True)
+)
+VERSIONS_KEY = "child_versions:{}"  # Maintained with the backend (app/core/http_cache.py)
+
+class MealResultWriter:
+    def __init__(self, database_url: Optional[str], redis_url: Optional[str] = None):
+        # Without DATABASE_URL the caller (backend Celery task) writes results itself
+        self.engine = create_engine(database_url, pool_pre_ping=True) if database_url else None
+        self.redis = redis.Redis.from_url(redis_url, decode_responses=True) if redis_url else None
+        self._queue: "queue.Queue[Tuple[int, str, dict]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.engine is not None
+
+    def start(self):
+        if self.enabled:
+            self._thread = threading.Thread(target=self._flush_loop, name="meal-result-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, meal_id: int, status: str, analysis: Optional[dict] = None):
+        if self.enabled:
+            self._queue.put((meal_id, status, analysis))
+
+    def write(self, results: List[Tuple[int, str, Optional[dict]]]):
+        # Keep only the latest transition per meal: PROCESSING then COMPLETED in
+        # one flush is a single row update
+        latest = {meal_id: (status, analysis) for meal_id, status, analysis in results}
+        with self.engine.begin() as conn:
+            conn.execute(UPDATE_MEAL, [
+                {"meal_id": meal_id, "status": status, "analysis": json.dumps(analysis) if analysis is not None else None}
+                for meal_id, (status, analysis) in latest.items()
+            ])
+            child_ids = conn.execute(MEAL_CHILDREN, {"meal_ids": list(latest)}).scalars().all() if self.redis else []
+        if child_ids:
+            self._bump_versions(child_ids)
+
+    def _bump_versions(self, child_ids: List[str]):
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for child_id in child_ids:
+                key = VERSIONS_KEY.format(child_id)
+                pipe.hsetnx(key, "epoch", secrets.token_hex(4))
+                pipe.hincrby(key, "meals", 1)
+            pipe.execute()
+        except Exception:
+            logger.exception(f"Could not bump meal versions for {len(child_ids)} children")
+
+    def _flush_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL_SECONDS
+            while len(batch) < FLUSH_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.write(batch)
+            except Exception:
+                logger.exception(f"Failed to write {len(batch)} meal results")
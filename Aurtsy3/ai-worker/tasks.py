@@ -0,0 +1,82 @@
+"""
+Celery consumer for meal analysis jobs enqueued by the backend
+(app/domains/meals/analysis.py) on the meal_analysis queue.
+
+Each job posts to this host's /analyze/ endpoint, so concurrent jobs share the
+warm model and are merged by the dynamic batcher; the service writes
+analysis_status/analysis_json back in bulk. Concurrency is the number of
+in-flight requests, so keep it near MAX_BATCH_SIZE:
+
+    celery -A tasks worker -Q meal_analysis --pool threads --concurrency 8
+"""
+from typing import Optional
+import logging
+import os
+import random
+
+import redis
+import requests
+from celery import Celery
+
+from results import MealResultWriter
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+AI_WORKER_URL = os.getenv("AI_WORKER_URL", "http://localhost:8001")
+MEAL_ANALYSIS_QUEUE = os.getenv("MEAL_ANALYSIS_QUEUE", "meal_analysis")
+PENDING_KEY = "meal_analysis:pending"  # Maintained with the backend dispatcher
+
+MAX_RETRIES = 5
+RETRY_BACKOFF_SECONDS = 5
+REQUEST_TIMEOUT_SECONDS = 60
+
+celery_app = Celery("aurtsy_ai", broker=REDIS_URL)
+celery_app.conf.update(
+    task_serializer="json",
+    accept_content=["json"],
+    task_default_queue=MEAL_ANALYSIS_QUEUE,
+    # Take one job per slot and ack after it finishes, so a crashed worker's jobs are redelivered
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_concurrency=int(os.getenv("ANALYSIS_CONCURRENCY", "8")),
+)
+
+_redis = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+_session = requests.Session()
+_failure_writer = MealResultWriter(os.getenv("DATABASE_URL"), REDIS_URL)
+
+class RetryableError(Exception):
+    pass
+
+@celery_app.task(name="ai_worker.analyze_meal", bind=True, max_retries=MAX_RETRIES)
+def analyze_meal(self, meal_id: int, photo_url: str, meal_type: Optional[str] = None, child_id: Optional[str] = None):
+    try:
+        response = _session.post(
+            f"{AI_WORKER_URL}/analyze/",
+            json={
+                "image_url": photo_url, "analysis_type": "MEAL",
+                "meal_id": meal_id, "meal_type": meal_type, "child_id": child_id
+            },
+            timeout=REQUEST_TIMEOUT_SECONDS
+        )
+        if response.status_code >= 500 or response.status_code == 429:
+            raise RetryableError(f"ai-worker returned {response.status_code}")
+    except (requests.RequestException, RetryableError) as e:
+        if self.request.retries < MAX_RETRIES:
+            # Exponential backoff with jitter so a restarting service isn't hit by every job at once
+            countdown = RETRY_BACKOFF_SECONDS * 2 ** self.request.retries * random.uniform(0.5, 1.5)
+            raise self.retry(exc=e, countdown=countdown)
+        logger.error(f"Meal {meal_id} analysis failed after {MAX_RETRIES} retries: {e}")
+        if _failure_writer.enabled:
+            _failure_writer.write([(meal_id, "FAILED", {"error": str(e)})])
+        _redis.zrem(PENDING_KEY, str(meal_id))
+        return {"meal_id": meal_id, "status": "FAILED"}
+
+    # 4xx (unreadable image, bad path) is final; the service has recorded it when it could
+    _redis.zrem(PENDING_KEY, str(meal_id))
+    status = response.json().get("status", "FAILED") if response.ok else "FAILED"
+    if not response.ok and _failure_writer.enabled:
+        _failure_writer.write([(meal_id, "FAILED", {"error": response.text[:500]})])
+    return {"meal_id": meal_id, "status": status}
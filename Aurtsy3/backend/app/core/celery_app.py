@@ -16,12 +16,39 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # Workers never import app.main, so load every model module up front;
+    # otherwise string relationships (e.g. Meal -> User) fail to resolve.
+    imports=[
+        "app.domains.users.models",
+        "app.domains.children.models",
+        "app.domains.meals.models",
+        "app.domains.ai.models",
+        "app.domains.knowledge.models",
+        "app.domains.alerts.models",
+        "app.domains.sleep.models",
+        "app.domains.behavior.models",
+        "app.domains.activities.models",
+        "app.domains.hydration.models",
+        "app.domains.analytics.models",
+        "app.domains.chat.models",
+        "app.domains.sync.models",
+        # Writes made by tasks publish domain events too
+        "app.domains.events",
+        # ...and leave delta sync tombstones when they delete rows
+        "app.domains.sync.changes",
+        # ...and bump the per-child versions behind conditional GETs
+        "app.core.http_cache",
+    ],
 )
 
 # Auto-discover tasks in all domains
 celery_app.autodiscover_tasks([
     "app.domains.ai",
     "app.domains.alerts",
+    "app.domains.analytics",
+    "app.domains.chat",
+    "app.domains.meals",
+    "app.domains.sync",
 ])
 
 # Celery Beat schedule for periodic tasks
@@ -32,4 +59,28 @@ celery_app.conf.beat_schedule = {
         'task': 'app.domains.alerts.tasks.analyze_patterns_for_all_children',
         'schedule': crontab(hour=2, minute=0),  # Run at 2 AM daily
     },
+    'compute-insights-nightly': {
+        'task': 'app.domains.analytics.tasks.compute_insights_for_all_children',
+        'schedule': crontab(hour=2, minute=30),  # After pattern analysis
+    },
+    'compact-acknowledged-alerts': {
+        'task': 'app.domains.alerts.tasks.compact_acknowledged_alerts',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'sweep-realtime-alert-rules': {
+        'task': 'app.domains.alerts.tasks.sweep_realtime_alert_rules',
+        'schedule': crontab(),  # Every minute
+    },
+    'requeue-stale-meal-analyses': {
+        'task': 'app.domains.meals.tasks.requeue_stale_meal_analyses',
+        'schedule': crontab(minute='*/10'),
+    },
+    'prune-sync-receipts': {
+        'task': 'app.domains.sync.tasks.prune_sync_receipts',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'prune-sync-tombstones': {
+        'task': 'app.domains.sync.tasks.prune_sync_tombstones',
+        'schedule': crontab(hour=3, minute=45),
+    },
 }
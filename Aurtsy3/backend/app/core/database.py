@@ -1,6 +1,6 @@
-from sqlalchemy import create_engine
+from sqlalchemy import BigInteger, Column, create_engine, func, literal_column, text, Text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import column_property, deferred, sessionmaker
 import os
 
 # Use environment variable or default to local postgres
@@ -11,6 +11,33 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+PREVIEW_LENGTH = 140
+
+def preview_column(expression, length: int = PREVIEW_LENGTH):
+    """
+    Deferred column truncated in SQL, for summary listings: the heavy column
+    itself never leaves the database. Loaded only when a query asks for it.
+    """
+    return column_property(func.left(expression, length, type_=Text), deferred=True)
+
+# Id of the writing transaction (xid8 as bigint, Postgres 13+); see app/domains/sync/changes.py
+CURRENT_XID = "pg_current_xact_id()::text::bigint"
+
+def change_xid_column():
+    """
+    Delta sync stamp: the transaction that last wrote the row. Raw SQL writes
+    must set it too. Deferred: only the change feed reads it.
+    """
+    return deferred(Column(BigInteger, server_default=text(CURRENT_XID), onupdate=literal_column(CURRENT_XID), nullable=False))
+
+def end_transaction(db):
+    """
+    Commit a session that has only read, before a slow call such as an LLM
+    request, so it doesn't sit idle in transaction. Loaded objects are
+    expired and reload on next access.
+    """
+    db.commit()
+
 def get_db():
     db = SessionLocal()
     try:
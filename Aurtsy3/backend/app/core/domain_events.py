@@ -0,0 +1,114 @@
+"""
+Domain events for ORM writes, published after the transaction commits.
+
+Each domain registers its models in app/domains/events.py with a typed payload
+(a DomainEvent subclass in the domain's schemas.py). Changes are collected when
+the session flushes, while attribute history is still available. With the
+durable bus they are written to its outbox in the same transaction; otherwise
+they are handed to the event bus once the commit succeeds. Either way a
+rollback discards them.
+
+Core statements (bulk insert/update/delete) bypass the ORM and emit nothing;
+bulk inserts that should still be published call queue_created().
+"""
+from typing import ClassVar, Dict, List, Optional, Tuple, Type
+from datetime import datetime
+import logging
+
+from pydantic import BaseModel
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.events import event_bus
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "pending_domain_events"
+ENVELOPE_FIELDS = ("event", "op", "changed", "occurred_at")
+
+class DomainEvent(BaseModel):
+    """Fields shared by every domain event payload."""
+    event: str
+    op: str  # created, updated, deleted
+    child_id: Optional[str] = None
+    changed: List[str] = []  # Columns changed by an update
+    occurred_at: datetime
+
+    # Payload field holding the row's primary key, e.g. "meal_id"
+    id_field: ClassVar[str] = "id"
+
+class _EventSpec:
+    def __init__(self, payload_cls: Type[DomainEvent], names: Dict[str, Optional[str]]):
+        self.payload_cls = payload_cls
+        self.names = names
+
+_registry: Dict[type, _EventSpec] = {}
+
+def register(
+    model: type,
+    payload_cls: Type[DomainEvent],
+    created: Optional[str] = None,
+    updated: Optional[str] = None,
+    deleted: Optional[str] = None
+):
+    """Publish `created`/`updated`/`deleted` events for model rows; None skips that operation."""
+    _registry[model] = _EventSpec(payload_cls, {"created": created, "updated": updated, "deleted": deleted})
+
+def queue_created(session: Session, model: type, rows: List[dict]):
+    """
+    Queue created events for rows written with a Core insert, which the flush
+    hook cannot see. rows are the inserted values including "id"; the events
+    are published when the session commits, like ORM writes.
+    """
+    spec = _registry.get(model)
+    if spec is None or not spec.names["created"]:
+        return
+    name = spec.names["created"]
+    _queue(session, [(name, _payload(spec, "created", name, [], values)) for values in rows])
+
+def _queue(session: Session, events: List[Tuple[str, dict]]):
+    if events and not event_bus.stage(session, events):
+        session.info.setdefault(PENDING_KEY, []).extend(events)
+
+def _build(obj, spec: _EventSpec, op: str, name: str, changed: List[str]) -> dict:
+    # Loaded values only: touching an expired attribute here would issue SQL mid-flush
+    return _payload(spec, op, name, changed, dict(inspect(obj).dict))
+
+def _payload(spec: _EventSpec, op: str, name: str, changed: List[str], values: dict) -> dict:
+    fields = {
+        key: values[key] for key in spec.payload_cls.__fields__
+        if key in values and key not in ENVELOPE_FIELDS
+    }
+    if "id" in values:
+        fields[spec.payload_cls.id_field] = values["id"]
+    return spec.payload_cls(event=name, op=op, changed=changed, occurred_at=datetime.utcnow(), **fields).dict()
+
+@event.listens_for(Session, "after_flush")
+def _collect(session: Session, flush_context):
+    pending: List[Tuple[str, dict]] = []
+    for op, objects in (("created", session.new), ("updated", session.dirty), ("deleted", session.deleted)):
+        for obj in objects:
+            spec = _registry.get(type(obj))
+            if spec is None or not spec.names[op]:
+                continue
+            changed = []
+            if op == "updated":
+                state = inspect(obj)
+                changed = [attr.key for attr in state.mapper.column_attrs if state.attrs[attr.key].history.has_changes()]
+                if not changed:
+                    continue
+            try:
+                pending.append((spec.names[op], _build(obj, spec, op, spec.names[op], changed)))
+            except Exception:
+                logger.exception(f"Could not build {spec.names[op]} event")
+    _queue(session, pending)
+
+@event.listens_for(Session, "after_commit")
+def _publish(session: Session):
+    pending = session.info.pop(PENDING_KEY, None)
+    for name, payload in pending or []:
+        event_bus.emit(name, payload)
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,270 @@
+"""
+Durable EventBus backend on Redis Streams.
+
+- Producers write events to the event_outbox table in the same transaction
+  as the change they describe, so an event exists if and only if its
+  transaction committed, and survives Redis outages and process restarts.
+  A drainer thread moves committed rows to Redis in pipelined batches (woken
+  after each commit, and polling for rows left by other processes), deleting
+  them only once XADD succeeded. Rows are claimed with SKIP LOCKED, so any
+  number of processes can drain.
+- Each event is one stream (events:{name}). Each subscribed handler is its
+  own consumer group, so handlers ack independently and a failing handler
+  does not cause redelivery to the others.
+- Delivery is at-least-once. A message is acked only after its handler
+  returns. Unacked messages idle for CLAIM_IDLE_MS (handler error or dead
+  worker) are claimed and retried. After MAX_DELIVERIES they are copied to
+  events:dead:{name} and acked. A drainer dying between XADD and deleting its
+  rows also repeats events.
+"""
+from typing import Any, Callable, Dict, List, Tuple
+import asyncio
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+import redis
+from sqlalchemy import BigInteger, Column, DateTime, String, Text, delete, event, func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.database import Base, engine
+from app.core.metrics import metrics
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+STREAM_PREFIX = "events"
+STREAM_MAXLEN = 100_000  # Approximate cap per stream; consumers lagging further lose the oldest events
+
+PUBLISH_BATCH_SIZE = 500
+OUTBOX_POLL_SECONDS = 1.0  # Pick up rows committed by processes that did not drain them
+STAGED_KEY = "event_outbox_staged"
+
+CONSUME_BATCH_SIZE = 50
+BLOCK_MS = 2000
+CLAIM_IDLE_MS = 60_000
+MAX_DELIVERIES = 5
+
+events_published = metrics.counter("event_bus_published_total", "Events appended to Redis streams", labelnames=("event",))
+outbox_lag = metrics.gauge("event_bus_outbox_lag_seconds", "Age of the oldest event in the last batch moved from the outbox to Redis")
+events_handled = metrics.counter(
+    "event_bus_handled_total", "Event deliveries by outcome (ok, error, dead_letter)", labelnames=("event", "group", "outcome")
+)
+handler_latency = metrics.histogram("event_bus_handler_seconds", "Event handler run time", labelnames=("event", "group"))
+
+def stream_key(event_name: str) -> str:
+    return f"{STREAM_PREFIX}:{event_name}"
+
+def dead_letter_key(event_name: str) -> str:
+    return f"{STREAM_PREFIX}:dead:{event_name}"
+
+def group_name(handler: Callable) -> str:
+    """Stable consumer group per handler, e.g. app.domains.alerts.rules.AlertRuleEngine.on_meal_logged."""
+    return f"{handler.__module__}.{handler.__qualname__}"
+
+class EventOutbox(Base):
+    """A committed event not yet appended to its Redis stream."""
+    __tablename__ = "event_outbox"
+
+    id = Column(BigInteger, primary_key=True)
+    event = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class RedisStreamsBackend:
+    def __init__(self):
+        self._drainer = None
+        self._wake = threading.Event()
+        self._consumers: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._consumer_name = f"{socket.gethostname()}-{os.getpid()}"
+        event.listen(Session, "after_commit", self._committed)
+        event.listen(Session, "after_rollback", self._rolled_back)
+
+    # --- Producer side ---
+
+    def stage(self, session: Session, events: List[Tuple[str, Any]]):
+        """Write events into the session's transaction; they reach Redis once it commits."""
+        session.connection().execute(insert(EventOutbox), [
+            {"event": event_name, "payload": json.dumps(payload, default=str)} for event_name, payload in events
+        ])
+        session.info[STAGED_KEY] = True
+
+    def publish(self, event_name: str, payload: Any):
+        """Append one event outside any session, in its own transaction; never runs handlers in the caller."""
+        with engine.begin() as conn:
+            conn.execute(insert(EventOutbox).values(event=event_name, payload=json.dumps(payload, default=str)))
+        self.notify()
+
+    def _committed(self, session: Session):
+        if session.info.pop(STAGED_KEY, False):
+            self.notify()
+
+    def _rolled_back(self, session: Session):
+        session.info.pop(STAGED_KEY, None)
+
+    def notify(self):
+        """Wake the drainer: events were just committed."""
+        self._ensure_drainer()
+        self._wake.set()
+
+    def flush(self, timeout: float = 5.0):
+        """Drain the outbox from the calling thread (shutdown, scripts, tests)."""
+        deadline = time.monotonic() + timeout
+        try:
+            while self._drain_batch() and time.monotonic() < deadline:
+                pass
+        except (redis.RedisError, SQLAlchemyError):
+            logger.exception("Event outbox flush failed; the rows stay for the next drainer")
+
+    def _ensure_drainer(self):
+        if self._drainer is None or not self._drainer.is_alive():
+            if self._drainer is None:
+                # Scripts exit without a shutdown hook; hand over what they committed
+                atexit.register(self.flush)
+            self._drainer = threading.Thread(target=self._drain_loop, name="event-bus-drainer", daemon=True)
+            self._drainer.start()
+
+    def _drain_loop(self):
+        delay = 0.1
+        while True:
+            try:
+                drained = self._drain_batch()
+                delay = 0.1
+            except (redis.RedisError, SQLAlchemyError):
+                logger.exception(f"Event outbox drain failed; retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, 5.0)
+                continue
+            if drained < PUBLISH_BATCH_SIZE:
+                self._wake.wait(OUTBOX_POLL_SECONDS)
+                self._wake.clear()
+
+    def _drain_batch(self) -> int:
+        """Move up to PUBLISH_BATCH_SIZE committed events to Redis; rows are deleted only after XADD succeeds."""
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(EventOutbox.id, EventOutbox.event, EventOutbox.payload, EventOutbox.created_at)
+                .order_by(EventOutbox.id)
+                .limit(PUBLISH_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not rows:
+                outbox_lag.set(0)
+                return 0
+            self._write([(row.event, row.payload) for row in rows])
+            conn.execute(delete(EventOutbox).where(EventOutbox.id.in_([row.id for row in rows])))
+            outbox_lag.set(max(0.0, time.time() - rows[0].created_at.timestamp()))
+        return len(rows)
+
+    def _write(self, items: List[Tuple[str, str]]):
+        pipe = get_redis().pipeline(transaction=False)
+        for event_name, data in items:
+            pipe.xadd(stream_key(event_name), {"data": data}, maxlen=STREAM_MAXLEN, approximate=True)
+        pipe.execute()
+        for event_name, _ in items:
+            events_published.inc(event=event_name)
+
+    # --- Consumer side ---
+
+    def start(self, subscribers: Dict[str, List[Callable]]):
+        """Start one consumer thread per (event, handler) group, and the outbox drainer."""
+        self._stopping.clear()
+        self._ensure_drainer()
+        for event_name, handlers in subscribers.items():
+            for handler in handlers:
+                thread = threading.Thread(
+                    target=self._consume_loop,
+                    args=(event_name, handler),
+                    name=f"event-consumer-{event_name}-{handler.__name__}",
+                    daemon=True
+                )
+                thread.start()
+                self._consumers.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self.flush()
+        self._stopping.set()
+        for thread in self._consumers:
+            thread.join(timeout=timeout)
+        self._consumers = []
+
+    def _consume_loop(self, event_name: str, handler: Callable):
+        r = get_redis()
+        key, group = stream_key(event_name), group_name(handler)
+        try:
+            # New groups start at the tail: a newly added handler does not replay history
+            r.xgroup_create(key, group, id="$", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+        last_claim = 0.0
+        while not self._stopping.is_set():
+            try:
+                if time.monotonic() - last_claim > CLAIM_IDLE_MS / 1000:
+                    self._retry_stale(r, event_name, handler)
+                    last_claim = time.monotonic()
+
+                response = r.xreadgroup(
+                    group, self._consumer_name, {key: ">"}, count=CONSUME_BATCH_SIZE, block=BLOCK_MS
+                )
+                for _, messages in response or []:
+                    self._handle_batch(r, event_name, handler, messages)
+            except redis.RedisError:
+                logger.exception(f"Event consumer {group} lost Redis; retrying")
+                self._stopping.wait(1.0)
+
+    def _handle_batch(self, r: redis.Redis, event_name: str, handler: Callable, messages: list):
+        group = group_name(handler)
+        acked = []
+        for message_id, fields in messages:
+            try:
+                with handler_latency.time(event=event_name, group=group):
+                    _run_handler(handler, json.loads(fields["data"]))
+                acked.append(message_id)
+                events_handled.inc(event=event_name, group=group, outcome="ok")
+            except Exception:
+                # Left pending; retried after CLAIM_IDLE_MS
+                logger.exception(f"Handler {group} failed for {event_name} {message_id}")
+                events_handled.inc(event=event_name, group=group, outcome="error")
+        if acked:
+            r.xack(stream_key(event_name), group, *acked)
+
+    def _retry_stale(self, r: redis.Redis, event_name: str, handler: Callable):
+        """Claim messages stuck pending (failed or owned by a dead consumer); dead-letter repeat failures."""
+        key, group = stream_key(event_name), group_name(handler)
+        pending = r.xpending_range(key, group, min="-", max="+", count=CONSUME_BATCH_SIZE, idle=CLAIM_IDLE_MS)
+        if not pending:
+            return
+
+        exhausted = [p["message_id"] for p in pending if p["times_delivered"] >= MAX_DELIVERIES]
+        retry = [p["message_id"] for p in pending if p["times_delivered"] < MAX_DELIVERIES]
+
+        if exhausted:
+            pipe = r.pipeline()
+            for message_id, fields in r.xclaim(key, group, self._consumer_name, CLAIM_IDLE_MS, exhausted):
+                if not fields:  # Already trimmed from the stream
+                    continue
+                pipe.xadd(dead_letter_key(event_name), {
+                    "data": fields["data"], "group": group, "message_id": message_id
+                }, maxlen=STREAM_MAXLEN, approximate=True)
+                events_handled.inc(event=event_name, group=group, outcome="dead_letter")
+            pipe.xack(key, group, *exhausted)
+            pipe.execute()
+            logger.error(f"Dead-lettered {len(exhausted)} {event_name} events for {group}")
+
+        if retry:
+            claimed = r.xclaim(key, group, self._consumer_name, CLAIM_IDLE_MS, retry)
+            self._handle_batch(r, event_name, handler, [m for m in claimed if m[1]])
+
+def _run_handler(handler: Callable, payload: Any):
+    if asyncio.iscoroutinefunction(handler):
+        asyncio.run(handler(payload))
+    else:
+        handler(payload)
@@ -1,12 +1,18 @@
-from typing import Callable, Dict, List, Any
+from typing import Callable, Dict, List, Any, Tuple
 import asyncio
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+# "memory" runs handlers in the publishing process; "redis" makes events durable
+# (see app/core/event_streams.py) and runs handlers in consumer threads
+EVENT_BUS_BACKEND = os.getenv("EVENT_BUS_BACKEND", "memory")
+
 class EventBus:
-    def __init__(self):
+    def __init__(self, backend=None):
         self._subscribers: Dict[str, List[Callable]] = {}
+        self._backend = backend
 
     def subscribe(self, event_name: str, handler: Callable):
         """Subscribe a handler to an event."""
@@ -17,6 +23,9 @@ class EventBus:
 
     async def publish(self, event_name: str, payload: Any):
         """Publish an event to all subscribers."""
+        if self._backend:
+            self._backend.publish(event_name, payload)
+            return
         if event_name not in self._subscribers:
             return
 
@@ -34,5 +43,61 @@ class EventBus:
         if tasks:
             await asyncio.gather(*tasks, return_exceptions=True)
 
+    def emit(self, event_name: str, payload: Any):
+        """
+        Publish from synchronous code (sync routes, Celery tasks).
+        Handlers run inline in the caller's thread; a failing handler is logged
+        and never breaks the write that emitted the event.
+        """
+        if self._backend:
+            self._backend.publish(event_name, payload)
+            return
+        if event_name not in self._subscribers:
+            return
+
+        logger.info(f"Emitting event: {event_name}")
+
+        for handler in self._subscribers[event_name]:
+            try:
+                if asyncio.iscoroutinefunction(handler):
+                    try:
+                        loop = asyncio.get_running_loop()
+                    except RuntimeError:
+                        loop = None
+                    if loop:
+                        loop.create_task(handler(payload))
+                    else:
+                        asyncio.run(handler(payload))
+                else:
+                    handler(payload)
+            except Exception:
+                logger.exception(f"Handler {handler.__name__} failed for {event_name}")
+
+    def stage(self, session, events: List[Tuple[str, Any]]) -> bool:
+        """
+        Durable backend: write events into the session's transaction, so they
+        are delivered if and only if it commits. Returns False without a
+        durable backend; the caller then emits them after the commit.
+        """
+        if not self._backend:
+            return False
+        self._backend.stage(session, events)
+        return True
+
+    def start(self):
+        """Start consuming with the subscribed handlers (durable backend only)."""
+        if self._backend:
+            self._backend.start(self._subscribers)
+
+    def stop(self):
+        if self._backend:
+            self._backend.stop()
+
+def _create_event_bus() -> EventBus:
+    if EVENT_BUS_BACKEND == "redis":
+        from app.core.event_streams import RedisStreamsBackend
+        return EventBus(backend=RedisStreamsBackend())
+    return EventBus()
+
 # Global instance
-event_bus = EventBus()
+event_bus = _create_event_bus()
@@ -0,0 +1,129 @@
+"""
+Conditional GET for per-child resources.
+
+Every commit that writes a row carrying a child_id bumps a per-child,
+per-table counter in Redis:
+
+  child_versions:{child_id}  hash  table name -> write count, "epoch" -> random token
+
+An endpoint builds a weak ETag from the counters of the tables it reads (one
+HMGET), and answers If-None-Match with 304 before opening a database query.
+The epoch is regenerated whenever the hash is lost (eviction, flush), so
+counters restarting from zero can never reproduce an old ETag.
+
+ORM writes are picked up by the session hooks below. Core statements
+(bulk inserts, upserts, bulk deletes) call touch() with the child ids they
+wrote. If Redis is unavailable, endpoints simply answer without an ETag.
+"""
+from typing import Iterable, Optional, Sequence, Set, Tuple
+import hashlib
+import logging
+import secrets
+import time
+
+from fastapi import Request, Response
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_KEY = "child_versions:{}"  # Also bumped by the ai-worker's meal result writer
+EPOCH_FIELD = "epoch"
+TOUCHED_KEY = "touched_child_tables"
+
+# Cache-Control per kind of resource: listings always revalidate (a 304 is
+# cheap); aggregates may be reused briefly and also drift with time
+LISTING_CACHE_CONTROL = "private, no-cache"
+SUMMARY_MAX_AGE = 300
+SUMMARY_CACHE_CONTROL = f"private, max-age={SUMMARY_MAX_AGE}"
+REFERENCE_CACHE_CONTROL = "private, max-age=600"
+
+class ChildVersions:
+    def bump(self, touched: Iterable[Tuple[str, str]]):
+        """Increment the counter of each (child_id, table) pair. One round trip."""
+        touched = set(touched)
+        if not touched:
+            return
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for child_id, table in touched:
+                key = VERSIONS_KEY.format(child_id)
+                pipe.hsetnx(key, EPOCH_FIELD, secrets.token_hex(4))
+                pipe.hincrby(key, table, 1)
+            pipe.execute()
+        except Exception:
+            logger.exception(f"Could not bump change versions for {len(touched)} child tables")
+
+    def token(self, child_id: str, tables: Sequence[str]) -> Optional[str]:
+        """Opaque version of a child's tables, or None if Redis is unavailable."""
+        key = VERSIONS_KEY.format(child_id)
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.hsetnx(key, EPOCH_FIELD, secrets.token_hex(4))
+            pipe.hmget(key, EPOCH_FIELD, *tables)
+            _, values = pipe.execute()
+        except Exception:
+            logger.exception(f"Could not read change versions for child {child_id}")
+            return None
+        return ":".join(value or "0" for value in values)
+
+child_versions = ChildVersions()
+
+def touch(session: Session, table: str, child_ids: Iterable[str]):
+    """Record Core writes to `table` for these children; versions are bumped when the session commits."""
+    pending: Set[Tuple[str, str]] = session.info.setdefault(TOUCHED_KEY, set())
+    pending.update((child_id, table) for child_id in child_ids if child_id)
+
+def conditional_get(
+    request: Request,
+    response: Response,
+    child_id: str,
+    tables: Sequence[str],
+    cache_control: str = LISTING_CACHE_CONTROL,
+    max_age: Optional[int] = None
+) -> Optional[Response]:
+    """
+    Set ETag and Cache-Control on `response` and return a 304 response if the
+    client already has this version; the endpoint returns that instead of
+    running its queries. Call it before reading any data, so the ETag is never
+    newer than the body it is sent with. Resources that change with time alone
+    pass max_age: the ETag then also turns over every max_age seconds.
+    """
+    version = child_versions.token(child_id, tables)
+    response.headers["Cache-Control"] = cache_control
+    if version is None:
+        return None
+    if max_age:
+        version = f"{version}:{int(time.time() // max_age)}"
+    digest = hashlib.sha1(f"{version}|{request.url.path}?{request.url.query}".encode()).hexdigest()[:20]
+    etag = f'W/"{digest}"'
+    response.headers["ETag"] = etag
+
+    # Weak comparison: a client (or proxy) may have dropped the W/ prefix
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = {tag.strip().replace("W/", "", 1) for tag in if_none_match.split(",")}
+    if "*" in candidates or f'"{digest}"' in candidates:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    return None
+
+@event.listens_for(Session, "after_flush")
+def _collect(session: Session, flush_context):
+    pending: Set[Tuple[str, str]] = session.info.setdefault(TOUCHED_KEY, set())
+    for objects in (session.new, session.dirty, session.deleted):
+        for obj in objects:
+            # Loaded values only: touching an expired attribute here would issue SQL mid-flush
+            child_id = inspect(obj).dict.get("child_id")
+            if isinstance(child_id, str):
+                pending.add((child_id, obj.__tablename__))
+
+@event.listens_for(Session, "after_commit")
+def _bump(session: Session):
+    pending = session.info.pop(TOUCHED_KEY, None)
+    if pending:
+        child_versions.bump(pending)
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session):
+    session.info.pop(TOUCHED_KEY, None)
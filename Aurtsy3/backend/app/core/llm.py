@@ -1,16 +1,358 @@
+"""
+Ollama client, and the scheduling of LLM calls in front of it.
+
+Every call has a priority class: interactive (chat), near-real-time (the
+default: voice-note extraction, handoffs, questions) or batch (anything
+running inside a Celery task, e.g. nightly jobs and chat summaries).
+Within a process, calls wait in a weighted fair queue: each class gets
+dispatch slots in proportion to its weight, so queued batch work is
+overtaken by interactive calls that arrive later (preemption before
+dispatch; a running request is never interrupted). Across processes,
+batch calls are only dispatched while few requests are in flight on the
+model server.
+
+Requests can be spread over several Ollama servers (OLLAMA_BASE_URLS,
+comma-separated). Each dispatched call goes to the backend with the fewest
+of this process's requests in flight. A backend that fails
+CIRCUIT_FAILURES times in a row (connection errors, 5xx, timeouts) has its
+circuit opened: it is skipped, and once CIRCUIT_RESET_SECONDS have passed
+it is probed in the background via /api/tags and rejoins if that answers.
+Connection errors and 5xx fail over to the next backend; with every
+circuit open, calls raise BackendUnavailable at once instead of waiting
+out a timeout. With OLLAMA_HEDGE on, a call still unanswered after the
+model's p95 latency is duplicated to a second backend; the first answer
+wins and the other request is aborted. The primary attempt runs on the
+calling thread, only hedges and probes use the client's pool. Breaker and
+latency state are per process.
+"""
 import os
 import requests
+import itertools
+import socket
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.parse import urlsplit
 from typing import Optional, Dict, Any, List
 import json
+import logging
+import time
+import uuid
+
+from celery import current_task
+
+from app.core.metrics import metrics
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 60
+
+INTERACTIVE = "interactive"
+NEAR_REAL_TIME = "near_real_time"
+BATCH = "batch"
+PRIORITY_WEIGHTS = {INTERACTIVE: 8, NEAR_REAL_TIME: 4, BATCH: 1}
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))  # Per process
+BATCH_MAX_INFLIGHT = int(os.getenv("LLM_BATCH_MAX_INFLIGHT", "1"))  # Server-wide, before batch may start
+BATCH_GATE_POLL_SECONDS = 0.5
+
+LLM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+queue_wait_seconds = metrics.histogram(
+    "llm_queue_wait_seconds",
+    "Time LLM calls waited for dispatch, by priority class",
+    labelnames=("priority",),
+    buckets=LLM_BUCKETS
+)
+request_seconds = metrics.histogram(
+    "llm_request_seconds",
+    "LLM call latency including queueing, by priority class",
+    labelnames=("priority",),
+    buckets=LLM_BUCKETS
+)
+
+_priority: ContextVar[Optional[str]] = ContextVar("llm_priority", default=None)
+
+@contextmanager
+def llm_priority(priority: str):
+    """Run LLM calls made inside this block (however deep) in the given class."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def resolve_priority(priority: Optional[str] = None) -> str:
+    """Explicit class, else the enclosing llm_priority block, else batch inside Celery tasks."""
+    if priority:
+        return priority
+    if _priority.get():
+        return _priority.get()
+    if current_task and current_task.request.id:
+        return BATCH
+    return NEAR_REAL_TIME
+# LLM requests in flight across API processes and Celery workers: request id -> start time.
+# Entries older than the request timeout are ignored, so a crashed caller cannot leak depth.
+INFLIGHT_KEY = "llm:inflight"
+
+class InflightTracker:
+    """Queue depth of the model server as seen by its callers, for admission control."""
+
+    @contextmanager
+    def track(self):
+        token = uuid.uuid4().hex
+        try:
+            get_redis().zadd(INFLIGHT_KEY, {token: time.time()})
+        except Exception:
+            logger.exception("Could not record in-flight LLM request")
+            token = None
+        try:
+            yield
+        finally:
+            if token:
+                try:
+                    get_redis().zrem(INFLIGHT_KEY, token)
+                except Exception:
+                    logger.exception("Could not clear in-flight LLM request")
+
+    def depth(self) -> int:
+        """Requests started within the timeout and not finished; 0 if Redis is unavailable."""
+        cutoff = time.time() - REQUEST_TIMEOUT
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.zremrangebyscore(INFLIGHT_KEY, "-inf", cutoff)
+            pipe.zcard(INFLIGHT_KEY)
+            return pipe.execute()[1]
+        except Exception:
+            logger.exception("Could not read LLM queue depth")
+            return 0
+
+llm_inflight = InflightTracker()
+
+class _Ticket:
+    __slots__ = ("priority", "finish", "seq")
+
+    def __init__(self, priority: str, finish: float, seq: int):
+        self.priority = priority
+        self.finish = finish
+        self.seq = seq
+
+class LLMScheduler:
+    """
+    Weighted fair queuing of a process's LLM calls over MAX_CONCURRENCY slots.
+    Each call is stamped with a virtual finish time of start + 1/weight and
+    the smallest stamp is dispatched next, so under contention the classes
+    get slots in the ratio of their weights and none starves.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, weights: Dict[str, int] = PRIORITY_WEIGHTS):
+        self.max_concurrency = max_concurrency
+        self.weights = weights
+        self._cond = threading.Condition()
+        self._waiting: List[_Ticket] = []
+        self._running = 0
+        self._virtual_time = 0.0
+        self._last_finish = {priority: 0.0 for priority in weights}
+        self._seq = itertools.count()
+        self._gate_open = True
+        self._gate_checked_at = 0.0
+
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    @contextmanager
+    def slot(self, priority: str):
+        """Block until this call is dispatched; the slot is held for the block."""
+        started = time.perf_counter()
+        with self._cond:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                if priority == BATCH:
+                    # Redis round trip, outside the lock so other classes never wait on it
+                    self._refresh_batch_gate()
+                with self._cond:
+                    if self._dispatchable(ticket):
+                        self._waiting.remove(ticket)
+                        self._running += 1
+                        self._virtual_time = ticket.finish
+                        break
+                    # Batch tickets wake to re-poll the server-wide gate; others wake on release
+                    self._cond.wait(BATCH_GATE_POLL_SECONDS if priority == BATCH else None)
+        except BaseException:
+            with self._cond:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+            raise
+        queue_wait_seconds.observe(time.perf_counter() - started, priority=priority)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
+
+    def _enqueue(self, priority: str) -> _Ticket:
+        start = max(self._virtual_time, self._last_finish[priority])
+        ticket = _Ticket(priority, start + 1.0 / self.weights[priority], next(self._seq))
+        self._last_finish[priority] = ticket.finish
+        self._waiting.append(ticket)
+        # A higher-class arrival may now be next in line instead of a waiting thread
+        self._cond.notify_all()
+        return ticket
+
+    def _dispatchable(self, ticket: _Ticket) -> bool:
+        if self._running >= self.max_concurrency:
+            return False
+        eligible = [t for t in self._waiting if t.priority != BATCH or self._gate_open]
+        return bool(eligible) and min(eligible, key=lambda t: (t.finish, t.seq)) is ticket
+
+    def _refresh_batch_gate(self):
+        """Recheck whether the model server is idle enough for batch work, at most once per poll."""
+        with self._cond:
+            now = time.monotonic()
+            if now - self._gate_checked_at < BATCH_GATE_POLL_SECONDS:
+                return
+            self._gate_checked_at = now  # Claimed: other batch threads keep the cached value
+        gate_open = llm_inflight.depth() < BATCH_MAX_INFLIGHT
+        with self._cond:
+            if gate_open != self._gate_open:
+                self._gate_open = gate_open
+                self._cond.notify_all()
+
+llm_scheduler = LLMScheduler()
+
+CONNECT_TIMEOUT = 3  # A down host fails over after this, not after REQUEST_TIMEOUT
+HEALTH_TIMEOUT = 2
+CIRCUIT_FAILURES = int(os.getenv("OLLAMA_CIRCUIT_FAILURES", "3"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("OLLAMA_CIRCUIT_RESET_SECONDS", "30"))
+HEDGE_REQUESTS = os.getenv("OLLAMA_HEDGE", "false").lower() == "true"
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20  # Per model, before a hedge delay is trusted
+LATENCY_WINDOW = 200
+
+backend_requests_total = metrics.counter(
+    "llm_backend_requests_total",
+    "Requests sent to each Ollama backend",
+    labelnames=("backend", "outcome")
+)
+hedges_total = metrics.counter(
+    "llm_hedges_total",
+    "Hedged duplicate requests, by whether the duplicate answered first",
+    labelnames=("outcome",)
+)
+circuit_open = metrics.gauge(
+    "llm_backend_circuit_open",
+    "1 while a backend's circuit breaker is open in this process",
+    labelnames=("backend",)
+)
+
+class BackendUnavailable(RuntimeError):
+    """No Ollama backend can take the request (every circuit is open)."""
+
+class BackendError(Exception):
+    """A backend failed in a way another backend may not (connection refused, 5xx)."""
+
+class _Race:
+    """
+    The primary and hedge attempts of one call. The first to succeed wins and
+    shuts down the other's socket, so neither the caller nor a pool worker
+    keeps waiting on the loser.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections: Dict[str, Any] = {}
+        self.winner: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.hedged = False
+        self.decided = threading.Event()
+        self.hedge_done = threading.Event()
+
+    def track(self, role: str, connection) -> bool:
+        """Register an attempt's connection; False if the race is already decided."""
+        with self._lock:
+            if self.winner is not None:
+                return False
+            self._connections[role] = connection
+            return True
+
+    def start_hedge(self) -> bool:
+        with self._lock:
+            if self.winner is not None:
+                return False
+            self.hedged = True
+            return True
+
+    def finish(self, role: str, result: Dict[str, Any]) -> bool:
+        """Record a success; True if it won, in which case the other attempt is aborted."""
+        with self._lock:
+            if self.winner is not None:
+                return False
+            self.winner, self.result = role, result
+            losers = [c for r, c in self._connections.items() if r != role]
+        self.decided.set()
+        for connection in losers:
+            try:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+            except (AttributeError, OSError):
+                pass  # Not connected yet, or already closed
+        return True
+
+    def lost(self, role: str) -> bool:
+        return self.winner is not None and self.winner != role
+
+    def await_hedge(self) -> bool:
+        """After the primary failed: wait for a hedge already in flight; True if it succeeded."""
+        with self._lock:
+            if self.winner is None and not self.hedged:
+                self.winner = "none"  # Too late to start one
+        if self.winner == "none":
+            self.decided.set()
+            return False
+        self.hedge_done.wait()
+        return self.winner == "hedge"
+
+class OllamaBackend:
+    """One Ollama server as seen from this process; guarded by its client's lock."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.inflight = 0
+        self.failures = 0  # Consecutive
+        self.opened_at: Optional[float] = None  # Circuit open since (monotonic); None while closed
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "probing" if self.probing else "open"
 
 class OllamaClient:
     def __init__(
         self, 
         base_url: Optional[str] = None,
-        default_model: Optional[str] = None
+        default_model: Optional[str] = None,
+        base_urls: Optional[List[str]] = None,
+        hedge: Optional[bool] = None
     ):
-        self.base_url = base_url or os.getenv("OLLAMA_BASE_URL", "http://100.80.85.59:11434")
+        if not base_urls and not base_url:
+            base_urls = [url.strip() for url in os.getenv("OLLAMA_BASE_URLS", "").split(",") if url.strip()]
+        urls = base_urls or [base_url or os.getenv("OLLAMA_BASE_URL", "http://100.80.85.59:11434")]
+        self.backends = [OllamaBackend(url) for url in urls]
+        self.base_url = self.backends[0].url
         self.default_model = default_model or os.getenv("OLLAMA_MODEL", "qwen2.5-coder:14b-instruct")
+        self.hedge = (HEDGE_REQUESTS if hedge is None else hedge) and len(self.backends) > 1
+        self._lock = threading.Lock()
+        self._rotation = itertools.count()
+        self._latencies: Dict[str, deque] = {}
+        # Hedges (at most one per dispatched call) and health probes
+        self._pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY + len(self.backends), thread_name_prefix="ollama")
     
     def generate(
         self, 
@@ -18,7 +360,8 @@ class OllamaClient:
         model: Optional[str] = None,
         system: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        priority: Optional[str] = None
     ) -> str:
         """
         Generate a completion using Ollama.
@@ -29,6 +372,7 @@ class OllamaClient:
             system: System prompt (optional)
             temperature: Sampling temperature (0.0 to 1.0)
             max_tokens: Maximum tokens to generate
+            priority: Scheduling class (defaults to resolve_priority())
         
         Returns:
             The generated text
@@ -51,13 +395,7 @@ class OllamaClient:
             payload["options"]["num_predict"] = max_tokens
         
         try:
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=60
-            )
-            response.raise_for_status()
-            return response.json()["response"]
+            return self._post("/api/generate", payload, priority)["response"]
         except Exception as e:
             print(f"Ollama API error: {e}")
             raise
@@ -66,7 +404,8 @@ class OllamaClient:
         self,
         messages: List[Dict[str, str]],
         model: Optional[str] = None,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        priority: Optional[str] = None
     ) -> str:
         """
         Chat completion using Ollama.
@@ -75,6 +414,7 @@ class OllamaClient:
             messages: List of message dicts with 'role' and 'content'
             model: Model to use
             temperature: Sampling temperature
+            priority: Scheduling class (defaults to resolve_priority())
         
         Returns:
             The assistant's response
@@ -91,27 +431,206 @@ class OllamaClient:
         }
         
         try:
-            response = requests.post(
-                f"{self.base_url}/api/chat",
-                json=payload,
-                timeout=60
-            )
-            response.raise_for_status()
-            return response.json()["message"]["content"]
+            return self._post("/api/chat", payload, priority)["message"]["content"]
         except Exception as e:
             print(f"Ollama chat API error: {e}")
             raise
     
-    def list_models(self) -> List[str]:
-        """List available models on the Ollama server."""
+    def _post(self, path: str, payload: Dict[str, Any], priority: Optional[str]) -> Dict[str, Any]:
+        """Wait for a scheduler slot in the call's class, then make the request."""
+        priority = resolve_priority(priority)
+        with request_seconds.time(priority=priority), llm_scheduler.slot(priority):
+            return self._request(path, payload)
+
+    def _request(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        primary = self._acquire()
+        if primary is None:
+            raise BackendUnavailable(f"All {len(self.backends)} Ollama backends are failing")
+        delay = self._hedge_delay(payload["model"])
+        if delay is None:
+            return self._attempt(primary, path, payload, [])
+
+        # The primary runs here; only the hedge uses the pool, timed from now
+        race = _Race()
+        self._pool.submit(self._hedge, race, time.monotonic() + delay, primary, path, payload)
         try:
-            response = requests.get(f"{self.base_url}/api/tags")
-            response.raise_for_status()
-            models = response.json().get("models", [])
-            return [m["name"] for m in models]
-        except Exception as e:
-            print(f"Error listing models: {e}")
-            return []
+            result = self._attempt(primary, path, payload, [], race, "primary")
+        except Exception:
+            if race.lost("primary") or race.await_hedge():
+                return race.result
+            raise
+        if race.finish("primary", result) and race.hedged:
+            hedges_total.inc(outcome="lost")
+        elif race.lost("primary"):
+            return race.result
+        return result
+
+    def _hedge(self, race: "_Race", at: float, primary: OllamaBackend, path: str, payload: Dict[str, Any]):
+        """Pool task: duplicate the call to another backend if the primary hasn't answered by `at`."""
+        try:
+            if race.decided.wait(max(0.0, at - time.monotonic())) or not race.start_hedge():
+                return
+            backend = self._acquire([primary])
+            if backend is None:
+                return
+            try:
+                result = self._attempt(backend, path, payload, [primary], race, "hedge")
+            except Exception:
+                return
+            if race.finish("hedge", result):
+                hedges_total.inc(outcome="won")
+        finally:
+            race.hedge_done.set()
+
+    def _attempt(self, backend: OllamaBackend, path: str, payload: Dict[str, Any], avoid: List[OllamaBackend],
+                 race: Optional["_Race"] = None, role: str = "primary") -> Dict[str, Any]:
+        """Send to `backend`, failing over to the others (except `avoid`) on connection errors and 5xx."""
+        tried = [backend] + avoid
+        while True:
+            try:
+                return self._send(backend, path, payload, race, role)
+            except BackendError:
+                if race is not None and race.lost(role):
+                    raise
+                backend = self._acquire(tried)
+                if backend is None:
+                    raise
+                tried.append(backend)
+
+    def _send(self, backend: OllamaBackend, path: str, payload: Dict[str, Any],
+              race: Optional["_Race"] = None, role: str = "primary") -> Dict[str, Any]:
+        """
+        One request to an acquired backend; records the outcome against its circuit.
+        Uses a bare connection rather than requests so a hedge race can abort it
+        by shutting its socket (Ollama then stops generating for it too).
+        """
+        start = time.perf_counter()
+        outcome = "ok"
+        url = urlsplit(backend.url)
+        connection = (HTTPSConnection if url.scheme == "https" else HTTPConnection)(url.hostname, url.port, timeout=CONNECT_TIMEOUT)
+        try:
+            with llm_inflight.track():
+                connection.connect()
+                connection.sock.settimeout(REQUEST_TIMEOUT)
+                if race is not None and not race.track(role, connection):
+                    raise BackendError(f"{backend.url} request abandoned, the other attempt answered")
+                connection.request("POST", f"{url.path}{path}", body=json.dumps(payload), headers={"Content-Type": "application/json"})
+                response = connection.getresponse()
+                data = response.read()
+            if response.status >= 500:
+                raise BackendError(f"{backend.url} returned {response.status}")
+            if response.status >= 400:
+                raise RuntimeError(f"{backend.url}{path} returned {response.status}: {data[:200]!r}")
+            body = json.loads(data)
+        except socket.timeout:
+            # Connect timeouts fail over; read timeouts don't, the caller already waited them out
+            if connection.sock is None:
+                outcome = "error"
+                raise BackendError(f"{backend.url} connect timed out")
+            outcome = "timeout"
+            raise
+        except BackendError:
+            outcome = "cancelled" if race is not None and race.lost(role) else "error"
+            raise
+        except (OSError, HTTPException) as e:
+            if race is not None and race.lost(role):
+                outcome = "cancelled"
+                raise BackendError(f"{backend.url} request abandoned, the other attempt answered") from e
+            outcome = "error"
+            raise BackendError(f"{backend.url} unreachable: {e}") from e
+        finally:
+            connection.close()
+            self._release(backend, outcome)
+        self._record_latency(payload["model"], time.perf_counter() - start)
+        return body
+
+    def _acquire(self, exclude: Optional[List[OllamaBackend]] = None) -> Optional[OllamaBackend]:
+        """Reserve the least-loaded backend with a closed circuit, or None if there is none."""
+        now = time.monotonic()
+        with self._lock:
+            offset = next(self._rotation)  # Spreads ties
+            ordered = self.backends[offset % len(self.backends):] + self.backends[:offset % len(self.backends)]
+            candidates = []
+            for backend in ordered:
+                if backend.opened_at is None:
+                    candidates.append(backend)
+                elif not backend.probing and now - backend.opened_at >= CIRCUIT_RESET_SECONDS:
+                    backend.probing = True
+                    self._pool.submit(self._probe, backend)
+            candidates = [backend for backend in candidates if backend not in (exclude or [])]
+            if not candidates:
+                return None
+            backend = min(candidates, key=lambda b: b.inflight)
+            backend.inflight += 1
+            return backend
+
+    def _release(self, backend: OllamaBackend, outcome: str):
+        """outcome: ok, error, timeout, or cancelled (lost a hedge race; says nothing about the backend)."""
+        with self._lock:
+            backend.inflight -= 1
+            if outcome == "ok":
+                backend.failures = 0
+            elif outcome != "cancelled":
+                backend.failures += 1
+                if backend.opened_at is None and backend.failures >= CIRCUIT_FAILURES:
+                    backend.opened_at = time.monotonic()
+                    logger.warning(f"Ollama backend {backend.url} failing, circuit opened")
+        backend_requests_total.inc(backend=backend.url, outcome=outcome)
+
+    def _probe(self, backend: OllamaBackend):
+        """Half-open check: close the circuit if the backend answers /api/tags, else wait another reset period."""
+        try:
+            self._fetch_models(backend.url, HEALTH_TIMEOUT)
+            healthy = True
+        except Exception:
+            healthy = False
+        with self._lock:
+            backend.probing = False
+            if healthy:
+                backend.opened_at, backend.failures = None, 0
+            else:
+                backend.opened_at = time.monotonic()
+        if healthy:
+            logger.info(f"Ollama backend {backend.url} recovered, circuit closed")
+
+    def _record_latency(self, model: str, seconds: float):
+        with self._lock:
+            self._latencies.setdefault(model, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging a call to this model, or None to not hedge."""
+        if not self.hedge:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies.get(model, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * HEDGE_QUANTILE))]
+
+    def backend_states(self) -> Dict[str, str]:
+        """Circuit state per backend URL (closed, open or probing)."""
+        with self._lock:
+            return {backend.url: backend.state for backend in self.backends}
+
+    def _fetch_models(self, url: str, timeout: float) -> List[str]:
+        response = requests.get(f"{url}/api/tags", timeout=timeout)
+        response.raise_for_status()
+        return [m["name"] for m in response.json().get("models", [])]
+
+    def list_models(self, base_url: Optional[str] = None) -> List[str]:
+        """List available models on one Ollama server, or on every backend combined."""
+        names: List[str] = []
+        for url in [base_url] if base_url else [backend.url for backend in self.backends]:
+            try:
+                names.extend(name for name in self._fetch_models(url, REQUEST_TIMEOUT) if name not in names)
+            except Exception as e:
+                print(f"Error listing models: {e}")
+        return names
 
 # Global instance
 ollama_client = OllamaClient()
+
+@metrics.collector
+def collect_backend_circuits():
+    for url, state in ollama_client.backend_states().items():
+        circuit_open.set(0 if state == "closed" else 1, backend=url)
@@ -0,0 +1,130 @@
+"""
+Admission control for the LLM-backed endpoints.
+
+Every caller has a token bucket per endpoint class in Redis, keyed by user
+and child, so one client's retry loop only drains its own budget:
+
+  rate:{endpoint class}:{user}:{child}  hash tokens, ts  (expires once refilled)
+
+Before the bucket is charged, the model server's queue depth (LLM requests
+in flight across API processes and workers, plus calls waiting in this
+process's scheduler) is checked. Past
+DEGRADE_QUEUE_DEPTH, low-priority classes (contextual questions) are
+turned away and chat skips its follow-up question. Past SHED_QUEUE_DEPTH,
+every class is turned away. Both answer 429 with Retry-After. If Redis is
+unavailable, requests are admitted.
+"""
+from typing import Optional
+import logging
+import math
+import os
+
+from fastapi import HTTPException
+
+from app.core.llm import llm_inflight, llm_scheduler
+from app.core.metrics import metrics
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+BUCKET_KEY = "rate:{}:{}:{}"
+DEGRADE_QUEUE_DEPTH = int(os.getenv("LLM_DEGRADE_QUEUE_DEPTH", "4"))
+SHED_QUEUE_DEPTH = int(os.getenv("LLM_SHED_QUEUE_DEPTH", "8"))
+SHED_RETRY_AFTER = 10  # Seconds; about one LLM call under load
+
+# Refill with Redis' clock so every API process sees the same bucket
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= cost then
+  tokens = tokens - cost
+else
+  retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(retry_after)
+"""
+
+class RatePolicy:
+    def __init__(self, capacity: int, per_minute: float, low_priority: bool = False):
+        self.capacity = capacity  # Burst
+        self.per_second = per_minute / 60.0
+        self.low_priority = low_priority
+
+POLICIES = {
+    "chat": RatePolicy(capacity=20, per_minute=10),
+    "extract": RatePolicy(capacity=20, per_minute=10),
+    "handoff": RatePolicy(capacity=5, per_minute=2),
+    "question": RatePolicy(capacity=10, per_minute=6, low_priority=True),
+}
+
+admissions_total = metrics.counter(
+    "llm_admissions_total",
+    "Admission decisions for LLM-backed endpoints",
+    labelnames=("endpoint", "outcome")
+)
+queue_depth = metrics.gauge(
+    "llm_queue_depth",
+    "LLM requests in flight across API processes and workers, plus those queued in this process"
+)
+
+class Admission:
+    def __init__(self, queue_depth: int):
+        self.queue_depth = queue_depth
+        # Admitted, but optional LLM work (follow-up questions) should be skipped
+        self.degraded = queue_depth >= DEGRADE_QUEUE_DEPTH
+
+class AdmissionControl:
+    def __init__(self):
+        self._script = None
+
+    def admit(self, endpoint_class: str, user_id: Optional[str] = None, child_id: Optional[str] = None) -> Admission:
+        """Admit one request for this caller or raise 429 with Retry-After."""
+        policy = POLICIES[endpoint_class]
+        depth = llm_inflight.depth() + llm_scheduler.waiting()
+        shed_at = DEGRADE_QUEUE_DEPTH if policy.low_priority else SHED_QUEUE_DEPTH
+        if depth >= shed_at:
+            admissions_total.inc(endpoint=endpoint_class, outcome="overloaded")
+            raise HTTPException(
+                status_code=429,
+                detail="AI assistant is busy, please retry shortly",
+                headers={"Retry-After": str(SHED_RETRY_AFTER)}
+            )
+
+        retry_after = self._take(BUCKET_KEY.format(endpoint_class, user_id or "-", child_id or "-"), policy)
+        if retry_after > 0:
+            admissions_total.inc(endpoint=endpoint_class, outcome="rate_limited")
+            raise HTTPException(
+                status_code=429,
+                detail="Too many AI requests, please slow down",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+
+        admission = Admission(depth)
+        admissions_total.inc(endpoint=endpoint_class, outcome="degraded" if admission.degraded else "admitted")
+        return admission
+
+    def _take(self, key: str, policy: RatePolicy) -> float:
+        """Charge one token; seconds until one is available if the bucket is empty, else 0."""
+        try:
+            if self._script is None:
+                self._script = get_redis().register_script(TOKEN_BUCKET_LUA)
+            return float(self._script(keys=[key], args=[policy.capacity, policy.per_second, 1]))
+        except Exception:
+            logger.exception(f"Could not check rate limit {key}")
+            return 0.0
+
+admission_control = AdmissionControl()
+
+@metrics.collector
+def collect_llm_queue_depth():
+    queue_depth.set(llm_inflight.depth() + llm_scheduler.waiting())
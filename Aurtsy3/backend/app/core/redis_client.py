@@ -0,0 +1,21 @@
+import os
+import redis
+
+# Same Redis instance Celery uses for its broker
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+# Seconds. A hung Redis fails calls instead of stalling them; the read timeout
+# must stay above the longest blocking read (event stream XREADGROUP, 2s)
+CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "2"))
+SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+
+_client = None
+
+def get_redis() -> redis.Redis:
+    """Shared Redis client (pooled connections, str responses)."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            REDIS_URL, decode_responses=True,
+            socket_connect_timeout=CONNECT_TIMEOUT, socket_timeout=SOCKET_TIMEOUT
+        )
+    return _client
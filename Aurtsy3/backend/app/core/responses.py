@@ -0,0 +1,85 @@
+"""
+Fast JSON rendering for large listing payloads.
+
+FastJSONResponse renders with orjson and understands ORM rows and pydantic
+models itself, so listing endpoints can return it directly and skip FastAPI's
+jsonable_encoder pass over every row. It is also the app's default response
+class, where it only replaces the stdlib json.dumps of already-encoded content.
+
+Listings accept sparse fieldsets, ?fields=id,behavior_type,created_at: only
+those columns are loaded and returned (the primary key always is), so list
+views can leave heavy text and JSON columns in the database.
+"""
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import orjson
+from fastapi import HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import Query as OrmQuery, load_only
+
+# OPT_UTC_Z writes UTC as "Z", the same as pydantic, so clients see identical timestamps
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+class FastJSONResponse(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    if hasattr(obj, "__mapper__"):
+        return row_dict(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def row_dict(row: Any, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Loaded column values of an ORM row, optionally limited to `fields`.
+    Unloaded (deferred or expired) columns are left out rather than fetched.
+    """
+    loaded = inspect(row).dict
+    keys = fields if fields is not None else [attr.key for attr in row.__mapper__.column_attrs]
+    return {key: loaded[key] for key in keys if key in loaded}
+
+def sparse_fields(
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,created_at")
+) -> Optional[List[str]]:
+    """Dependency parsing ?fields= into a list of column names."""
+    if not fields:
+        return None
+    return [name.strip() for name in fields.split(",") if name.strip()]
+
+def listing_response(
+    query: OrmQuery,
+    model: type,
+    fields: Optional[List[str]] = None,
+    default_fields: Optional[Sequence[str]] = None,
+    headers: Optional[Mapping[str, str]] = None
+) -> FastJSONResponse:
+    """
+    Run a listing query loading only `fields` (else `default_fields`, else
+    every column) and render the rows. Unknown field names are a 400.
+    Pass the endpoint's Response headers (ETag, Cache-Control) to keep them.
+    """
+    headers = dict(headers) if headers else None
+    columns = fields or default_fields
+    if not columns:
+        return FastJSONResponse([row_dict(row) for row in query.all()], headers=headers)
+
+    known = {attr.key for attr in model.__mapper__.column_attrs}
+    unknown = [name for name in columns if name not in known]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    primary_key = [column.key for column in model.__mapper__.primary_key]
+    keys = primary_key + [name for name in columns if name not in primary_key]
+    rows = query.options(load_only(*[getattr(model, name) for name in keys])).all()
+    return FastJSONResponse([row_dict(row, keys) for row in rows], headers=headers)
+
+def schema_fields(schema: type, model: type) -> List[str]:
+    """Columns a response schema exposes: the default field set of a typed listing."""
+    known = {attr.key for attr in model.__mapper__.column_attrs}
+    return [name for name in schema.__fields__ if name in known]
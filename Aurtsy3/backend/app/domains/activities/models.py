@@ -1,18 +1,32 @@
-from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, JSON
+from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, JSON, Index
+from sqlalchemy.orm import column_property
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, preview_column, change_xid_column
 
 class Activity(Base):
     __tablename__ = "activities"
+    # Server defaults (created_at) are read back at flush for domain event payloads
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     child_id = Column(String(50), ForeignKey("children.id"), nullable=False)
     activity_type = Column(String(100), nullable=False)
     details = Column(JSON, nullable=True) # e.g. {"duration_minutes": 30, "notes": "..."}
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    change_xid = change_xid_column()  # Delta sync watermark
+
+    # Summary listings: the note and duration out of details, extracted in SQL
+    preview = preview_column(details["notes"].as_string())
+    duration_minutes = column_property(details["duration_minutes"], deferred=True)
+
+    __table_args__ = (
+        Index("ix_activities_child_xid", "child_id", "change_xid"),
+    )
 
 class LocationCheck(Base):
     __tablename__ = "location_checks"
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     child_id = Column(String(50), ForeignKey("children.id"), nullable=False)
@@ -23,3 +37,9 @@ class LocationCheck(Base):
     notes = Column(Text, nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    change_xid = change_xid_column()  # Delta sync watermark
+
+    __table_args__ = (
+        Index("ix_location_checks_child_xid", "child_id", "change_xid"),
+    )
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.core.database import get_db
+from app.core.responses import listing_response, schema_fields, sparse_fields
 from . import models, schemas
 
 router = APIRouter()
 
+LIST_FIELDS = schema_fields(schemas.Activity, models.Activity)
+SUMMARY_FIELDS = schema_fields(schemas.ActivitySummary, models.Activity)
+
 @router.post("/", response_model=schemas.Activity)
 def create_activity(log: schemas.ActivityCreate, db: Session = Depends(get_db)):
     db_log = models.Activity(**log.dict())
@@ -15,5 +19,14 @@ def create_activity(log: schemas.ActivityCreate, db: Session = Depends(get_db)):
     return db_log
 
 @router.get("/child/{child_id}", response_model=List[schemas.Activity])
-def get_child_activities(child_id: str, db: Session = Depends(get_db)):
-    return db.query(models.Activity).filter(models.Activity.child_id == child_id).order_by(models.Activity.created_at.desc()).all()
+def get_child_activities(child_id: str, fields: Optional[List[str]] = Depends(sparse_fields), summary: bool = False, db: Session = Depends(get_db)):
+    query = db.query(models.Activity).filter(models.Activity.child_id == child_id).order_by(models.Activity.created_at.desc())
+    return listing_response(query, models.Activity, fields, SUMMARY_FIELDS if summary else LIST_FIELDS)
+
+@router.get("/{activity_id}", response_model=schemas.Activity)
+def get_activity(activity_id: int, db: Session = Depends(get_db)):
+    """Full activity log, including the details left out of summaries."""
+    db_log = db.get(models.Activity, activity_id)
+    if db_log is None:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    return db_log
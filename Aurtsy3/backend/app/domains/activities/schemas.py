@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional, Dict, Any
+from app.core.domain_events import DomainEvent
 
 class ActivityBase(BaseModel):
     child_id: str
@@ -16,3 +17,32 @@ class Activity(ActivityBase):
 
     class Config:
         from_attributes = True
+
+class ActivitySummary(BaseModel):
+    """List view row: details are reduced to the duration and a short preview of the note."""
+    id: int
+    child_id: str
+    activity_type: str
+    duration_minutes: Optional[Any] = None
+    preview: Optional[str] = None
+    created_at: datetime
+
+class LocationCheckCreate(BaseModel):
+    child_id: str
+    latitude: str
+    longitude: str
+    location_name: Optional[str] = None
+    notes: Optional[str] = None
+
+class ActivityEvent(DomainEvent):
+    id_field = "activity_id"
+    activity_id: Optional[int] = None
+    activity_type: Optional[str] = None
+    details: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+
+class LocationCheckEvent(DomainEvent):
+    id_field = "location_check_id"
+    location_check_id: Optional[int] = None
+    location_name: Optional[str] = None
+    created_at: Optional[datetime] = None
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.rate_limit import admission_control
 from app.domains.ai import schemas, service
 
 router = APIRouter()
@@ -10,6 +11,7 @@ def get_handoff_summary(child_id: str, db: Session = Depends(get_db)):
     """
     Generates a 'Magic Handoff' summary for the specified child based on recent data.
     """
+    admission_control.admit("handoff", child_id=child_id)
     return service.ai_service.generate_handoff_summary(db, child_id)
 
 @router.post("/process_log", response_model=schemas.VoiceProcessResponse)
@@ -17,10 +19,13 @@ def process_voice_log(request: schemas.VoiceProcessRequest, db: Session = Depend
     """
     Process a natural language voice log using AI to categorize and save it.
     """
+    admission_control.admit("extract", request.user_id, request.child_id)
     return service.ai_service.process_voice_log(db, request.child_id, request.user_id, request.text)
 @router.post("/question", response_model=schemas.ContextualQuestionResponse)
 def generate_contextual_question(request: schemas.ContextualQuestionRequest, db: Session = Depends(get_db)):
     """
     Generate a smart follow-up question based on context to fill knowledge gaps.
+    Low priority: refused first when the model server is busy.
     """
+    admission_control.admit("question", child_id=request.child_id)
     return service.ai_service.generate_contextual_question(db, request.child_id, request.context)
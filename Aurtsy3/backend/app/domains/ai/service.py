@@ -6,8 +6,11 @@ from app.domains.behavior import models as behavior_models
 from app.domains.sleep import models as sleep_models
 from app.domains.activities import models as activity_models
 from app.domains.hydration import models as hydration_models
+from app.domains.analytics.service import analytics_service
+from app.core.database import end_transaction
 from app.core.llm import ollama_client
 from datetime import datetime, timedelta
+from typing import Optional
 import json
 
 class AIService:
@@ -106,6 +109,7 @@ Be empathetic, clear, and focus on what matters most to caregivers. Always refer
 
 Respond ONLY with valid JSON, no additional text."""
         
+        end_transaction(db)
         try:
             # 5. Call Ollama LLM
             response = ollama_client.chat(
@@ -151,9 +155,10 @@ Respond ONLY with valid JSON, no additional text."""
                 recommendations=["Check hydration.", "Monitor for patterns."]
             )
 
-    def process_voice_log(self, db: Session, child_id: str, user_id: str, text: str) -> schemas.VoiceProcessResponse:
+    def process_voice_log(self, db: Session, child_id: str, user_id: str, text: str, conversation: Optional[str] = None) -> schemas.VoiceProcessResponse:
         """
         Process a natural language voice log, classify it, and save to appropriate tables.
+        From chat, `conversation` (rolling summary and latest turns) resolves references and corrections.
         """
         # Import knowledge service here to avoid circular imports if any
         from app.domains.knowledge import service as knowledge_service
@@ -239,7 +244,11 @@ Response Format (JSON):
 }
 """
         user_prompt = f"Voice Note: \"{text}\""
+        if conversation:
+            # Context only: entries come from the voice note itself
+            user_prompt = f"Conversation so far (do not re-log it):\n{conversation}\n\n{user_prompt}"
 
+        end_transaction(db)
         try:
             # 2. Call LLM
             response = ollama_client.chat(
@@ -288,6 +297,8 @@ Response Format (JSON):
                         notes=data.get("notes", text)
                     )
                     db.add(new_meal)
+                    db.flush()
+                    analytics_service.record_meal(db, new_meal)
                     processed_types.append("meal")
                     
                 elif entry_type == "BEHAVIOR":
@@ -313,6 +324,8 @@ Response Format (JSON):
                         analysis_data=analysis_data
                     )
                     db.add(new_behavior)
+                    db.flush()
+                    analytics_service.record_behavior(db, new_behavior)
                     processed_types.append("behavior")
                 
                 elif entry_type == "ENTITY":
@@ -352,6 +365,8 @@ Response Format (JSON):
                     notes=f"Processed via fallback. Original error: {str(e)}"
                 )
                 db.add(fallback_behavior)
+                db.flush()
+                analytics_service.record_behavior(db, fallback_behavior)
                 db.commit()
                 
                 return schemas.VoiceProcessResponse(
@@ -366,9 +381,10 @@ Response Format (JSON):
                     message=f"Critical Error: {str(e)} | DB Error: {str(db_error)}"
                 )
 
-    def generate_contextual_question(self, db: Session, child_id: str, context: str) -> schemas.ContextualQuestionResponse:
+    def generate_contextual_question(self, db: Session, child_id: str, context: str, conversation: Optional[str] = None) -> schemas.ContextualQuestionResponse:
         """
         Generate a single, relevant follow-up question to fill knowledge gaps based on context.
+        Chat passes its `conversation` (rolling summary and latest turns); otherwise recent logs stand in.
         """
         from app.domains.knowledge import service as knowledge_service
         
@@ -376,17 +392,21 @@ Response Format (JSON):
         entities = knowledge_service.knowledge_service.list_entities(db, child_id)
         knowledge_summary = "\n".join([f"- {e.name} ({e.entity_type}): {e.resolved_value}" for e in entities])
         
-        # 2. Fetch Recent Conversation History (Last 5 logs)
+        # 2. Recent Conversation History
         # This is CRITICAL for handling corrections ("I meant X, not Y")
-        from app.domains.behavior import models as behavior_models
-        recent_logs = db.query(behavior_models.BehaviorLog).filter(
-            behavior_models.BehaviorLog.child_id == child_id
-        ).order_by(behavior_models.BehaviorLog.created_at.desc()).limit(5).all()
-        
-        # Reverse to show chronological order
-        history_text = ""
-        if recent_logs:
-            history_text = "\n".join([f"- {log.created_at.strftime('%H:%M')}: {log.notes}" for log in reversed(recent_logs)])
+        if conversation is not None:
+            history_text = conversation
+        else:
+            # No chat session: the last 5 logs stand in for the conversation
+            from app.domains.behavior import models as behavior_models
+            recent_logs = db.query(behavior_models.BehaviorLog).filter(
+                behavior_models.BehaviorLog.child_id == child_id
+            ).order_by(behavior_models.BehaviorLog.created_at.desc()).limit(5).all()
+
+            # Reverse to show chronological order
+            history_text = ""
+            if recent_logs:
+                history_text = "\n".join([f"- {log.created_at.strftime('%H:%M')}: {log.notes}" for log in reversed(recent_logs)])
         
         # 3. Construct Prompt
         system_prompt = f"""You are an inquisitive care assistant building a "User Manual" for a child with special needs.
@@ -421,6 +441,7 @@ User just logged: "{context}"
 }}
 """
         
+        end_transaction(db)
         try:
             response = ollama_client.chat(
                 messages=[{"role": "system", "content": system_prompt}],
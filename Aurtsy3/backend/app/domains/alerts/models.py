@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Boolean, Index, text
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, change_xid_column
 
 class Alert(Base):
     __tablename__ = "alerts"
@@ -15,3 +15,30 @@ class Alert(Base):
     is_acknowledged = Column(Boolean, default=False, nullable=False)
     acknowledged_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Fingerprint is (child_id, alert_type, rule_key); repeats bump the live alert instead of adding rows
+    rule_key = Column(String(100), nullable=True)
+    occurrence_count = Column(Integer, default=1, server_default="1", nullable=False)
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    change_xid = change_xid_column()  # Delta sync watermark
+
+    __table_args__ = (
+        # At most one unacknowledged alert per fingerprint
+        Index(
+            "uq_alerts_live_fingerprint",
+            "child_id",
+            "alert_type",
+            "rule_key",
+            unique=True,
+            postgresql_where=text("NOT is_acknowledged")
+        ),
+        # list_alerts: a child's live alerts, most recently seen first
+        Index(
+            "ix_alerts_child_live_seen",
+            "child_id",
+            "last_seen_at",
+            "id",
+            postgresql_where=text("NOT is_acknowledged")
+        ),
+        Index("ix_alerts_child_xid", "child_id", "change_xid"),
+    )
@@ -1,21 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.domains.alerts import schemas, service
+import asyncio
+import json
+from app.core.database import get_db, SessionLocal
+from app.core.http_cache import conditional_get
+from app.domains.alerts import schemas, service, stream
+from app.domains.children.models import ChildGuardian
 
 router = APIRouter()
 
 @router.get("/{child_id}", response_model=list[schemas.Alert])
 def list_alerts(
     child_id: str, 
+    request: Request,
+    response: Response,
     include_acknowledged: bool = False,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=500),
     db: Session = Depends(get_db)
 ):
     """
-    List all alerts for a specific child.
+    List alerts for a specific child, most recently seen first, a page at a time.
     By default, only shows unacknowledged alerts.
     """
-    alerts = service.alert_service.list_alerts(db, child_id, include_acknowledged)
+    not_modified = conditional_get(request, response, child_id, ("alerts",))
+    if not_modified:
+        return not_modified
+    alerts = service.alert_service.list_alerts(db, child_id, include_acknowledged, skip, limit)
     return [schemas.Alert.from_orm(a) for a in alerts]
 
 @router.post("/{alert_id}/acknowledge", response_model=schemas.Alert)
@@ -40,10 +52,68 @@ def analyze_patterns(child_id: str, db: Session = Depends(get_db)):
     created_alerts = []
     for alert_data in potential_alerts:
         alert = service.alert_service.create_alert(db, alert_data)
-        created_alerts.append(schemas.Alert.from_orm(alert))
+        if alert:  # None while suppressed after an acknowledgement
+            created_alerts.append(schemas.Alert.from_orm(alert))
     
     return {
         "analyzed": True,
         "alerts_created": len(created_alerts),
         "alerts": created_alerts
     }
+
+@router.get("/runs/{group_id}")
+def get_pattern_run_progress(group_id: str):
+    """
+    Progress of a nightly pattern analysis run (group_id is returned by the dispatcher task).
+    """
+    from celery.result import GroupResult
+    from app.core.celery_app import celery_app
+    
+    result = GroupResult.restore(group_id, app=celery_app)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Pattern run not found")
+    
+    return {
+        "group_id": group_id,
+        "total_chunks": len(result.results),
+        "completed_chunks": result.completed_count(),
+        "failed_chunks": sum(1 for r in result.results if r.failed()),
+        "ready": result.ready()
+    }
+
+@router.get("/stream/{user_id}")
+async def stream_alerts(user_id: str):
+    """
+    Server-sent events for every child the user is a guardian of:
+    alert_created, alert_updated and alert_acknowledged.
+    A comment heartbeat is sent every 25s. After reconnecting, clients should
+    re-fetch GET /alerts/{child_id} to pick up anything missed.
+    """
+    # Not Depends(get_db): the session would stay checked out for the life of the stream
+    db = SessionLocal()
+    try:
+        child_ids = [cid for (cid,) in db.query(ChildGuardian.child_id).filter(ChildGuardian.user_id == user_id).all()]
+    finally:
+        db.close()
+    if not child_ids:
+        raise HTTPException(status_code=404, detail="No children found for user")
+    
+    async def events():
+        connection = stream.alert_stream_hub.connect(child_ids)
+        try:
+            yield f"event: ready\ndata: {json.dumps({'child_ids': child_ids})}\n\n"
+            while not connection.overflowed:
+                try:
+                    event = await asyncio.wait_for(connection.queue.get(), timeout=stream.HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['event']}\ndata: {json.dumps(event['alert'])}\n\n"
+        finally:
+            stream.alert_stream_hub.disconnect(connection)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,197 @@
+"""
+Real-time alert rules, evaluated as logs are written instead of waiting for
+the nightly pattern run.
+
+Rule state lives in Redis so every API worker sees the same windows, and is
+bounded per child:
+  alert_rules:{child_id}:meltdowns       list, last MELTDOWN_THRESHOLD timestamps
+  alert_rules:{child_id}:last_hydration  epoch seconds of the latest drink
+  alert_rules:open_loops                 zset "<child_id>|<request>" -> due time
+  alert_rules:cooldown:{child_id}:{rule} set while the rule is cooling down
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import logging
+import time
+
+from app.core.database import SessionLocal
+from app.core.metrics import metrics
+from app.core.redis_client import get_redis
+from app.domains.alerts import schemas
+from app.domains.alerts.service import alert_service
+from app.domains.analytics.correlations import MELTDOWN_TYPES
+from app.domains.analytics.service import OPEN_REQUEST_STATUSES, normalize_request_key
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "alert_rules"
+OPEN_LOOPS_KEY = f"{KEY_PREFIX}:open_loops"
+
+# N meltdowns inside the window
+MELTDOWN_THRESHOLD = 3
+MELTDOWN_WINDOW_SECONDS = 2 * 3600
+MELTDOWN_COOLDOWN_SECONDS = 2 * 3600
+
+# No drink logged for this long while other logs keep arriving
+HYDRATION_GAP_SECONDS = 6 * 3600
+# Children with no drink at all in this long are treated as not tracking hydration
+HYDRATION_TRACKING_SECONDS = 48 * 3600
+HYDRATION_COOLDOWN_SECONDS = 6 * 3600
+
+# Denied/delayed request still unresolved after this long
+OPEN_LOOP_SECONDS = 60 * 60
+OPEN_LOOP_COOLDOWN_SECONDS = 60 * 60
+
+rule_latency = metrics.histogram(
+    "alert_rule_evaluation_seconds",
+    "Time to evaluate a real-time alert rule",
+    labelnames=("rule",)
+)
+rule_outcomes = metrics.counter(
+    "alert_rule_outcomes_total",
+    "Real-time alert rule results (fired, suppressed)",
+    labelnames=("rule", "outcome")
+)
+
+class AlertRuleEngine:
+    def register(self, bus):
+        """Subscribe the rules to the write-path events."""
+        bus.subscribe("behavior_logged", self.on_behavior_logged)
+        bus.subscribe("hydration_logged", self.on_hydration_logged)
+        bus.subscribe("meal_logged", self.on_meal_logged)
+
+    def on_behavior_logged(self, payload: Dict[str, Any]):
+        child_id = payload["child_id"]
+        occurred_at = _epoch(payload.get("created_at"))
+        behavior_type = (payload.get("behavior_type") or "").lower()
+
+        if behavior_type in MELTDOWN_TYPES:
+            with rule_latency.time(rule="meltdown_cluster"):
+                self._check_meltdown_cluster(child_id, occurred_at)
+
+        data = payload.get("analysis_data")
+        if isinstance(data, dict) and data.get("request_status"):
+            with rule_latency.time(rule="open_loop"):
+                self._track_open_loop(child_id, payload.get("behavior_log_id"), data, occurred_at)
+
+        with rule_latency.time(rule="no_hydration"):
+            self._check_hydration_gap(child_id, occurred_at)
+
+    def on_hydration_logged(self, payload: Dict[str, Any]):
+        with rule_latency.time(rule="no_hydration"):
+            key = f"{KEY_PREFIX}:{payload['child_id']}:last_hydration"
+            get_redis().set(key, _epoch(payload.get("created_at")), ex=HYDRATION_TRACKING_SECONDS)
+
+    def on_meal_logged(self, payload: Dict[str, Any]):
+        with rule_latency.time(rule="no_hydration"):
+            self._check_hydration_gap(payload["child_id"], _epoch(payload.get("created_at")))
+
+    def sweep_open_loops(self, now: Optional[float] = None) -> int:
+        """
+        Fire alerts for open loops that passed OPEN_LOOP_SECONDS without a GRANTED entry.
+        Safe to run from several processes: only the one that removes a member fires it.
+        """
+        now = now or time.time()
+        r = get_redis()
+        fired = 0
+        for member in r.zrangebyscore(OPEN_LOOPS_KEY, "-inf", now):
+            if not r.zrem(OPEN_LOOPS_KEY, member):
+                continue
+            with rule_latency.time(rule="open_loop"):
+                child_id, _, request = member.partition("|")
+                fired += self._fire(
+                    child_id,
+                    rule="open_loop",
+                    cooldown=OPEN_LOOP_COOLDOWN_SECONDS,
+                    severity="MEDIUM",
+                    title="Open Loop Waiting",
+                    description=f"A request for \"{request}\" has been unresolved for over {OPEN_LOOP_SECONDS // 60} minutes.",
+                    pattern_data={"request": request, "minutes_open": OPEN_LOOP_SECONDS // 60}
+                )
+        return fired
+
+    def _check_meltdown_cluster(self, child_id: str, occurred_at: float):
+        key = f"{KEY_PREFIX}:{child_id}:meltdowns"
+        pipe = get_redis().pipeline()
+        pipe.lpush(key, occurred_at)
+        pipe.ltrim(key, 0, MELTDOWN_THRESHOLD - 1)
+        pipe.lrange(key, 0, -1)
+        pipe.expire(key, MELTDOWN_WINDOW_SECONDS)
+        recent = [float(t) for t in pipe.execute()[2]]
+
+        if len(recent) < MELTDOWN_THRESHOLD or max(recent) - min(recent) > MELTDOWN_WINDOW_SECONDS:
+            return
+        self._fire(
+            child_id,
+            rule="meltdown_cluster",
+            cooldown=MELTDOWN_COOLDOWN_SECONDS,
+            severity="HIGH",
+            title="Meltdown Cluster",
+            description=f"{MELTDOWN_THRESHOLD} meltdowns logged within {MELTDOWN_WINDOW_SECONDS // 3600} hours.",
+            pattern_data={"count": MELTDOWN_THRESHOLD, "window_hours": MELTDOWN_WINDOW_SECONDS // 3600}
+        )
+
+    def _check_hydration_gap(self, child_id: str, occurred_at: float):
+        last = get_redis().get(f"{KEY_PREFIX}:{child_id}:last_hydration")
+        if last is None:
+            return
+        gap = occurred_at - float(last)
+        if gap <= HYDRATION_GAP_SECONDS:
+            return
+        self._fire(
+            child_id,
+            rule="no_hydration",
+            cooldown=HYDRATION_COOLDOWN_SECONDS,
+            severity="MEDIUM",
+            title="No Hydration Logged",
+            description=f"No drinks logged in the past {int(gap // 3600)} hours.",
+            pattern_data={"hours_since_last_drink": round(gap / 3600, 1)}
+        )
+
+    def _track_open_loop(self, child_id: str, behavior_log_id: Optional[int], data: Dict[str, Any], occurred_at: float):
+        status = (data.get("request_status") or "").upper()
+        request = normalize_request_key(data.get("request_object"))
+        r = get_redis()
+
+        if status in OPEN_REQUEST_STATUSES:
+            member = f"{child_id}|{request or f'log #{behavior_log_id}'}"
+            # nx: asking again keeps the original deadline
+            r.zadd(OPEN_LOOPS_KEY, {member: occurred_at + OPEN_LOOP_SECONDS}, nx=True)
+        elif status == "GRANTED" and request:
+            r.zrem(OPEN_LOOPS_KEY, f"{child_id}|{request}")
+
+    def _fire(self, child_id: str, rule: str, cooldown: int, severity: str, title: str, description: str, pattern_data: dict) -> int:
+        """Create the alert unless the rule is cooling down for this child. Returns 1 if created."""
+        cooldown_key = f"{KEY_PREFIX}:cooldown:{child_id}:{rule}"
+        if not get_redis().set(cooldown_key, 1, nx=True, ex=cooldown):
+            rule_outcomes.inc(rule=rule, outcome="suppressed")
+            return 0
+
+        db = SessionLocal()
+        try:
+            alert_service.create_alert(db, schemas.AlertCreate(
+                child_id=child_id,
+                alert_type="threshold_exceeded",
+                severity=severity,
+                title=title,
+                description=description,
+                pattern_data={**pattern_data, "rule": rule}
+            ))
+        finally:
+            db.close()
+        rule_outcomes.inc(rule=rule, outcome="fired")
+        logger.info(f"Real-time rule {rule} fired for child {child_id}")
+        return 1
+
+def _epoch(value) -> float:
+    """Event timestamps arrive as datetimes or ISO strings; naive values are UTC."""
+    if value is None:
+        return time.time()
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+# Global instance
+alert_rule_engine = AlertRuleEngine()
@@ -18,6 +18,9 @@ class Alert(AlertBase):
     is_acknowledged: bool
     acknowledged_at: Optional[datetime] = None
     created_at: datetime
+    rule_key: Optional[str] = None
+    occurrence_count: int = 1
+    last_seen_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -1,32 +1,175 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import func, case, insert, literal, literal_column, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.domains.alerts import models, schemas
+from app.domains.alerts.stream import alert_stream_hub, alert_event
 from app.domains.meals import models as meal_models
 from app.domains.children import models as child_models
-from datetime import datetime, timedelta
-from typing import List
+from app.domains.sync.models import SyncTombstone
+from app.core.database import CURRENT_XID
+from app.core.http_cache import touch
+from datetime import datetime, timedelta, timezone
+import re
+from typing import List, Dict, Optional
+
+# Once an alert is acknowledged, the same fingerprint stays quiet for this long
+SUPPRESSION_WINDOWS = {
+    "low_meal_logging_frequency": timedelta(days=3),
+    "meltdown_cluster": timedelta(hours=2),
+    "no_hydration": timedelta(hours=6),
+    "open_loop": timedelta(hours=1),
+}
+DEFAULT_SUPPRESSION_WINDOW = timedelta(days=1)
+
+# Acknowledged alerts older than this are deleted by the compaction job
+ALERT_RETENTION_DAYS = 90
+COMPACTION_BATCH_SIZE = 5000
 
 class AlertService:
-    def create_alert(self, db: Session, alert: schemas.AlertCreate) -> models.Alert:
-        """Create a new alert."""
-        db_alert = models.Alert(**alert.dict())
-        db.add(db_alert)
+    def create_alert(self, db: Session, alert: schemas.AlertCreate) -> Optional[models.Alert]:
+        """
+        Create an alert, or bump the occurrence count of the live alert with the same fingerprint.
+        Returns None when the fingerprint is inside its suppression window.
+        """
+        result = self._upsert_alerts(db, [alert.dict()])
+        db.commit()
+        if not result:
+            return None
+        
+        alert_stream_hub.publish([alert_event("alert_created" if result[0].inserted else "alert_updated", result[0])])
+        return db.query(models.Alert).filter(models.Alert.id == result[0].id).first()
+    
+    def create_alerts_bulk(
+        self,
+        db: Session,
+        alerts: List[schemas.AlertCreate],
+        run_key: Optional[str] = None
+    ) -> int:
+        """
+        Upsert many alerts in one statement and one commit.
+        With a run_key, rerunning the same run does not bump occurrence counts again.
+        Returns the number of new alerts.
+        """
+        if not alerts:
+            return 0
+        
+        rows = [a.dict() for a in alerts]
+        if run_key:
+            for row in rows:
+                row["pattern_data"] = {**(row["pattern_data"] or {}), "run_key": run_key}
+        
+        result = self._upsert_alerts(db, rows)
         db.commit()
-        db.refresh(db_alert)
-        return db_alert
+        
+        # Only new alerts are pushed; repeats of a live alert are already on the client
+        created = [r for r in result if r.inserted]
+        alert_stream_hub.publish([alert_event("alert_created", r) for r in created])
+        return len(created)
+    
+    def _upsert_alerts(self, db: Session, rows: List[dict]) -> list:
+        """Insert-or-bump by fingerprint; returns the upserted alerts (with an inserted flag), minus suppressed ones."""
+        by_fingerprint = {}
+        for row in rows:
+            row["rule_key"] = rule_key_for(row["title"], row.get("pattern_data"))
+            # Postgres cannot update the same row twice in one statement
+            by_fingerprint[(row["child_id"], row["alert_type"], row["rule_key"])] = row
+        
+        rows = self._drop_suppressed(db, list(by_fingerprint.values()))
+        if not rows:
+            return []
+        
+        stmt = pg_insert(models.Alert).values(rows)
+        excluded = stmt.excluded
+        same_run = models.Alert.pattern_data["run_key"].as_string() == excluded.pattern_data["run_key"].as_string()
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["child_id", "alert_type", "rule_key"],
+            index_where=text("NOT is_acknowledged"),
+            set_={
+                "severity": excluded.severity,
+                "title": excluded.title,
+                "description": excluded.description,
+                "pattern_data": excluded.pattern_data,
+                "occurrence_count": case((same_run, models.Alert.occurrence_count), else_=models.Alert.occurrence_count + 1),
+                "last_seen_at": func.now(),
+                "updated_at": func.now(),
+                "change_xid": literal_column(CURRENT_XID)
+            }
+        ).returning(
+            models.Alert.id,
+            models.Alert.child_id,
+            models.Alert.alert_type,
+            models.Alert.severity,
+            models.Alert.title,
+            models.Alert.rule_key,
+            models.Alert.occurrence_count,
+            literal_column("xmax = 0").label("inserted")
+        )
+        result = db.execute(stmt).all()
+        touch(db, "alerts", {r.child_id for r in result})
+        return result
+    
+    def _drop_suppressed(self, db: Session, rows: List[dict]) -> List[dict]:
+        """Skip fingerprints acknowledged within their rule's suppression window."""
+        now = datetime.now(timezone.utc)
+        longest = max([DEFAULT_SUPPRESSION_WINDOW, *SUPPRESSION_WINDOWS.values()])
+        recent = db.query(
+            models.Alert.child_id, models.Alert.alert_type, models.Alert.rule_key, func.max(models.Alert.acknowledged_at)
+        ).filter(
+            models.Alert.child_id.in_({row["child_id"] for row in rows}),
+            models.Alert.is_acknowledged == True,
+            models.Alert.acknowledged_at >= now - longest
+        ).group_by(models.Alert.child_id, models.Alert.alert_type, models.Alert.rule_key).all()
+        
+        suppressed = set()
+        for child_id, alert_type, rule_key, acknowledged_at in recent:
+            if acknowledged_at.tzinfo is None:
+                acknowledged_at = acknowledged_at.replace(tzinfo=timezone.utc)
+            if now - acknowledged_at < SUPPRESSION_WINDOWS.get(rule_key, DEFAULT_SUPPRESSION_WINDOW):
+                suppressed.add((child_id, alert_type, rule_key))
+        return [r for r in rows if (r["child_id"], r["alert_type"], r["rule_key"]) not in suppressed]
+    
+    def compact_alerts(self, db: Session, retention_days: int = ALERT_RETENTION_DAYS) -> int:
+        """Delete acknowledged alerts past retention in small batches. Returns rows deleted."""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        deleted = 0
+        while True:
+            batch = db.query(models.Alert.id).filter(
+                models.Alert.is_acknowledged == True,
+                models.Alert.acknowledged_at < cutoff
+            ).limit(COMPACTION_BATCH_SIZE).subquery()
+            # Bulk deletes skip the ORM hooks that write delta sync tombstones and bump versions
+            child_ids = db.execute(insert(SyncTombstone).from_select(
+                ["child_id", "entity", "record_id"],
+                select(models.Alert.child_id, literal("alerts"), models.Alert.id).where(
+                    models.Alert.id.in_(db.query(batch.c.id))
+                )
+            ).returning(SyncTombstone.child_id)).scalars().all()
+            touch(db, "alerts", child_ids)
+            count = db.query(models.Alert).filter(
+                models.Alert.id.in_(db.query(batch.c.id))
+            ).delete(synchronize_session=False)
+            db.commit()
+            deleted += count
+            if count < COMPACTION_BATCH_SIZE:
+                return deleted
     
     def list_alerts(
         self, 
         db: Session, 
         child_id: str,
-        include_acknowledged: bool = False
+        include_acknowledged: bool = False,
+        skip: int = 0,
+        limit: int = 100
     ) -> List[models.Alert]:
-        """List alerts for a child."""
+        """List alerts for a child, most recently seen first (live ones walk ix_alerts_child_live_seen)."""
         query = db.query(models.Alert).filter(models.Alert.child_id == child_id)
         
         if not include_acknowledged:
             query = query.filter(models.Alert.is_acknowledged == False)
         
-        return query.order_by(models.Alert.created_at.desc()).all()
+        return query.order_by(
+            models.Alert.last_seen_at.desc(), models.Alert.id.desc()
+        ).offset(skip).limit(limit).all()
     
     def acknowledge_alert(self, db: Session, alert_id: int) -> models.Alert:
         """Mark an alert as acknowledged."""
@@ -38,6 +181,8 @@ class AlertService:
         alert.acknowledged_at = datetime.utcnow()
         db.commit()
         db.refresh(alert)
+        
+        alert_stream_hub.publish([alert_event("alert_acknowledged", alert)])
         return alert
     
     def analyze_patterns(self, db: Session, child_id: str) -> List[schemas.AlertCreate]:
@@ -45,29 +190,41 @@ class AlertService:
         Analyze recent data for patterns and generate alerts.
         This is a simplified version - will be enhanced with LLM later.
         """
-        alerts_to_create = []
+        return self.analyze_patterns_batch(db, [child_id]).get(child_id, [])
+    
+    def analyze_patterns_batch(self, db: Session, child_ids: List[str]) -> Dict[str, List[schemas.AlertCreate]]:
+        """
+        Analyze a batch of children with one query per domain.
+        Returns potential alerts keyed by child_id.
+        """
+        alerts_to_create: Dict[str, List[schemas.AlertCreate]] = {child_id: [] for child_id in child_ids}
         
-        # Fetch last 7 days of meals
+        # Count last 7 days of meals per child
         seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        recent_meals = db.query(meal_models.Meal).filter(
-            meal_models.Meal.child_id == child_id,
+        meal_counts = dict(db.query(
+            meal_models.Meal.child_id, func.count(meal_models.Meal.id)
+        ).filter(
+            meal_models.Meal.child_id.in_(child_ids),
             meal_models.Meal.created_at >= seven_days_ago
-        ).all()
+        ).group_by(meal_models.Meal.child_id).all())
         
-        # Simple pattern: Check if meals are being logged regularly
-        if len(recent_meals) < 14:  # Less than 2 meals/day average
-            alerts_to_create.append(schemas.AlertCreate(
-                child_id=child_id,
-                alert_type="pattern_detected",
-                severity="MEDIUM",
-                title="Low Meal Logging Frequency",
-                description=f"Only {len(recent_meals)} meals logged in the past 7 days. Consider logging meals more consistently.",
-                pattern_data={
-                    "meal_count": len(recent_meals),
-                    "days_analyzed": 7,
-                    "average_per_day": round(len(recent_meals) / 7, 1)
-                }
-            ))
+        for child_id in child_ids:
+            meal_count = meal_counts.get(child_id, 0)
+            
+            # Simple pattern: Check if meals are being logged regularly
+            if meal_count < 14:  # Less than 2 meals/day average
+                alerts_to_create[child_id].append(schemas.AlertCreate(
+                    child_id=child_id,
+                    alert_type="pattern_detected",
+                    severity="MEDIUM",
+                    title="Low Meal Logging Frequency",
+                    description=f"Only {meal_count} meals logged in the past 7 days. Consider logging meals more consistently.",
+                    pattern_data={
+                        "meal_count": meal_count,
+                        "days_analyzed": 7,
+                        "average_per_day": round(meal_count / 7, 1)
+                    }
+                ))
         
         # TODO: Add more sophisticated pattern detection:
         # - Sleep quality correlation with behavior
@@ -77,4 +234,10 @@ class AlertService:
         
         return alerts_to_create
 
+def rule_key_for(title: str, pattern_data: Optional[dict]) -> str:
+    """Rule key for the fingerprint: the rule that raised the alert, else the slugged title."""
+    if pattern_data and pattern_data.get("rule"):
+        return str(pattern_data["rule"])[:100]
+    return re.sub(r"[^a-z0-9]+", "_", title.lower()).strip("_")[:100]
+
 alert_service = AlertService()
@@ -0,0 +1,124 @@
+"""
+Push delivery of alert changes to connected guardians.
+
+Writers publish alert events to one Redis pub/sub channel. Each API worker
+keeps a single subscriber that fans events out to its local connections by
+child_id, so thousands of idle connections cost one Redis connection per
+worker rather than one each.
+"""
+from typing import Dict, List, Set, Iterable, Optional
+import asyncio
+import json
+import logging
+
+import redis.asyncio as aioredis
+
+from app.core.metrics import metrics
+from app.core.redis_client import REDIS_URL, get_redis
+
+logger = logging.getLogger(__name__)
+
+ALERTS_CHANNEL = "alerts:events"
+
+# Events buffered per connection before a slow client is dropped
+CONNECTION_QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 25
+
+open_streams = metrics.gauge("alert_stream_connections", "Open alert stream connections in this process")
+dropped_streams = metrics.counter("alert_stream_dropped_total", "Alert streams closed because the client fell behind")
+
+class StreamConnection:
+    def __init__(self, child_ids: Iterable[str]):
+        self.child_ids = list(child_ids)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=CONNECTION_QUEUE_SIZE)
+        self.overflowed = False
+
+class AlertStreamHub:
+    def __init__(self):
+        self._connections: Dict[str, Set[StreamConnection]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    def publish(self, events: List[dict]):
+        """
+        Publish alert events (sync; called after the alert rows are committed).
+        Delivery is best-effort: a Redis outage never fails the alert write.
+        """
+        if not events:
+            return
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for event in events:
+                pipe.publish(ALERTS_CHANNEL, json.dumps(event, default=str))
+            pipe.execute()
+        except Exception:
+            logger.exception("Failed to publish alert events")
+
+    def connect(self, child_ids: Iterable[str]) -> StreamConnection:
+        """Register a connection for the given children."""
+        self._ensure_listener()
+        connection = StreamConnection(child_ids)
+        for child_id in connection.child_ids:
+            self._connections.setdefault(child_id, set()).add(connection)
+        open_streams.inc()
+        return connection
+
+    def disconnect(self, connection: StreamConnection):
+        for child_id in connection.child_ids:
+            listeners = self._connections.get(child_id)
+            if listeners is not None:
+                listeners.discard(connection)
+                if not listeners:
+                    del self._connections[child_id]
+        open_streams.dec()
+
+    def _ensure_listener(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self):
+        """Single Redis subscriber per process; reconnects after Redis errors."""
+        while True:
+            client = aioredis.Redis.from_url(REDIS_URL, decode_responses=True)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(ALERTS_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._dispatch(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Alert stream listener lost Redis; retrying")
+                await asyncio.sleep(1)
+            finally:
+                await client.aclose()
+
+    def _dispatch(self, event: dict):
+        for connection in list(self._connections.get(event.get("child_id"), ())):
+            try:
+                connection.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Client stopped reading; the stream closes and the client reconnects and re-fetches
+                if not connection.overflowed:
+                    connection.overflowed = True
+                    dropped_streams.inc()
+
+def alert_event(event_type: str, alert) -> dict:
+    """Wire format shared by every alert event."""
+    return {
+        "event": event_type,
+        "child_id": alert.child_id,
+        "alert": {
+            "id": alert.id,
+            "child_id": alert.child_id,
+            "alert_type": alert.alert_type,
+            "severity": alert.severity,
+            "title": alert.title,
+            "rule_key": alert.rule_key,
+            "occurrence_count": alert.occurrence_count,
+            "is_acknowledged": getattr(alert, "is_acknowledged", False)
+        }
+    }
+
+# Global instance
+alert_stream_hub = AlertStreamHub()
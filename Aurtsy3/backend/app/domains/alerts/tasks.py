@@ -1,33 +1,117 @@
-from celery import shared_task
+from celery import shared_task, group, chord
+from datetime import datetime
+from typing import List, Optional
+import logging
 from app.core.database import SessionLocal
 from app.domains.alerts import service as alert_service
 from app.domains.children import models as child_models
 
+logger = logging.getLogger(__name__)
+
+CHILDREN_PER_CHUNK = 500
+
 @shared_task
-def analyze_patterns_for_all_children():
+def analyze_patterns_for_all_children(run_key: Optional[str] = None):
     """
     Celery task that runs nightly to analyze patterns for all children.
-    Creates alerts if concerning patterns are detected.
+    Fans out one analyze_patterns_chunk task per chunk of child IDs and
+    collects the totals in summarize_pattern_run.
+
+    run_key identifies the run (defaults to today's UTC date); rerunning with
+    the same key does not create duplicate alerts.
     """
+    run_key = run_key or datetime.utcnow().date().isoformat()
+
     db = SessionLocal()
     try:
-        # Get all children
-        children = db.query(child_models.Child).all()
-        
-        total_alerts_created = 0
-        for child in children:
-            # Analyze patterns for this child
-            potential_alerts = alert_service.alert_service.analyze_patterns(db, child.id)
-            
-            # Create alerts
-            for alert_data in potential_alerts:
-                alert_service.alert_service.create_alert(db, alert_data)
-                total_alerts_created += 1
-        
+        chunks = list(_child_id_chunks(db, CHILDREN_PER_CHUNK))
+    finally:
+        db.close()
+
+    if not chunks:
+        return {"success": True, "run_key": run_key, "chunks": 0, "children": 0}
+
+    header = group(analyze_patterns_chunk.s(chunk, run_key) for chunk in chunks)
+    result = chord(header)(summarize_pattern_run.s(run_key))
+
+    # Saved so progress can be polled while the chunks run
+    result.parent.save()
+
+    return {
+        "success": True,
+        "run_key": run_key,
+        "chunks": len(chunks),
+        "children": sum(len(c) for c in chunks),
+        "group_id": result.parent.id,
+        "summary_task_id": result.id
+    }
+
+@shared_task(bind=True)
+def analyze_patterns_chunk(self, child_ids: List[str], run_key: str):
+    """
+    Analyze one chunk of children: one query per domain, one bulk alert insert.
+    """
+    db = SessionLocal()
+    try:
+        potential_alerts = alert_service.alert_service.analyze_patterns_batch(db, child_ids)
+        alerts = [a for child_alerts in potential_alerts.values() for a in child_alerts]
+        alerts_created = alert_service.alert_service.create_alerts_bulk(db, alerts, run_key=run_key)
+
+        logger.info(f"Pattern run {run_key}: analyzed {len(child_ids)} children, created {alerts_created} alerts")
         return {
-            "success": True,
-            "children_analyzed": len(children),
-            "alerts_created": total_alerts_created
+            "children_analyzed": len(child_ids),
+            "alerts_created": alerts_created
         }
     finally:
         db.close()
+
+@shared_task
+def summarize_pattern_run(chunk_results: List[dict], run_key: str):
+    """
+    Chord callback: totals for the whole nightly run.
+    """
+    summary = {
+        "success": True,
+        "run_key": run_key,
+        "chunks": len(chunk_results),
+        "children_analyzed": sum(r["children_analyzed"] for r in chunk_results),
+        "alerts_created": sum(r["alerts_created"] for r in chunk_results)
+    }
+    logger.info(f"Pattern run {run_key} finished: {summary}")
+    return summary
+
+def _child_id_chunks(db, size: int):
+    """Page through child IDs with keyset pagination instead of loading every Child."""
+    last_id = None
+    while True:
+        query = db.query(child_models.Child.id).order_by(child_models.Child.id)
+        if last_id is not None:
+            query = query.filter(child_models.Child.id > last_id)
+        chunk = [row.id for row in query.limit(size).all()]
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+@shared_task
+def sweep_realtime_alert_rules():
+    """
+    Fire time-based real-time rules (open loops past their deadline).
+    Runs every minute; event-driven rules fire as logs are written.
+    """
+    from app.domains.alerts.rules import alert_rule_engine
+    fired = alert_rule_engine.sweep_open_loops()
+    return {"success": True, "alerts_created": fired}
+
+@shared_task
+def compact_acknowledged_alerts():
+    """
+    Delete acknowledged alerts past retention so the alerts table stays small.
+    """
+    db = SessionLocal()
+    try:
+        deleted = alert_service.alert_service.compact_alerts(db)
+        logger.info(f"Alert compaction deleted {deleted} acknowledged alerts")
+        return {"success": True, "alerts_deleted": deleted}
+    finally:
+        db.close()
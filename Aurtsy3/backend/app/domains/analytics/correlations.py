@@ -0,0 +1,355 @@
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional
+import math
+import numpy as np
+
+from app.domains.analytics import schemas
+from app.domains.behavior.models import BehaviorLog
+from app.domains.meals.models import Meal
+from app.domains.sleep.models import SleepLog
+from app.domains.hydration.models import HydrationLog
+from app.domains.activities.models import Activity
+
+BIN_MINUTES = 15
+BINS_PER_DAY = 24 * 60 // BIN_MINUTES
+
+# Sugar crash window from the framework doc: behavior spikes 30-90 mins after intake
+SUGAR_LAG_MIN_MINUTES = 30
+SUGAR_LAG_MAX_MINUTES = 90
+SUGAR_PROFILE_MAX_MINUTES = 120
+
+# Severity weight per dysregulated behavior type; anything else counts as 0
+SEVERITY_WEIGHTS = {
+    "meltdown": 3.0,
+    "aggression": 3.0,
+    "self-harm": 3.0,
+    "tantrum": 2.0,
+    "anxiety": 1.0,
+}
+MELTDOWN_TYPES = {"meltdown", "tantrum", "aggression"}
+
+# Used only when the AI did not tag the meal with sugar_content
+HIGH_SUGAR_KEYWORDS = (
+    "candy", "cookie", "cake", "cupcake", "donut", "doughnut", "chocolate",
+    "ice cream", "soda", "juice", "lollipop", "gummy", "sweets", "popsicle",
+)
+
+MIN_DAYS = 5
+MIN_SUGAR_EXPOSURES = 3
+
+
+class CorrelationEngine:
+    """
+    Aligns each child's event streams on a shared time grid and tests lagged
+    associations between them:
+    - previous-night sleep vs next-day behavior severity (daily grid, lag 1 night)
+    - high-sugar intake vs meltdowns 30-90 minutes later (15-minute grid)
+    - daily fluid intake vs activity duration (daily grid)
+
+    All children in a batch are loaded with one query per domain and scored
+    together as (children x time) arrays.
+    """
+
+    def compute(
+        self,
+        db: Session,
+        child_ids: List[str],
+        end: Optional[datetime] = None,
+        days: int = 28
+    ) -> Dict[str, List[schemas.Insight]]:
+        if not child_ids:
+            return {}
+
+        end = to_utc_naive(end or datetime.utcnow())
+        window_end = datetime(end.year, end.month, end.day) + timedelta(days=1)
+        window_start = window_end - timedelta(days=days)
+        grid = _Grid(child_ids, window_start, days)
+
+        self._load(db, grid)
+
+        insights: Dict[str, List[schemas.Insight]] = {cid: [] for cid in child_ids}
+        for finder in (self._sleep_severity, self._sugar_meltdown, self._hydration_focus):
+            for child_id, insight in finder(grid):
+                insights[child_id].append(insight)
+        return insights
+
+    # --- Loading ---
+
+    def _load(self, db: Session, grid: "_Grid"):
+        # Sleep sessions are attributed to the day they end on (the morning after)
+        sleeps = db.query(
+            SleepLog.child_id, SleepLog.start_time, SleepLog.end_time
+        ).filter(
+            SleepLog.child_id.in_(grid.child_ids),
+            SleepLog.end_time.isnot(None),
+            SleepLog.end_time >= grid.start,
+            SleepLog.start_time < grid.end
+        ).all()
+        for child_id, start_time, end_time in sleeps:
+            hours = (end_time - start_time).total_seconds() / 3600
+            grid.add_daily(grid.sleep_hours, child_id, end_time, hours)
+
+        behaviors = db.query(
+            BehaviorLog.child_id, BehaviorLog.created_at, BehaviorLog.behavior_type
+        ).filter(
+            BehaviorLog.child_id.in_(grid.child_ids),
+            BehaviorLog.created_at >= grid.start,
+            BehaviorLog.created_at < grid.end
+        ).all()
+        for child_id, created_at, behavior_type in behaviors:
+            behavior_type = (behavior_type or "").lower()
+            grid.mark_observed(child_id, created_at)
+            grid.add_daily(grid.severity, child_id, created_at, SEVERITY_WEIGHTS.get(behavior_type, 0.0))
+            if behavior_type in MELTDOWN_TYPES:
+                grid.set_bin(grid.meltdown_bins, child_id, created_at)
+
+        meals = db.query(
+            Meal.child_id, Meal.created_at, Meal.notes, Meal.analysis_json
+        ).filter(
+            Meal.child_id.in_(grid.child_ids),
+            Meal.created_at >= grid.start,
+            Meal.created_at < grid.end
+        ).all()
+        for child_id, created_at, notes, analysis_json in meals:
+            grid.mark_observed(child_id, created_at)
+            if _is_high_sugar(notes, analysis_json):
+                grid.set_bin(grid.sugar_bins, child_id, created_at)
+
+        hydration = db.query(
+            HydrationLog.child_id, HydrationLog.created_at, HydrationLog.amount_ml
+        ).filter(
+            HydrationLog.child_id.in_(grid.child_ids),
+            HydrationLog.created_at >= grid.start,
+            HydrationLog.created_at < grid.end
+        ).all()
+        for child_id, created_at, amount_ml in hydration:
+            grid.mark_observed(child_id, created_at)
+            grid.add_daily(grid.fluid_ml, child_id, created_at, amount_ml or 0)
+
+        activities = db.query(
+            Activity.child_id, Activity.created_at, Activity.details
+        ).filter(
+            Activity.child_id.in_(grid.child_ids),
+            Activity.created_at >= grid.start,
+            Activity.created_at < grid.end
+        ).all()
+        for child_id, created_at, details in activities:
+            grid.mark_observed(child_id, created_at)
+            duration = (details or {}).get("duration_minutes") if isinstance(details, dict) else None
+            if isinstance(duration, (int, float)) and duration > 0:
+                grid.add_daily(grid.focus_minutes, child_id, created_at, duration)
+                grid.add_daily(grid.focus_count, child_id, created_at, 1)
+
+    # --- Finders ---
+
+    def _sleep_severity(self, grid: "_Grid"):
+        observed = grid.observed_days
+        severity = np.where(observed, grid.severity, np.nan)
+        r, n, p, slope = _pearson_rows(grid.sleep_hours, severity)
+
+        for i in np.flatnonzero((n >= MIN_DAYS) & (r < 0)):
+            confidence = _confidence_label(p[i], n[i])
+            if not confidence:
+                continue
+            yield grid.child_ids[i], schemas.Insight(
+                type="correlation",
+                title="Sleep Impact",
+                description=(
+                    f"Shorter nights were followed by harder days: each hour of lost sleep lined up with "
+                    f"about {abs(slope[i]):.1f} more severity points the next day "
+                    f"(r={r[i]:.2f} over {int(n[i])} days)."
+                ),
+                confidence=confidence,
+                actionable_tip="Prioritize earlier bedtime tonight.",
+                confidence_score=round(1 - float(p[i]), 3),
+                p_value=round(float(p[i]), 4),
+                effect_size=round(float(r[i]), 3),
+                lag_minutes=24 * 60,
+                sample_size=int(n[i])
+            )
+
+    def _sugar_meltdown(self, grid: "_Grid"):
+        sugar = grid.sugar_bins
+        meltdown = grid.meltdown_bins
+        observed = np.repeat(grid.observed_days, BINS_PER_DAY, axis=1)
+
+        lag_lo = SUGAR_LAG_MIN_MINUTES // BIN_MINUTES
+        lag_hi = SUGAR_LAG_MAX_MINUTES // BIN_MINUTES
+
+        # followed[c, t] = a meltdown happened within [t + lag_lo, t + lag_hi]
+        padded = np.concatenate([meltdown, np.zeros((len(grid.child_ids), lag_hi + 1), dtype=bool)], axis=1)
+        cumulative = np.concatenate([np.zeros((len(grid.child_ids), 1), dtype=int), np.cumsum(padded, axis=1)], axis=1)
+        bins = meltdown.shape[1]
+        followed = (cumulative[:, lag_hi + 1:lag_hi + 1 + bins] - cumulative[:, lag_lo:lag_lo + bins]) > 0
+
+        exposed = sugar
+        unexposed = observed & ~exposed
+        n1 = exposed.sum(axis=1)
+        n0 = unexposed.sum(axis=1)
+        k1 = (followed & exposed).sum(axis=1)
+        k0 = (followed & unexposed).sum(axis=1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            p1 = k1 / n1
+            p0 = k0 / n0
+            pooled = (k1 + k0) / (n1 + n0)
+            z = (p1 - p0) / np.sqrt(pooled * (1 - pooled) * (1 / n1 + 1 / n0))
+            risk_ratio = p1 / np.maximum(p0, 1.0 / np.maximum(n0, 1))
+        p_values = _one_sided_p(z)
+
+        # Lag profile: how often a meltdown lands exactly k bins after sugar
+        max_lag = SUGAR_PROFILE_MAX_MINUTES // BIN_MINUTES
+        profile = np.stack([
+            (sugar[:, :bins - k] & meltdown[:, k:]).sum(axis=1) for k in range(max_lag + 1)
+        ], axis=1)
+        peak_lag = (np.argmax(profile[:, lag_lo:lag_hi + 1], axis=1) + lag_lo) * BIN_MINUTES
+
+        for i in np.flatnonzero((n1 >= MIN_SUGAR_EXPOSURES) & (k1 > 0) & (p1 > p0)):
+            confidence = _confidence_label(p_values[i], n1[i])
+            if not confidence:
+                continue
+            yield grid.child_ids[i], schemas.Insight(
+                type="correlation",
+                title="Sugar Crash",
+                description=(
+                    f"Meltdowns were {risk_ratio[i]:.1f}x more likely {SUGAR_LAG_MIN_MINUTES}-{SUGAR_LAG_MAX_MINUTES} "
+                    f"minutes after high-sugar foods ({int(k1[i])} of {int(n1[i])} times, "
+                    f"most often around {int(peak_lag[i])} minutes later)."
+                ),
+                confidence=confidence,
+                actionable_tip="Pair sweets with protein, and avoid them right before transitions.",
+                confidence_score=round(1 - float(p_values[i]), 3),
+                p_value=round(float(p_values[i]), 4),
+                effect_size=round(float(risk_ratio[i]), 3),
+                lag_minutes=int(peak_lag[i]),
+                sample_size=int(n1[i])
+            )
+
+    def _hydration_focus(self, grid: "_Grid"):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            focus = grid.focus_minutes / grid.focus_count
+        fluid = np.where(grid.observed_days, grid.fluid_ml, np.nan)
+        r, n, p, slope = _pearson_rows(fluid, focus)
+
+        for i in np.flatnonzero((n >= MIN_DAYS) & (r > 0)):
+            confidence = _confidence_label(p[i], n[i])
+            if not confidence:
+                continue
+            yield grid.child_ids[i], schemas.Insight(
+                type="correlation",
+                title="Hydration & Focus",
+                description=(
+                    f"On days with more fluids, activities lasted longer: about {slope[i] * 250:.0f} extra "
+                    f"minutes per additional cup (r={r[i]:.2f} over {int(n[i])} days)."
+                ),
+                confidence=confidence,
+                actionable_tip="Keep a water bottle within reach during activities.",
+                confidence_score=round(1 - float(p[i]), 3),
+                p_value=round(float(p[i]), 4),
+                effect_size=round(float(r[i]), 3),
+                lag_minutes=0,
+                sample_size=int(n[i])
+            )
+
+
+class _Grid:
+    """Per-batch (children x days) and (children x 15-minute bins) arrays."""
+
+    def __init__(self, child_ids: List[str], start: datetime, days: int):
+        self.child_ids = list(child_ids)
+        self.index = {cid: i for i, cid in enumerate(self.child_ids)}
+        self.start = start
+        self.end = start + timedelta(days=days)
+        self.days = days
+
+        shape = (len(self.child_ids), days)
+        self.observed_days = np.zeros(shape, dtype=bool)
+        self.sleep_hours = np.full(shape, np.nan)
+        self.severity = np.zeros(shape)
+        self.fluid_ml = np.zeros(shape)
+        self.focus_minutes = np.zeros(shape)
+        self.focus_count = np.zeros(shape)
+
+        bins = (len(self.child_ids), days * BINS_PER_DAY)
+        self.sugar_bins = np.zeros(bins, dtype=bool)
+        self.meltdown_bins = np.zeros(bins, dtype=bool)
+
+    def _offset_minutes(self, ts: datetime) -> float:
+        return (to_utc_naive(ts) - self.start).total_seconds() / 60
+
+    def _day(self, ts: datetime) -> Optional[int]:
+        day = int(self._offset_minutes(ts) // (24 * 60))
+        return day if 0 <= day < self.days else None
+
+    def mark_observed(self, child_id: str, ts: datetime):
+        day = self._day(ts)
+        if day is not None:
+            self.observed_days[self.index[child_id], day] = True
+
+    def add_daily(self, array: np.ndarray, child_id: str, ts: datetime, value: float):
+        day = self._day(ts)
+        if day is None:
+            return
+        i = self.index[child_id]
+        array[i, day] = value if np.isnan(array[i, day]) else array[i, day] + value
+
+    def set_bin(self, array: np.ndarray, child_id: str, ts: datetime):
+        t = int(self._offset_minutes(ts) // BIN_MINUTES)
+        if 0 <= t < array.shape[1]:
+            array[self.index[child_id], t] = True
+
+
+def _pearson_rows(x: np.ndarray, y: np.ndarray):
+    """
+    Row-wise Pearson correlation ignoring NaNs.
+    Returns (r, n, two-sided p-value via Fisher z, least-squares slope of y on x).
+    """
+    mask = ~np.isnan(x) & ~np.isnan(y)
+    n = mask.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.where(mask, x, 0.0).sum(axis=1) / n
+        mean_y = np.where(mask, y, 0.0).sum(axis=1) / n
+        dx = np.where(mask, x - mean_x[:, None], 0.0)
+        dy = np.where(mask, y - mean_y[:, None], 0.0)
+        cov = (dx * dy).sum(axis=1)
+        var_x = (dx ** 2).sum(axis=1)
+        var_y = (dy ** 2).sum(axis=1)
+        r = cov / np.sqrt(var_x * var_y)
+        slope = cov / var_x
+        z = np.arctanh(np.clip(r, -0.999999, 0.999999)) * np.sqrt(np.maximum(n - 3, 0))
+    r = np.nan_to_num(r)
+    p = 2 * _one_sided_p(np.abs(z))
+    return r, n, np.minimum(p, 1.0), np.nan_to_num(slope)
+
+
+def _one_sided_p(z: np.ndarray) -> np.ndarray:
+    """Upper-tail normal p-value, P(Z >= z). NaN z-scores map to 1."""
+    z = np.nan_to_num(np.asarray(z, dtype=float), nan=-np.inf)
+    return np.array([0.5 * math.erfc(v / math.sqrt(2)) for v in z])
+
+
+def _confidence_label(p_value: float, n: int) -> Optional[str]:
+    if p_value < 0.01 and n >= 10:
+        return "High"
+    if p_value < 0.05:
+        return "Medium"
+    if p_value < 0.1:
+        return "Low"
+    return None
+
+
+def _is_high_sugar(notes: Optional[str], analysis_json: Optional[dict]) -> bool:
+    if isinstance(analysis_json, dict) and analysis_json.get("sugar_content"):
+        return str(analysis_json["sugar_content"]).upper() == "HIGH"
+    text = (notes or "").lower()
+    return any(keyword in text for keyword in HIGH_SUGAR_KEYWORDS)
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+correlation_engine = CorrelationEngine()
@@ -0,0 +1,75 @@
+from sqlalchemy import Column, String, Integer, Float, Date, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class IncidentHeatmapCell(Base):
+    """
+    Pre-aggregated incident counts per child, UTC day, UTC hour and behavior type.
+    Bumped as behavior logs are written so heatmap reads never scan behavior_logs.
+    """
+    __tablename__ = "incident_heatmap_cells"
+
+    child_id = Column(String(50), ForeignKey("children.id"), primary_key=True)
+    bucket_date = Column(Date, primary_key=True)  # UTC calendar day
+    hour = Column(Integer, primary_key=True)  # 0-23, UTC
+    behavior_type = Column(String(50), primary_key=True)  # lower-cased BehaviorLog.behavior_type
+    count = Column(Integer, default=0, nullable=False)
+
+class InsightCache(Base):
+    """
+    Latest correlation insights per child, written by the nightly analytics job
+    and served as-is by the API.
+    """
+    __tablename__ = "insight_cache"
+
+    child_id = Column(String(50), ForeignKey("children.id"), primary_key=True)
+    insights = Column(JSON, nullable=False)  # List of schemas.Insight dicts
+    window_start = Column(Date, nullable=False)
+    window_end = Column(Date, nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class RegulationBatteryState(Base):
+    """
+    Running per-child inputs and drains for the Regulation Battery.
+    Updated as sleep, meal and behavior rows are written; loads decay over time
+    and the decay is applied when the battery is read.
+    """
+    __tablename__ = "regulation_battery_state"
+
+    child_id = Column(String(50), ForeignKey("children.id"), primary_key=True)
+    last_sleep_start = Column(DateTime(timezone=True), nullable=True)  # Most recent completed sleep
+    last_sleep_minutes = Column(Float, nullable=True)
+    meal_load = Column(Float, default=0.0, nullable=False)  # Exponentially decayed meal count
+    meal_updated_at = Column(DateTime(timezone=True), nullable=True)
+    meltdown_load = Column(Float, default=0.0, nullable=False)  # Exponentially decayed meltdown count
+    meltdown_updated_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class OpenRequest(Base):
+    """
+    Requests that were denied, delayed or left unresolved ("Open Loops").
+    Filled in as behavior logs are written; a later GRANTED entry for the
+    same request object resolves the loop.
+    """
+    __tablename__ = "open_requests"
+
+    id = Column(Integer, primary_key=True, index=True)
+    child_id = Column(String(50), ForeignKey("children.id"), nullable=False)
+    behavior_log_id = Column(Integer, ForeignKey("behavior_logs.id"), nullable=False, unique=True)
+    request_object = Column(String(200), nullable=True)
+    request_key = Column(String(200), nullable=True)  # Normalized request_object used for matching
+    status = Column(String(20), nullable=False)  # DENIED, DELAYED, UNRESOLVED (latest)
+    opened_at = Column(DateTime(timezone=True), nullable=False)
+    resolved_at = Column(DateTime(timezone=True), nullable=True)
+    resolution = Column(String(20), nullable=True)  # GRANTED
+    resolved_by_log_id = Column(Integer, ForeignKey("behavior_logs.id"), nullable=True)
+
+    __table_args__ = (
+        # Live loops only: the open-loop endpoint never touches resolved rows
+        Index(
+            "ix_open_requests_live",
+            "child_id",
+            "opened_at",
+            postgresql_where=resolved_at.is_(None)
+        ),
+    )
@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date, datetime, timedelta
 from app.core.database import get_db
+from app.core.http_cache import conditional_get, SUMMARY_CACHE_CONTROL, SUMMARY_MAX_AGE
 from app.domains.analytics import schemas, service
 
 router = APIRouter()
 
+MAX_BATCH_CHILDREN = 200
+# Everything get_weekly_summaries reads for one child
+WEEKLY_SUMMARY_TABLES = (
+    "meals", "sleep_logs", "behavior_logs", "insight_cache", "regulation_battery_state", "open_requests"
+)
+
 @router.get("/weekly-summary/{child_id}", response_model=schemas.WeeklySummary)
 def get_weekly_summary(
     child_id: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
@@ -17,4 +28,102 @@ def get_weekly_summary(
     - ABC Analysis (Triggers & Interventions)
     - Insights (Correlations)
     """
+    # The battery decays and the windows slide, so the ETag also expires with max-age
+    not_modified = conditional_get(
+        request, response, child_id, WEEKLY_SUMMARY_TABLES, SUMMARY_CACHE_CONTROL, max_age=SUMMARY_MAX_AGE
+    )
+    if not_modified:
+        return not_modified
     return service.analytics_service.get_weekly_summary(db, child_id)
+
+@router.post("/weekly-summary/batch", response_model=schemas.BatchWeeklySummary)
+def get_weekly_summaries(request: schemas.BatchRequest, db: Session = Depends(get_db)):
+    """
+    Weekly summaries for many children in one call (caregiver and school dashboards).
+    Pass child_ids, a guardian user_id, or both.
+    """
+    child_ids = _resolve_batch(db, request)
+    return schemas.BatchWeeklySummary(
+        summaries=service.analytics_service.get_weekly_summaries(db, child_ids)
+    )
+
+@router.post("/battery/batch", response_model=schemas.BatchRegulationBattery)
+def get_regulation_batteries(request: schemas.BatchRequest, db: Session = Depends(get_db)):
+    """
+    Current Regulation Battery for many children in one call.
+    """
+    child_ids = _resolve_batch(db, request)
+    return schemas.BatchRegulationBattery(
+        batteries=service.analytics_service.get_regulation_batteries(db, child_ids)
+    )
+
+@router.get("/battery/{child_id}", response_model=schemas.RegulationBattery)
+def get_regulation_battery(child_id: str, db: Session = Depends(get_db)):
+    """
+    Get the current Regulation Battery for a child.
+    Cheap enough to poll on every screen refresh: reads one running-state row.
+    """
+    return service.analytics_service.get_regulation_battery(db, child_id)
+
+@router.get("/open-loops/{child_id}", response_model=List[schemas.OpenLoop])
+def get_open_loops(child_id: str, db: Session = Depends(get_db)):
+    """
+    Get live open loops: denied, delayed or unresolved requests from the last 4 hours
+    that have not since been granted.
+    """
+    return service.analytics_service.get_open_loops(db, child_id)
+
+@router.get("/heatmap/{child_id}", response_model=schemas.IncidentHeatmap)
+def get_incident_heatmap(
+    child_id: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    behavior_type: Optional[str] = None,
+    tz_offset_minutes: int = Query(0, ge=-14 * 60, le=14 * 60),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the Time-of-Day Heatmap: incident counts by weekday (Monday = 0) and hour.
+    Defaults to the last 30 days. Served from the pre-aggregated cube.
+    """
+    end_date = end_date or datetime.utcnow().date()
+    start_date = start_date or end_date - timedelta(days=29)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be on or before end_date")
+    
+    return service.analytics_service.get_incident_heatmap(
+        db, child_id, start_date, end_date, tz_offset_minutes, behavior_type
+    )
+
+@router.post("/heatmap/{child_id}/rebuild")
+def rebuild_incident_heatmap(child_id: str, db: Session = Depends(get_db)):
+    """
+    Recompute the heatmap cube for a child from the raw behavior logs.
+    """
+    cells = service.analytics_service.rebuild_incident_heatmap(db, child_id)
+    return {"rebuilt": True, "cells": cells}
+
+@router.get("/insights/{child_id}", response_model=schemas.InsightReport)
+def get_insights(child_id: str, db: Session = Depends(get_db)):
+    """
+    Get the cross-domain correlation insights computed by the nightly job
+    (sleep -> next-day behavior, sugar -> meltdown, hydration -> focus).
+    """
+    report = service.analytics_service.get_insight_report(db, child_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Insights have not been computed for this child yet")
+    return report
+
+@router.post("/insights/{child_id}/refresh", response_model=schemas.InsightReport)
+def refresh_insights(child_id: str, db: Session = Depends(get_db)):
+    """
+    Manually recompute correlation insights for a child.
+    """
+    service.analytics_service.refresh_insights(db, [child_id])
+    return service.analytics_service.get_insight_report(db, child_id)
+
+def _resolve_batch(db: Session, request: schemas.BatchRequest) -> List[str]:
+    child_ids = service.analytics_service.resolve_child_ids(db, request.child_ids, request.user_id)
+    if len(child_ids) > MAX_BATCH_CHILDREN:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_CHILDREN} children per batch")
+    return child_ids
@@ -8,6 +8,7 @@ class RegulationBattery(BaseModel):
     inputs: List[str] # e.g., "Good sleep (8h)", "Protein breakfast"
     drains: List[str] # e.g., "2 Unresolved requests", "Sensory overload"
     recommendation: str
+    as_of: Optional[datetime] = None
 
 class OpenLoop(BaseModel):
     id: int
@@ -33,6 +34,12 @@ class Insight(BaseModel):
     description: str
     confidence: str # High, Medium, Low
     actionable_tip: Optional[str] = None
+    # Statistical backing, set by the correlation engine
+    confidence_score: Optional[float] = None # 1 - p_value
+    p_value: Optional[float] = None
+    effect_size: Optional[float] = None # Pearson r, or risk ratio for event-lag insights
+    lag_minutes: Optional[int] = None
+    sample_size: Optional[int] = None
 
 class WeeklySummary(BaseModel):
     week_start: date
@@ -45,3 +52,35 @@ class WeeklySummary(BaseModel):
     open_loops: List[OpenLoop]
     abc_analysis: ABCAnalysis
     insights: List[Insight]
+
+class HeatmapPeak(BaseModel):
+    weekday: int # 0 = Monday
+    hour: int # 0-23, in the requested timezone
+    count: int
+
+class IncidentHeatmap(BaseModel):
+    child_id: str
+    start_date: date
+    end_date: date
+    tz_offset_minutes: int
+    total_incidents: int
+    matrix: List[List[int]] # 7 weekdays (Monday first) x 24 hours, all behavior types
+    by_behavior_type: Dict[str, List[List[int]]] # Same 7x24 layout per behavior type
+    peak: Optional[HeatmapPeak] = None
+
+class InsightReport(BaseModel):
+    child_id: str
+    window_start: date
+    window_end: date
+    computed_at: datetime
+    insights: List[Insight]
+
+class BatchRequest(BaseModel):
+    child_ids: List[str] = []
+    user_id: Optional[str] = None # Also include every child this user is a guardian of
+
+class BatchWeeklySummary(BaseModel):
+    summaries: Dict[str, WeeklySummary] # Keyed by child_id
+
+class BatchRegulationBattery(BaseModel):
+    batteries: Dict[str, RegulationBattery] # Keyed by child_id
@@ -1,94 +1,253 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
-from typing import List, Dict
+from sqlalchemy import func, literal, cast, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import datetime, timedelta, date, time, timezone
+from typing import List, Dict, Optional
 
-from app.domains.analytics import schemas
+from app.core.http_cache import touch
+from app.domains.analytics import schemas, models
+from app.domains.analytics.correlations import correlation_engine, to_utc_naive, MELTDOWN_TYPES
 from app.domains.behavior.models import BehaviorLog
 from app.domains.meals.models import Meal
 from app.domains.sleep.models import SleepLog
 from app.domains.activities.models import Activity
+from app.domains.children.models import Child, ChildGuardian
+
+# Regulation Battery decay: a meal stops counting as "recent" over roughly a day,
+# a meltdown's drain halves every 6 hours
+MEAL_HALF_LIFE_HOURS = 12.0
+MELTDOWN_HALF_LIFE_HOURS = 6.0
+REGULAR_MEAL_LOAD = 2.0 # ~3 meals spread over the last day
+MISSED_MEAL_LOAD = 1.0
+
+# Only recent unresolved requests count as open loops
+OPEN_LOOP_WINDOW = timedelta(hours=4)
+OPEN_REQUEST_STATUSES = {"DENIED", "DELAYED", "UNRESOLVED"}
 
 class AnalyticsService:
     def get_weekly_summary(self, db: Session, child_id: str) -> schemas.WeeklySummary:
+        return self.get_weekly_summaries(db, [child_id])[child_id]
+
+    def get_weekly_summaries(self, db: Session, child_ids: List[str]) -> Dict[str, schemas.WeeklySummary]:
+        """
+        Weekly summaries for many children at once (caregiver and school dashboards).
+        Each domain is queried once with child_id IN (...) and grouped by child in a single pass.
+        """
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=7)
         
         # Fetch Data
-        meals = db.query(Meal).filter(Meal.child_id == child_id, Meal.created_at >= start_date).all()
-        sleeps = db.query(SleepLog).filter(SleepLog.child_id == child_id, SleepLog.start_time >= start_date).all()
-        behaviors = db.query(BehaviorLog).filter(BehaviorLog.child_id == child_id, BehaviorLog.created_at >= start_date).all()
+        meal_counts = dict(db.query(Meal.child_id, func.count(Meal.id)).filter(
+            Meal.child_id.in_(child_ids), Meal.created_at >= start_date
+        ).group_by(Meal.child_id).all())
+        sleeps_by_child = _group_by_child(db.query(SleepLog).filter(
+            SleepLog.child_id.in_(child_ids), SleepLog.start_time >= start_date
+        ).all())
+        behaviors_by_child = _group_by_child(db.query(BehaviorLog).filter(
+            BehaviorLog.child_id.in_(child_ids), BehaviorLog.created_at >= start_date
+        ).all())
+        cached_insights = {
+            c.child_id: c for c in db.query(models.InsightCache).filter(models.InsightCache.child_id.in_(child_ids)).all()
+        }
         
         # Calculate Regulation Battery (Current Status)
-        regulation = self._calculate_regulation_battery(db, child_id)
+        batteries = self.get_regulation_batteries(db, child_ids)
         
         # Identify Open Loops
-        open_loops = self._identify_open_loops(behaviors)
-        
-        # ABC Analysis
-        abc_analysis = self._analyze_abc(behaviors)
-        
-        # Generate Insights
-        insights = self._generate_insights(sleeps, behaviors, meals)
+        open_loops = self._open_loops_by_child(db, child_ids, end_date)
         
-        # Basic Stats
-        total_sleep_mins = 0
-        for s in sleeps:
-            if s.end_time:
-                duration = (s.end_time - s.start_time).total_seconds() / 60
-                total_sleep_mins += duration
-        
-        avg_sleep_quality = sum([s.quality_rating or 0 for s in sleeps]) / len(sleeps) if sleeps else 0
-        
-        return schemas.WeeklySummary(
-            week_start=start_date.date(),
-            week_end=end_date.date(),
-            total_meals=len(meals),
-            total_sleep_hours=round(total_sleep_mins / 60.0, 1),
-            avg_sleep_quality=round(avg_sleep_quality, 1),
-            total_incidents=len(behaviors),
-            regulation_battery=regulation,
-            open_loops=open_loops,
-            abc_analysis=abc_analysis,
-            insights=insights
-        )
+        summaries = {}
+        for child_id in child_ids:
+            sleeps = sleeps_by_child.get(child_id, [])
+            behaviors = behaviors_by_child.get(child_id, [])
+            
+            # ABC Analysis
+            abc_analysis = self._analyze_abc(behaviors)
+            
+            # Insights: nightly correlation results when available, same-day heuristics otherwise
+            cached = cached_insights.get(child_id)
+            if cached:
+                insights = [schemas.Insight(**i) for i in cached.insights]
+            else:
+                insights = self._generate_insights(sleeps, behaviors)
+            
+            # Basic Stats
+            total_sleep_mins = 0
+            for s in sleeps:
+                if s.end_time:
+                    total_sleep_mins += _minutes_between(s.start_time, s.end_time)
+            
+            avg_sleep_quality = sum([s.quality_rating or 0 for s in sleeps]) / len(sleeps) if sleeps else 0
+            
+            summaries[child_id] = schemas.WeeklySummary(
+                week_start=start_date.date(),
+                week_end=end_date.date(),
+                total_meals=meal_counts.get(child_id, 0),
+                total_sleep_hours=round(total_sleep_mins / 60.0, 1),
+                avg_sleep_quality=round(avg_sleep_quality, 1),
+                total_incidents=len(behaviors),
+                regulation_battery=batteries[child_id],
+                open_loops=open_loops.get(child_id, []),
+                abc_analysis=abc_analysis,
+                insights=insights
+            )
+        return summaries
+
+    def resolve_child_ids(self, db: Session, child_ids: Optional[List[str]], user_id: Optional[str]) -> List[str]:
+        """Children named explicitly, plus every child the user is a guardian of."""
+        resolved = list(dict.fromkeys(child_ids or []))
+        if user_id:
+            guarded = db.query(ChildGuardian.child_id).filter(
+                ChildGuardian.user_id == user_id
+            ).order_by(ChildGuardian.child_id).all()
+            resolved.extend(cid for (cid,) in guarded if cid not in resolved)
+        return resolved
     
-    def _calculate_regulation_battery(self, db: Session, child_id: str) -> schemas.RegulationBattery:
-        # Look at last 24 hours
-        since = datetime.utcnow() - timedelta(hours=24)
+    # --- Regulation Battery ---
+
+    def get_regulation_battery(self, db: Session, child_id: str, now: Optional[datetime] = None) -> schemas.RegulationBattery:
+        """
+        Current battery level from the child's running state (single primary-key read).
+        Read-only: a child with no state row yet gets one computed from the logs
+        but not saved; writes and the nightly task create the row.
+        """
+        return self.get_regulation_batteries(db, [child_id], now)[child_id]
+
+    def get_regulation_batteries(self, db: Session, child_ids: List[str], now: Optional[datetime] = None) -> Dict[str, schemas.RegulationBattery]:
+        """Batteries for many children with a single IN query over the running state."""
+        now = now or datetime.utcnow()
+        states = {
+            s.child_id: s for s in db.query(models.RegulationBatteryState).filter(
+                models.RegulationBatteryState.child_id.in_(child_ids)
+            ).all()
+        }
+        missing = [cid for cid in child_ids if cid not in states]
+        if missing:
+            known = {cid for (cid,) in db.query(Child.id).filter(Child.id.in_(missing)).all()}
+            for child_id in missing:
+                # Transient: never added to the session, so reads don't write (or commit
+                # and expire the caller's loaded rows); unknown children stay empty
+                state = models.RegulationBatteryState(child_id=child_id, meal_load=0.0, meltdown_load=0.0)
+                if child_id in known:
+                    self._seed_battery_state(db, state)
+                states[child_id] = state
+        return {child_id: self._battery_from_state(states[child_id], now) for child_id in child_ids}
+
+    def seed_battery_states(self, db: Session, child_ids: List[str]) -> int:
+        """Create the running state for children that have none yet, in one commit. Returns how many."""
+        existing = {cid for (cid,) in db.query(models.RegulationBatteryState.child_id).filter(
+            models.RegulationBatteryState.child_id.in_(child_ids)
+        ).all()}
+        seeded = 0
+        for child_id in child_ids:
+            if child_id in existing:
+                continue
+            state, created = self._lock_battery_state(db, child_id)
+            if created:
+                self._seed_battery_state(db, state)
+                seeded += 1
+        db.commit()
+        return seeded
+
+    def rebuild_battery_state(self, db: Session, child_id: str) -> models.RegulationBatteryState:
+        """Recompute a child's running battery state from recent logs and commit it."""
+        state, _ = self._lock_battery_state(db, child_id)
+        self._seed_battery_state(db, state)
+        db.commit()
+        db.refresh(state)
+        return state
+
+    def record_meal(self, db: Session, meal: Meal) -> None:
+        """Apply a newly written (flushed) meal to the battery inputs. The caller commits."""
+        state, created = self._lock_battery_state(db, meal.child_id)
+        if created:
+            # Seeding from the logs already includes this meal
+            self._seed_battery_state(db, state)
+            return
+        state.meal_load, state.meal_updated_at = _decayed_add(
+            state.meal_load, state.meal_updated_at, meal.created_at or datetime.utcnow(), MEAL_HALF_LIFE_HOURS
+        )
+
+    def record_sleep(self, db: Session, sleep: SleepLog) -> None:
+        """Apply a completed (flushed) sleep log to the battery inputs. The caller commits."""
+        if not sleep.end_time:
+            return
+        state, created = self._lock_battery_state(db, sleep.child_id)
+        if created:
+            self._seed_battery_state(db, state)
+            return
+        if state.last_sleep_start is None or to_utc_naive(sleep.start_time) >= to_utc_naive(state.last_sleep_start):
+            state.last_sleep_start = sleep.start_time
+            state.last_sleep_minutes = _minutes_between(sleep.start_time, sleep.end_time)
+
+    def _lock_battery_state(self, db: Session, child_id: str):
+        """Get-or-create the child's state row, locked for update. Returns (state, created)."""
+        result = db.execute(
+            pg_insert(models.RegulationBatteryState)
+            .values(child_id=child_id, meal_load=0.0, meltdown_load=0.0)
+            .on_conflict_do_nothing(index_elements=["child_id"])
+        )
+        state = db.query(models.RegulationBatteryState).filter(
+            models.RegulationBatteryState.child_id == child_id
+        ).with_for_update().populate_existing().one()
+        return state, result.rowcount == 1
+
+    def _seed_battery_state(self, db: Session, state: models.RegulationBatteryState) -> None:
+        # Older events have decayed to (almost) nothing
+        now = datetime.utcnow()
+        since = now - timedelta(hours=48)
         
-        sleep = db.query(SleepLog).filter(SleepLog.child_id == child_id, SleepLog.start_time >= since).order_by(SleepLog.start_time.desc()).first()
-        meals = db.query(Meal).filter(Meal.child_id == child_id, Meal.created_at >= since).all()
-        behaviors = db.query(BehaviorLog).filter(BehaviorLog.child_id == child_id, BehaviorLog.created_at >= since).all()
+        sleep = db.query(SleepLog).filter(
+            SleepLog.child_id == state.child_id,
+            SleepLog.end_time.isnot(None)
+        ).order_by(SleepLog.start_time.desc()).first()
+        meal_times = db.query(Meal.created_at).filter(
+            Meal.child_id == state.child_id,
+            Meal.created_at >= since
+        ).all()
+        meltdown_times = db.query(BehaviorLog.created_at).filter(
+            BehaviorLog.child_id == state.child_id,
+            BehaviorLog.created_at >= since,
+            func.lower(BehaviorLog.behavior_type).in_(MELTDOWN_TYPES)
+        ).all()
         
+        state.last_sleep_start = sleep.start_time if sleep else None
+        state.last_sleep_minutes = _minutes_between(sleep.start_time, sleep.end_time) if sleep else None
+        state.meal_load = sum(_decay_factor(to_utc_naive(t), now, MEAL_HALF_LIFE_HOURS) for (t,) in meal_times)
+        state.meal_updated_at = now
+        state.meltdown_load = sum(_decay_factor(to_utc_naive(t), now, MELTDOWN_HALF_LIFE_HOURS) for (t,) in meltdown_times)
+        state.meltdown_updated_at = now
+
+    def _battery_from_state(self, state: models.RegulationBatteryState, now: datetime) -> schemas.RegulationBattery:
         level = 70 # Baseline
         inputs = []
         drains = []
         
-        # Sleep Impact
-        if sleep and sleep.end_time:
-            duration_mins = (sleep.end_time - sleep.start_time).total_seconds() / 60
-            if duration_mins > 480: # > 8 hours
+        # Sleep Impact (most recent sleep that started in the last 24 hours)
+        if state.last_sleep_start and state.last_sleep_minutes is not None \
+                and now - to_utc_naive(state.last_sleep_start) <= timedelta(hours=24):
+            if state.last_sleep_minutes > 480: # > 8 hours
                 level += 20
                 inputs.append("Good sleep (>8h)")
-            elif duration_mins < 360: # < 6 hours
+            elif state.last_sleep_minutes < 360: # < 6 hours
                 level -= 20
                 drains.append("Poor sleep (<6h)")
         
         # Meal Impact
-        if len(meals) >= 3:
+        meal_load = _decayed(state.meal_load, state.meal_updated_at, now, MEAL_HALF_LIFE_HOURS)
+        if meal_load >= REGULAR_MEAL_LOAD:
             level += 10
             inputs.append("Regular meals")
-        elif len(meals) < 2:
+        elif meal_load < MISSED_MEAL_LOAD:
             level -= 10
             drains.append("Missed meals")
-            
-        # Behavior Impact
-        meltdowns = [b for b in behaviors if b.behavior_type.lower() in ["meltdown", "tantrum", "aggression"]]
-        if meltdowns:
-            level -= (15 * len(meltdowns))
-            drains.append(f"{len(meltdowns)} Meltdowns")
-            
+        
+        # Behavior Impact (recent meltdowns weigh more than older ones)
+        meltdown_load = _decayed(state.meltdown_load, state.meltdown_updated_at, now, MELTDOWN_HALF_LIFE_HOURS)
+        if meltdown_load >= 0.5:
+            level -= round(15 * meltdown_load)
+            drains.append(f"{max(1, round(meltdown_load))} Meltdowns")
+        
         # Cap level
         level = max(0, min(100, level))
         
@@ -100,33 +259,84 @@ class AnalyticsService:
             status=status,
             inputs=inputs,
             drains=drains,
-            recommendation=recommendation
+            recommendation=recommendation,
+            as_of=now
         )
 
-    def _identify_open_loops(self, behaviors: List[BehaviorLog]) -> List[schemas.OpenLoop]:
-        loops = []
-        now = datetime.utcnow()
+    # --- Open Loops ---
+
+    def get_open_loops(self, db: Session, child_id: str, now: Optional[datetime] = None) -> List[schemas.OpenLoop]:
+        """
+        Live (unresolved, recent) open loops for a child.
+        Served from the open_requests side table via its partial index on live rows.
+        """
+        return self._open_loops_by_child(db, [child_id], now or datetime.utcnow()).get(child_id, [])
+
+    def _open_loops_by_child(self, db: Session, child_ids: List[str], now: datetime) -> Dict[str, List[schemas.OpenLoop]]:
+        since = (now - OPEN_LOOP_WINDOW).replace(tzinfo=timezone.utc)
         
-        for b in behaviors:
-            # Check analysis_data for request status
-            if b.analysis_data:
-                data = b.analysis_data
-                if isinstance(data, dict):
-                    status = data.get("request_status", "").upper()
-                    if status in ["DENIED", "DELAYED", "UNRESOLVED"]:
-                        # Only recent ones (last 4 hours) matter for open loops
-                        elapsed = (now - b.created_at.replace(tzinfo=None)).total_seconds() / 60
-                        if elapsed < 240: # 4 hours
-                            loops.append(schemas.OpenLoop(
-                                id=b.id,
-                                request_object=data.get("request_object") or "Unknown request",
-                                status=status,
-                                timestamp=b.created_at,
-                                time_elapsed_minutes=int(elapsed),
-                                risk_level="High" if elapsed < 60 else "Medium"
-                            ))
+        requests = db.query(models.OpenRequest).filter(
+            models.OpenRequest.child_id.in_(child_ids),
+            models.OpenRequest.resolved_at.is_(None),
+            models.OpenRequest.opened_at >= since
+        ).order_by(models.OpenRequest.opened_at.desc()).all()
+        
+        loops: Dict[str, List[schemas.OpenLoop]] = {}
+        for r in requests:
+            elapsed = (now - to_utc_naive(r.opened_at)).total_seconds() / 60
+            loops.setdefault(r.child_id, []).append(schemas.OpenLoop(
+                id=r.behavior_log_id,
+                request_object=r.request_object or "Unknown request",
+                status=r.status,
+                timestamp=r.opened_at,
+                time_elapsed_minutes=int(elapsed),
+                risk_level="High" if elapsed < 60 else "Medium"
+            ))
         return loops
 
+    def _record_request(self, db: Session, behavior: BehaviorLog, occurred_at: datetime) -> None:
+        data = behavior.analysis_data
+        if not isinstance(data, dict):
+            return
+        status = (data.get("request_status") or "").upper()
+        request_object = data.get("request_object")
+        request_key = normalize_request_key(request_object)
+        # Free text from the LLM; the column holds 200 characters
+        request_object = str(request_object)[:200] if request_object else None
+        
+        if status in OPEN_REQUEST_STATUSES:
+            # Asking again for something still pending keeps the original open time;
+            # one that has aged out of the open-loop window opens a new loop
+            existing = None
+            if request_key:
+                existing = db.query(models.OpenRequest).filter(
+                    models.OpenRequest.child_id == behavior.child_id,
+                    models.OpenRequest.request_key == request_key,
+                    models.OpenRequest.resolved_at.is_(None),
+                    models.OpenRequest.opened_at >= (occurred_at - OPEN_LOOP_WINDOW).replace(tzinfo=timezone.utc)
+                ).order_by(models.OpenRequest.opened_at.desc()).first()
+            if existing:
+                existing.status = status
+            else:
+                db.add(models.OpenRequest(
+                    child_id=behavior.child_id,
+                    behavior_log_id=behavior.id,
+                    request_object=request_object,
+                    request_key=request_key,
+                    status=status,
+                    opened_at=occurred_at.replace(tzinfo=timezone.utc)
+                ))
+        elif status == "GRANTED" and request_key:
+            db.query(models.OpenRequest).filter(
+                models.OpenRequest.child_id == behavior.child_id,
+                models.OpenRequest.request_key == request_key,
+                models.OpenRequest.resolved_at.is_(None)
+            ).update({
+                models.OpenRequest.resolved_at: occurred_at.replace(tzinfo=timezone.utc),
+                models.OpenRequest.resolution: status,
+                models.OpenRequest.resolved_by_log_id: behavior.id
+            }, synchronize_session=False)
+
     def _analyze_abc(self, behaviors: List[BehaviorLog]) -> schemas.ABCAnalysis:
         triggers = {}
         interventions = {}
@@ -159,7 +369,7 @@ class AnalyticsService:
             total_incidents=total
         )
 
-    def _generate_insights(self, sleeps: List[SleepLog], behaviors: List[BehaviorLog], meals: List[Meal]) -> List[schemas.Insight]:
+    def _generate_insights(self, sleeps: List[SleepLog], behaviors: List[BehaviorLog]) -> List[schemas.Insight]:
         insights = []
         
         # Sleep-Behavior Correlation
@@ -186,4 +396,228 @@ class AnalyticsService:
             
         return insights
 
+    # --- Correlation Insights ---
+
+    def refresh_insights(self, db: Session, child_ids: List[str], days: int = 28) -> int:
+        """
+        Run the correlation engine for a batch of children and upsert their cached insights.
+        Returns the number of children refreshed.
+        """
+        if not child_ids:
+            return 0
+        
+        window_end = datetime.utcnow().date()
+        window_start = window_end - timedelta(days=days - 1)
+        results = correlation_engine.compute(db, child_ids, days=days)
+        
+        rows = [
+            {
+                "child_id": child_id,
+                "insights": [i.dict() for i in insights],
+                "window_start": window_start,
+                "window_end": window_end,
+                "computed_at": datetime.utcnow()
+            }
+            for child_id, insights in results.items()
+        ]
+        stmt = pg_insert(models.InsightCache).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["child_id"],
+            set_={
+                "insights": stmt.excluded.insights,
+                "window_start": stmt.excluded.window_start,
+                "window_end": stmt.excluded.window_end,
+                "computed_at": stmt.excluded.computed_at
+            }
+        )
+        db.execute(stmt)
+        touch(db, "insight_cache", results.keys())
+        db.commit()
+        return len(rows)
+
+    def get_insight_report(self, db: Session, child_id: str) -> Optional[schemas.InsightReport]:
+        """Return the cached correlation insights for a child, if the nightly job has run."""
+        cached = db.query(models.InsightCache).filter(models.InsightCache.child_id == child_id).first()
+        if not cached:
+            return None
+        return schemas.InsightReport(
+            child_id=cached.child_id,
+            window_start=cached.window_start,
+            window_end=cached.window_end,
+            computed_at=cached.computed_at,
+            insights=[schemas.Insight(**i) for i in cached.insights]
+        )
+
+    # --- Write-through Updates ---
+
+    def record_behavior(self, db: Session, behavior: BehaviorLog) -> None:
+        """
+        Apply a newly written (flushed) behavior log to the heatmap cube, open requests
+        and the battery drains.
+        Runs inside the caller's transaction; the caller commits.
+        """
+        occurred_at = to_utc_naive(behavior.created_at or datetime.utcnow())
+        behavior_type = (behavior.behavior_type or "unknown").lower()
+        
+        stmt = pg_insert(models.IncidentHeatmapCell).values(
+            child_id=behavior.child_id,
+            bucket_date=occurred_at.date(),
+            hour=occurred_at.hour,
+            behavior_type=behavior_type,
+            count=1
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["child_id", "bucket_date", "hour", "behavior_type"],
+            set_={"count": models.IncidentHeatmapCell.count + 1}
+        )
+        db.execute(stmt)
+        
+        self._record_request(db, behavior, occurred_at)
+        
+        if behavior_type in MELTDOWN_TYPES:
+            state, created = self._lock_battery_state(db, behavior.child_id)
+            if created:
+                self._seed_battery_state(db, state)
+                return
+            state.meltdown_load, state.meltdown_updated_at = _decayed_add(
+                state.meltdown_load, state.meltdown_updated_at, occurred_at, MELTDOWN_HALF_LIFE_HOURS
+            )
+
+    # --- Time-of-Day Heatmap ---
+
+    def rebuild_incident_heatmap(self, db: Session, child_id: str) -> int:
+        """
+        Recompute a child's heatmap cube from BehaviorLog (backfill or repair).
+        Returns the number of cells written.
+        """
+        db.query(models.IncidentHeatmapCell).filter(
+            models.IncidentHeatmapCell.child_id == child_id
+        ).delete(synchronize_session=False)
+        
+        utc_created = func.timezone("UTC", BehaviorLog.created_at)
+        bucket_date = func.date(utc_created)
+        hour = cast(func.extract("hour", utc_created), Integer)
+        behavior_type = func.lower(BehaviorLog.behavior_type)
+        
+        select_cells = db.query(
+            literal(child_id),
+            bucket_date,
+            hour,
+            behavior_type,
+            func.count(BehaviorLog.id)
+        ).filter(
+            BehaviorLog.child_id == child_id
+        ).group_by(bucket_date, hour, behavior_type)
+        
+        result = db.execute(
+            models.IncidentHeatmapCell.__table__.insert().from_select(
+                ["child_id", "bucket_date", "hour", "behavior_type", "count"],
+                select_cells.statement
+            )
+        )
+        db.commit()
+        return result.rowcount
+
+    def get_incident_heatmap(
+        self,
+        db: Session,
+        child_id: str,
+        start_date: date,
+        end_date: date,
+        tz_offset_minutes: int = 0,
+        behavior_type: Optional[str] = None
+    ) -> schemas.IncidentHeatmap:
+        """
+        Build the 7x24 (weekday x hour) incident matrix for a date range from the cube.
+        Cells are stored in UTC hours and shifted to the caller's timezone here.
+        """
+        offset = timedelta(minutes=tz_offset_minutes)
+        
+        # Widen by a day on each side so cells that shift across midnight are included
+        query = db.query(models.IncidentHeatmapCell).filter(
+            models.IncidentHeatmapCell.child_id == child_id,
+            models.IncidentHeatmapCell.bucket_date >= start_date - timedelta(days=1),
+            models.IncidentHeatmapCell.bucket_date <= end_date + timedelta(days=1)
+        )
+        if behavior_type:
+            query = query.filter(models.IncidentHeatmapCell.behavior_type == behavior_type.lower())
+        
+        matrix = _empty_week_matrix()
+        by_type: Dict[str, List[List[int]]] = {}
+        total = 0
+        
+        for cell in query.all():
+            local = datetime.combine(cell.bucket_date, time(hour=cell.hour)) + offset
+            if local.date() < start_date or local.date() > end_date:
+                continue
+            
+            weekday, hour = local.weekday(), local.hour
+            if cell.behavior_type not in by_type:
+                by_type[cell.behavior_type] = _empty_week_matrix()
+            by_type[cell.behavior_type][weekday][hour] += cell.count
+            matrix[weekday][hour] += cell.count
+            total += cell.count
+        
+        peak = None
+        if total:
+            weekday, hour = max(
+                ((d, h) for d in range(7) for h in range(24)),
+                key=lambda dh: matrix[dh[0]][dh[1]]
+            )
+            peak = schemas.HeatmapPeak(weekday=weekday, hour=hour, count=matrix[weekday][hour])
+        
+        return schemas.IncidentHeatmap(
+            child_id=child_id,
+            start_date=start_date,
+            end_date=end_date,
+            tz_offset_minutes=tz_offset_minutes,
+            total_incidents=total,
+            matrix=matrix,
+            by_behavior_type=by_type,
+            peak=peak
+        )
+
+def _group_by_child(rows) -> Dict[str, list]:
+    grouped: Dict[str, list] = {}
+    for row in rows:
+        grouped.setdefault(row.child_id, []).append(row)
+    return grouped
+
+def normalize_request_key(request_object: Optional[str]) -> Optional[str]:
+    """Normalize a request object so "the iPad" and "iPad" match."""
+    if not request_object:
+        return None
+    key = " ".join(str(request_object).lower().split())
+    for article in ("the ", "a ", "an ", "some ", "my ", "his ", "her "):
+        if key.startswith(article):
+            key = key[len(article):]
+            break
+    return key[:200] or None
+
+def _minutes_between(start: datetime, end: datetime) -> float:
+    return (to_utc_naive(end) - to_utc_naive(start)).total_seconds() / 60
+
+def _decay_factor(at: datetime, now: datetime, half_life_hours: float) -> float:
+    hours = max(0.0, (now - at).total_seconds() / 3600)
+    return 0.5 ** (hours / half_life_hours)
+
+def _decayed(load: float, updated_at: Optional[datetime], now: datetime, half_life_hours: float) -> float:
+    if not load or updated_at is None:
+        return 0.0
+    return load * _decay_factor(to_utc_naive(updated_at), now, half_life_hours)
+
+def _decayed_add(load: float, updated_at: Optional[datetime], at: datetime, half_life_hours: float):
+    """Add one event at `at` to a decayed load. Returns the new (load, updated_at)."""
+    at = to_utc_naive(at)
+    if not load or updated_at is None:
+        return 1.0, at.replace(tzinfo=timezone.utc)
+    updated_at = to_utc_naive(updated_at)
+    if at >= updated_at:
+        return load * _decay_factor(updated_at, at, half_life_hours) + 1.0, at.replace(tzinfo=timezone.utc)
+    # Late-arriving (backdated) event: decay the event itself instead
+    return load + _decay_factor(at, updated_at, half_life_hours), updated_at.replace(tzinfo=timezone.utc)
+
+def _empty_week_matrix() -> List[List[int]]:
+    return [[0] * 24 for _ in range(7)]
+
 analytics_service = AnalyticsService()
@@ -0,0 +1,40 @@
+from celery import shared_task
+from app.core.database import SessionLocal
+from app.domains.analytics import service as analytics_service
+from app.domains.children import models as child_models
+
+CHILDREN_PER_BATCH = 200
+
+@shared_task
+def compute_insights_for_all_children():
+    """
+    Celery task that runs nightly to refresh correlation insights for all children.
+    Children are processed in batches so each domain is queried once per batch.
+    Also creates the regulation battery state of children that have none yet,
+    so battery reads stay read-only.
+    """
+    db = SessionLocal()
+    try:
+        children_refreshed = 0
+        batteries_seeded = 0
+        last_id = None
+        
+        while True:
+            query = db.query(child_models.Child.id).order_by(child_models.Child.id)
+            if last_id is not None:
+                query = query.filter(child_models.Child.id > last_id)
+            child_ids = [row.id for row in query.limit(CHILDREN_PER_BATCH).all()]
+            if not child_ids:
+                break
+            
+            children_refreshed += analytics_service.analytics_service.refresh_insights(db, child_ids)
+            batteries_seeded += analytics_service.analytics_service.seed_battery_states(db, child_ids)
+            last_id = child_ids[-1]
+        
+        return {
+            "success": True,
+            "children_refreshed": children_refreshed,
+            "batteries_seeded": batteries_seeded
+        }
+    finally:
+        db.close()
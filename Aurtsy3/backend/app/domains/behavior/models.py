@@ -1,9 +1,11 @@
-from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, JSON
+from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, JSON, Index
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, preview_column, change_xid_column
 
 class BehaviorLog(Base):
     __tablename__ = "behavior_logs"
+    # Server defaults (created_at) are read back at flush for domain event payloads
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     child_id = Column(String(50), ForeignKey("children.id"), nullable=False)
@@ -13,3 +15,12 @@ class BehaviorLog(Base):
     notes = Column(Text, nullable=True)
     analysis_data = Column(JSON, nullable=True) # Structured ABC data, request status, etc.
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    change_xid = change_xid_column()  # Delta sync watermark
+
+    # Summary listings: start of the description (else the notes), truncated in SQL
+    preview = preview_column(func.coalesce(incident_description, notes))
+
+    __table_args__ = (
+        Index("ix_behavior_logs_child_xid", "child_id", "change_xid"),
+    )
@@ -1,19 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.core.database import get_db
+from app.core.responses import listing_response, schema_fields, sparse_fields
+from app.domains.analytics.service import analytics_service
 from . import models, schemas
 
 router = APIRouter()
 
+LIST_FIELDS = schema_fields(schemas.BehaviorLog, models.BehaviorLog)
+SUMMARY_FIELDS = schema_fields(schemas.BehaviorLogSummary, models.BehaviorLog)
+
 @router.post("/", response_model=schemas.BehaviorLog)
 def create_behavior_log(log: schemas.BehaviorLogCreate, db: Session = Depends(get_db)):
     db_log = models.BehaviorLog(**log.dict())
     db.add(db_log)
+    db.flush()
+    analytics_service.record_behavior(db, db_log)
     db.commit()
     db.refresh(db_log)
     return db_log
 
 @router.get("/child/{child_id}", response_model=List[schemas.BehaviorLog])
-def get_child_behavior_logs(child_id: str, db: Session = Depends(get_db)):
-    return db.query(models.BehaviorLog).filter(models.BehaviorLog.child_id == child_id).order_by(models.BehaviorLog.created_at.desc()).all()
+def get_child_behavior_logs(child_id: str, fields: Optional[List[str]] = Depends(sparse_fields), summary: bool = False, db: Session = Depends(get_db)):
+    query = db.query(models.BehaviorLog).filter(models.BehaviorLog.child_id == child_id).order_by(models.BehaviorLog.created_at.desc())
+    return listing_response(query, models.BehaviorLog, fields, SUMMARY_FIELDS if summary else LIST_FIELDS)
+
+@router.get("/{log_id}", response_model=schemas.BehaviorLog)
+def get_behavior_log(log_id: int, db: Session = Depends(get_db)):
+    """Full behavior log, including the description, notes and analysis data left out of summaries."""
+    db_log = db.get(models.BehaviorLog, log_id)
+    if db_log is None:
+        raise HTTPException(status_code=404, detail="Behavior log not found")
+    return db_log
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, Any
+from app.core.domain_events import DomainEvent
 
 class BehaviorLogBase(BaseModel):
     child_id: str
@@ -14,7 +15,25 @@ class BehaviorLogCreate(BehaviorLogBase):
 
 class BehaviorLog(BehaviorLogBase):
     id: int
+    analysis_data: Optional[Dict[str, Any]] = None
     created_at: datetime
 
     class Config:
         from_attributes = True
+
+class BehaviorLogSummary(BaseModel):
+    """List view row: the description and notes are reduced to a short preview."""
+    id: int
+    child_id: str
+    behavior_type: str
+    mood_rating: Optional[int] = None
+    preview: Optional[str] = None
+    created_at: datetime
+
+class BehaviorEvent(DomainEvent):
+    id_field = "behavior_log_id"
+    behavior_log_id: Optional[int] = None
+    behavior_type: Optional[str] = None
+    mood_rating: Optional[int] = None
+    analysis_data: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, Boolean, Enum
+from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, Boolean, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -11,14 +11,20 @@ class MessageRole(str, enum.Enum):
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    # Server defaults (created_at) are read back at flush for domain event payloads
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     child_id = Column(String(50), ForeignKey("children.id"), nullable=False)
     
     # Session management
     is_active = Column(Boolean, default=True)
-    last_activity_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    last_activity_at = Column(DateTime(timezone=True), server_default=func.now())  # Set on send only
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    # Rolling memory: older turns condensed by the summary model, up to and including this message id
+    summary = Column(Text, nullable=True)
+    summarized_through_id = Column(Integer, nullable=True)
     
     # Relationships
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
@@ -26,6 +32,7 @@ class ChatSession(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("chat_sessions.id"), nullable=False)
@@ -39,3 +46,8 @@ class ChatMessage(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
     session = relationship("ChatSession", back_populates="messages")
+
+    __table_args__ = (
+        # History pages and the recent-message window: (created_at, id) keyset within a session
+        Index("ix_chat_messages_session_created", "session_id", "created_at", "id"),
+    )
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from typing import Optional
 from app.core.database import get_db
+from app.core.llm import INTERACTIVE, llm_priority
+from app.core.rate_limit import admission_control
 from app.domains.chat import schemas, service
 
 router = APIRouter()
@@ -11,12 +14,25 @@ def send_message(request: schemas.SendMessageRequest, db: Session = Depends(get_
     Send a message to the AI assistant.
     Auto-creates a session if needed.
     Returns the User message (saved) and the AI response.
+    Under load the follow-up question is skipped; past the shedding threshold this is a 429.
     """
-    return service.chat_service.process_message(db, request.child_id, request.user_id, request.content)
+    admission = admission_control.admit("chat", request.user_id, request.child_id)
+    # A caregiver is waiting on the reply: dispatch ahead of extraction and batch work
+    with llm_priority(INTERACTIVE):
+        return service.chat_service.process_message(
+            db, request.child_id, request.user_id, request.content,
+            ask_question=not admission.degraded
+        )
 
-@router.get("/history/{child_id}", response_model=schemas.ChatSession)
-def get_chat_history(child_id: str, db: Session = Depends(get_db)):
+@router.get("/history/{child_id}", response_model=schemas.ChatHistory)
+def get_chat_history(
+    child_id: str,
+    before: Optional[str] = None,
+    limit: int = Query(service.HISTORY_WINDOW, ge=1, le=service.MAX_HISTORY_PAGE),
+    db: Session = Depends(get_db)
+):
     """
-    Get the active chat session and its history.
+    Get the latest messages of the active chat session, oldest first.
+    Pass next_cursor back as ?before= to page further back. Read-only.
     """
-    return service.chat_service.get_session_history(db, child_id)
+    return service.chat_service.get_session_history(db, child_id, before, limit)
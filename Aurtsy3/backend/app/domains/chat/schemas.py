@@ -2,6 +2,7 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
+from app.core.domain_events import DomainEvent
 
 class MessageRole(str, Enum):
     USER = "USER"
@@ -22,7 +23,7 @@ class ChatMessage(ChatMessageBase):
     created_at: datetime
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 class ChatSessionBase(BaseModel):
     child_id: str
@@ -35,7 +36,15 @@ class ChatSession(ChatSessionBase):
     messages: List[ChatMessage] = []
 
     class Config:
-        orm_mode = True
+        from_attributes = True
+
+class ChatHistory(BaseModel):
+    """A page of the active session's messages, oldest first."""
+    child_id: str
+    session_id: Optional[int] = None
+    last_activity_at: Optional[datetime] = None
+    messages: List[ChatMessage] = []
+    next_cursor: Optional[str] = None  # Pass as ?before= for the previous page
 
 # Request/Response for the Chat API
 class SendMessageRequest(BaseModel):
@@ -49,4 +58,18 @@ class SendMessageResponse(BaseModel):
     processed_data: Optional[Dict[str, Any]] = None # Summary of what was saved (e.g. "Saved Meal")
 
     class Config:
-        orm_mode = True
+        from_attributes = True
+
+class ChatSessionEvent(DomainEvent):
+    id_field = "session_id"
+    session_id: Optional[int] = None
+    is_active: Optional[bool] = None
+    created_at: Optional[datetime] = None
+
+class ChatMessageEvent(DomainEvent):
+    # child_id stays empty: messages belong to a session
+    id_field = "chat_message_id"
+    chat_message_id: Optional[int] = None
+    session_id: Optional[int] = None
+    role: Optional[MessageRole] = None
+    created_at: Optional[datetime] = None
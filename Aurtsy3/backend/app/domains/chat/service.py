@@ -1,13 +1,71 @@
+from fastapi import HTTPException
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from app.core.celery_app import celery_app
+from app.core.database import end_transaction
+from app.core.llm import ollama_client
+from app.core.redis_client import get_redis
 from app.domains.chat import models, schemas
 from app.domains.ai import service as ai_service
 import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+HISTORY_WINDOW = 50  # Messages per history page
+MAX_HISTORY_PAGE = 200
+
+# Rolling summary: once SUMMARY_EVERY messages sit beyond the last RECENT_MESSAGES,
+# they are folded into ChatSession.summary by a small model. Prompts carry the
+# summary plus at most SUMMARY_EVERY + RECENT_MESSAGES verbatim turns.
+SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", "qwen2.5:3b-instruct")
+SUMMARY_EVERY = int(os.getenv("CHAT_SUMMARY_EVERY", "8"))
+RECENT_MESSAGES = int(os.getenv("CHAT_RECENT_MESSAGES", "6"))
+MAX_SUMMARY_CHARS = 1500
+MAX_TURN_CHARS = 500  # Per message in prompts
+MAX_FOLD_MESSAGES = 200  # Per summarization run, should summaries have fallen far behind
+SUMMARIZE_TASK = "app.domains.chat.tasks.summarize_chat_session"
+SUMMARY_PENDING_KEY = "chat_summary_pending:{}"
+SUMMARY_PENDING_TTL = 300
+
+SUMMARY_SYSTEM_PROMPT = """You maintain the running memory of a conversation between a caregiver and a care assistant app for a child with special needs.
+Merge the existing memory with the new messages into ONE updated memory of at most 120 words.
+Keep: facts about the child, people, places, foods, triggers, what was logged, open questions, and corrections (the latest statement wins).
+Drop: greetings, acknowledgements and repetition.
+Write plain sentences, no lists or headings. Respond with the memory text only."""
+
+ROLE_LABELS = {
+    models.MessageRole.USER: "Caregiver",
+    models.MessageRole.AI: "Assistant",
+    models.MessageRole.SYSTEM: "System",
+}
+
+def format_turns(messages: List[models.ChatMessage]) -> str:
+    return "\n".join(f"{ROLE_LABELS.get(m.role, m.role)}: {m.content[:MAX_TURN_CHARS]}" for m in messages)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def encode_cursor(message: models.ChatMessage) -> str:
+    """Opaque position of a message: session, created_at in microseconds, id."""
+    micros = (message.created_at - EPOCH) // timedelta(microseconds=1)
+    return f"{message.session_id}.{micros}.{message.id}"
+
+def decode_cursor(cursor: str) -> Tuple[int, datetime, int]:
+    try:
+        session_id, micros, message_id = (int(part) for part in cursor.split("."))
+        created_at = EPOCH + timedelta(microseconds=micros)
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid history cursor")
+    return session_id, created_at, message_id
 
 class ChatService:
     def get_or_create_session(self, db: Session, child_id: str) -> models.ChatSession:
+        """Session a new message goes to. Only the send path calls this: it marks activity."""
         # 1. Find active session (active flag + recent activity)
-        thirty_mins_ago = datetime.utcnow() - timedelta(minutes=30)
+        thirty_mins_ago = datetime.now(timezone.utc) - timedelta(minutes=30)
         
         session = db.query(models.ChatSession).filter(
             models.ChatSession.child_id == child_id,
@@ -16,9 +74,8 @@ class ChatService:
         ).order_by(models.ChatSession.last_activity_at.desc()).first()
         
         if session:
-            # Update activity time
-            session.last_activity_at = datetime.utcnow()
-            db.commit()
+            # Update activity time; committed with the message that follows
+            session.last_activity_at = datetime.now(timezone.utc)
             return session
             
         # 2. Create new session
@@ -36,13 +93,132 @@ class ChatService:
         db.refresh(new_session)
         return new_session
 
-    def get_session_history(self, db: Session, child_id: str) -> models.ChatSession:
-        # Get the most recent active session with messages
-        return self.get_or_create_session(db, child_id)
+    def find_active_session(self, db: Session, child_id: str) -> Optional[models.ChatSession]:
+        """The child's current session, if any. Read-only: activity is only touched on send."""
+        return db.query(models.ChatSession).filter(
+            models.ChatSession.child_id == child_id,
+            models.ChatSession.is_active == True
+        ).order_by(models.ChatSession.last_activity_at.desc()).first()
+
+    def recent_messages(
+        self, db: Session, session_id: int, limit: int = HISTORY_WINDOW,
+        before: Optional[Tuple[datetime, int]] = None
+    ) -> List[models.ChatMessage]:
+        """
+        The last `limit` messages of a session, oldest first, optionally only
+        those before a (created_at, id) position. Never loads the whole session.
+        """
+        query = db.query(models.ChatMessage).filter(models.ChatMessage.session_id == session_id)
+        if before:
+            query = query.filter(tuple_(models.ChatMessage.created_at, models.ChatMessage.id) < tuple_(*before))
+        messages = query.order_by(models.ChatMessage.created_at.desc(), models.ChatMessage.id.desc()).limit(limit).all()
+        return messages[::-1]
 
-    def process_message(self, db: Session, child_id: str, user_id: str, content: str) -> schemas.SendMessageResponse:
-        # 1. Get Session
+    def unsummarized_messages(self, db: Session, session: models.ChatSession) -> List[models.ChatMessage]:
+        """Messages after the rolling summary, oldest first; bounded even if summarizing lags."""
+        messages = self.recent_messages(db, session.id, SUMMARY_EVERY + RECENT_MESSAGES)
+        through = session.summarized_through_id or 0
+        return [m for m in messages if m.id > through]
+
+    def conversation_context(self, session: models.ChatSession, messages: List[models.ChatMessage]) -> str:
+        """Prompt block for the conversation so far: the rolling summary, then the turns since."""
+        parts = []
+        if session.summary:
+            parts.append(f"Summary of earlier messages: {session.summary}")
+        if messages:
+            parts.append(format_turns(messages))
+        return "\n".join(parts)
+
+    def schedule_summary(self, session_id: int, unsummarized: int):
+        """Queue a summarization once enough turns have piled up; at most one pending per session."""
+        if unsummarized < SUMMARY_EVERY + RECENT_MESSAGES:
+            return
+        try:
+            if get_redis().set(SUMMARY_PENDING_KEY.format(session_id), 1, nx=True, ex=SUMMARY_PENDING_TTL):
+                celery_app.send_task(SUMMARIZE_TASK, args=[session_id])
+        except Exception:
+            # The next message retries; prompts stay bounded meanwhile
+            logger.exception(f"Could not schedule summary for chat session {session_id}")
+
+    def summarize_session(self, db: Session, session_id: int) -> Optional[int]:
+        """
+        Fold every message but the last RECENT_MESSAGES into the session summary.
+        Returns the new summarized_through_id, or None if there was nothing to
+        fold or a concurrent run got there first.
+        """
+        session = db.get(models.ChatSession, session_id)
+        if session is None:
+            return None
+        through = session.summarized_through_id
+        messages = db.query(models.ChatMessage).filter(
+            models.ChatMessage.session_id == session_id,
+            models.ChatMessage.id > (through or 0)
+        ).order_by(models.ChatMessage.id).limit(MAX_FOLD_MESSAGES + RECENT_MESSAGES).all()
+        fold = messages[:-RECENT_MESSAGES] if RECENT_MESSAGES else messages
+        if not fold:
+            return None
+
+        memory = session.summary or "(empty)"
+        prompt = f"Existing memory:\n{memory}\n\nNew messages:\n{format_turns(fold)}"
+        fold_through = fold[-1].id
+        end_transaction(db)
+        summary = ollama_client.chat(
+            messages=[
+                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            model=SUMMARY_MODEL,
+            temperature=0.1
+        ).strip()[:MAX_SUMMARY_CHARS]
+
+        # Only advance from the state we read; a concurrent run's summary is not overwritten
+        current = models.ChatSession.summarized_through_id
+        updated = db.query(models.ChatSession).filter(
+            models.ChatSession.id == session_id,
+            current.is_(None) if through is None else current == through
+        ).update({"summary": summary, "summarized_through_id": fold_through}, synchronize_session=False)
+        db.commit()
+        return fold_through if updated else None
+
+    def get_session_history(
+        self, db: Session, child_id: str, before: Optional[str] = None, limit: int = HISTORY_WINDOW
+    ) -> schemas.ChatHistory:
+        """
+        Latest page of the active session's messages, or the page before a
+        cursor. Read-only: never creates a session or touches its activity.
+        """
+        if before:
+            session_id, created_at, message_id = decode_cursor(before)
+            session = db.query(models.ChatSession).filter(
+                models.ChatSession.id == session_id,
+                models.ChatSession.child_id == child_id
+            ).first()
+            if session is None:
+                raise HTTPException(status_code=400, detail="Invalid history cursor")
+            position = (created_at, message_id)
+        else:
+            session = self.find_active_session(db, child_id)
+            if session is None:
+                return schemas.ChatHistory(child_id=child_id)
+            position = None
+
+        messages = self.recent_messages(db, session.id, limit + 1, position)
+        has_more = len(messages) > limit
+        if has_more:
+            messages = messages[1:]
+        return schemas.ChatHistory(
+            child_id=child_id,
+            session_id=session.id,
+            last_activity_at=session.last_activity_at,
+            messages=[schemas.ChatMessage.from_orm(m) for m in messages],
+            next_cursor=encode_cursor(messages[0]) if has_more else None
+        )
+
+    def process_message(self, db: Session, child_id: str, user_id: str, content: str, ask_question: bool = True) -> schemas.SendMessageResponse:
+        # 1. Get Session, and the conversation so far for the prompts
         session = self.get_or_create_session(db, child_id)
+        earlier = self.unsummarized_messages(db, session)
+        conversation = self.conversation_context(session, earlier)
         
         # 2. Save User Message
         user_msg = models.ChatMessage(
@@ -55,10 +231,8 @@ class ChatService:
         db.refresh(user_msg)
         
         # 3. Process with AI (The "Brain")
-        # We use the existing AI service to extract data
-        # Note: We pass the raw text. The AI service now uses recent logs for context,
-        # but ideally we should pass the CHAT history for context.
-        # For now, let's stick to the existing flow but capture the output.
+        # We use the existing AI service to extract data, with the rolling
+        # summary and latest turns so references and corrections resolve
         
         ai_text = ""
         processed_summary = {}
@@ -69,16 +243,18 @@ class ChatService:
         safe_user_id = user_id if user_id and user_id != "unknown" else "test_user"
         
         try:
-            process_result = ai_service.ai_service.process_voice_log(db, child_id, safe_user_id, content)
+            process_result = ai_service.ai_service.process_voice_log(db, child_id, safe_user_id, content, conversation)
             
             # 4. Generate AI Response (The "Voice")
             # If the AI extracted data, we acknowledge it.
             # If it generated a question, we ask it.
             
-            # Check for contextual question
-            question_response = ai_service.ai_service.generate_contextual_question(db, child_id, content)
+            # Check for contextual question (skipped when the model server is busy)
+            question_response = None
+            if ask_question:
+                question_response = ai_service.ai_service.generate_contextual_question(db, child_id, content, conversation)
             
-            if question_response.question:
+            if question_response and question_response.question:
                 ai_text = question_response.question
             else:
                 # Default acknowledgments based on what was saved
@@ -108,6 +284,9 @@ class ChatService:
         db.add(ai_msg)
         db.commit()
         db.refresh(ai_msg)
+
+        # Earlier turns plus this exchange
+        self.schedule_summary(session.id, len(earlier) + 2)
         
         return schemas.SendMessageResponse(
             user_message=schemas.ChatMessage.from_orm(user_msg),
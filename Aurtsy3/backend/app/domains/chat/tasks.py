@@ -0,0 +1,19 @@
+from celery import shared_task
+import logging
+from app.core.database import SessionLocal
+from app.core.redis_client import get_redis
+from app.domains.chat.service import chat_service, SUMMARY_PENDING_KEY
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def summarize_chat_session(session_id: int):
+    """Fold a chat session's older turns into its rolling summary."""
+    db = SessionLocal()
+    try:
+        through = chat_service.summarize_session(db, session_id)
+        logger.info(f"Chat session {session_id} summarized through message {through}")
+        return {"success": True, "session_id": session_id, "summarized_through_id": through}
+    finally:
+        db.close()
+        get_redis().delete(SUMMARY_PENDING_KEY.format(session_id))
@@ -5,6 +5,8 @@ from app.core.database import Base
 
 class Child(Base):
     __tablename__ = "children"
+    # Server defaults (created_at) are read back at flush for domain event payloads
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(String(50), primary_key=True)
     name = Column(String(200), nullable=False)
@@ -15,6 +17,7 @@ class Child(Base):
 
 class ChildGuardian(Base):
     __tablename__ = "child_guardians"
+    __mapper_args__ = {"eager_defaults": True}
     
     user_id = Column(String(50), ForeignKey("users.id"), primary_key=True)
     child_id = Column(String(50), ForeignKey("children.id"), primary_key=True)
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.core.database import get_db
-from . import schemas, service
+from app.core.http_cache import conditional_get, REFERENCE_CACHE_CONTROL
+from app.core.responses import listing_response, schema_fields, sparse_fields
+from app.domains.sync import schemas as sync_schemas
+from . import models, schemas, service
 
 router = APIRouter()
 
@@ -22,7 +25,7 @@ def read_child(child_id: str, db: Session = Depends(get_db)):
     return db_child
 
 @router.delete("/{child_id}")
-async def delete_child(child_id: str, db: Session = Depends(get_db)):
+def delete_child(child_id: str, db: Session = Depends(get_db)):
     db_child = db.query(models.Child).filter(models.Child.id == child_id).first()
     if not db_child:
         raise HTTPException(status_code=404, detail="Child not found")
@@ -31,66 +34,102 @@ async def delete_child(child_id: str, db: Session = Depends(get_db)):
     return {"ok": True}
 
 # Child-specific resource endpoints
+@router.get("/{child_id}/changes", response_model=sync_schemas.ChangeSet)
+def get_child_changes(child_id: str, since: Optional[int] = None, limit: int = 500, db: Session = Depends(get_db)):
+    """
+    Delta sync: rows created, updated or deleted since the `since` watermark,
+    across every child listing. Omit `since` for a full snapshot.
+    """
+    from app.domains.sync.changes import change_feed
+    if service.get_child(db, child_id=child_id) is None:
+        raise HTTPException(status_code=404, detail="Child not found")
+    return change_feed.changes_since(db, child_id, since, limit)
+
 @router.get("/{child_id}/meals/")
-async def get_child_meals(child_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all meals for a specific child"""
-    from app.domains.meals import models as meal_models
-    meals = db.query(meal_models.Meal).filter(
+async def get_child_meals(child_id: str, request: Request, response: Response, skip: int = 0, limit: int = 100, fields: Optional[List[str]] = Depends(sparse_fields), summary: bool = False, db: Session = Depends(get_db)):
+    """Get all meals for a specific child; summary=true for the list view projection"""
+    not_modified = conditional_get(request, response, child_id, ("meals",))
+    if not_modified:
+        return not_modified
+    from app.domains.meals import models as meal_models, schemas as meal_schemas
+    query = db.query(meal_models.Meal).filter(
         meal_models.Meal.child_id == child_id
-    ).order_by(meal_models.Meal.created_at.desc()).offset(skip).limit(limit).all()
-    return meals
+    ).order_by(meal_models.Meal.created_at.desc()).offset(skip).limit(limit)
+    summary_fields = schema_fields(meal_schemas.MealSummary, meal_models.Meal) if summary else None
+    return listing_response(query, meal_models.Meal, fields, summary_fields, headers=response.headers)
 
 @router.get("/{child_id}/behavior/")
-async def get_child_behaviors(child_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all behavior logs for a specific child"""
-    from app.domains.behavior import models as behavior_models
-    behaviors = db.query(behavior_models.BehaviorLog).filter(
+async def get_child_behaviors(child_id: str, request: Request, response: Response, skip: int = 0, limit: int = 100, fields: Optional[List[str]] = Depends(sparse_fields), summary: bool = False, db: Session = Depends(get_db)):
+    """Get all behavior logs for a specific child; summary=true for the list view projection"""
+    not_modified = conditional_get(request, response, child_id, ("behavior_logs",))
+    if not_modified:
+        return not_modified
+    from app.domains.behavior import models as behavior_models, schemas as behavior_schemas
+    query = db.query(behavior_models.BehaviorLog).filter(
         behavior_models.BehaviorLog.child_id == child_id
-    ).order_by(behavior_models.BehaviorLog.created_at.desc()).offset(skip).limit(limit).all()
-    return behaviors
+    ).order_by(behavior_models.BehaviorLog.created_at.desc()).offset(skip).limit(limit)
+    summary_fields = schema_fields(behavior_schemas.BehaviorLogSummary, behavior_models.BehaviorLog) if summary else None
+    return listing_response(query, behavior_models.BehaviorLog, fields, summary_fields, headers=response.headers)
 
 @router.get("/{child_id}/sleep/")
-async def get_child_sleep_logs(child_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_child_sleep_logs(child_id: str, request: Request, response: Response, skip: int = 0, limit: int = 100, fields: Optional[List[str]] = Depends(sparse_fields), db: Session = Depends(get_db)):
     """Get all sleep logs for a specific child"""
+    not_modified = conditional_get(request, response, child_id, ("sleep_logs",))
+    if not_modified:
+        return not_modified
     from app.domains.sleep import models as sleep_models
-    logs = db.query(sleep_models.SleepLog).filter(
+    query = db.query(sleep_models.SleepLog).filter(
         sleep_models.SleepLog.child_id == child_id
-    ).order_by(sleep_models.SleepLog.start_time.desc()).offset(skip).limit(limit).all()
-    return logs
+    ).order_by(sleep_models.SleepLog.start_time.desc()).offset(skip).limit(limit)
+    return listing_response(query, sleep_models.SleepLog, fields, headers=response.headers)
 
 @router.get("/{child_id}/activities/")
-async def get_child_activities(child_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all activity logs for a specific child"""
-    from app.domains.activities import models as activity_models
-    logs = db.query(activity_models.Activity).filter(
+async def get_child_activities(child_id: str, request: Request, response: Response, skip: int = 0, limit: int = 100, fields: Optional[List[str]] = Depends(sparse_fields), summary: bool = False, db: Session = Depends(get_db)):
+    """Get all activity logs for a specific child; summary=true for the list view projection"""
+    not_modified = conditional_get(request, response, child_id, ("activities",))
+    if not_modified:
+        return not_modified
+    from app.domains.activities import models as activity_models, schemas as activity_schemas
+    query = db.query(activity_models.Activity).filter(
         activity_models.Activity.child_id == child_id
-    ).order_by(activity_models.Activity.created_at.desc()).offset(skip).limit(limit).all()
-    return logs
+    ).order_by(activity_models.Activity.created_at.desc()).offset(skip).limit(limit)
+    summary_fields = schema_fields(activity_schemas.ActivitySummary, activity_models.Activity) if summary else None
+    return listing_response(query, activity_models.Activity, fields, summary_fields, headers=response.headers)
 
 @router.get("/{child_id}/hydration/")
-async def get_child_hydration_logs(child_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_child_hydration_logs(child_id: str, request: Request, response: Response, skip: int = 0, limit: int = 100, fields: Optional[List[str]] = Depends(sparse_fields), db: Session = Depends(get_db)):
     """Get all hydration logs for a specific child"""
+    not_modified = conditional_get(request, response, child_id, ("hydration_logs",))
+    if not_modified:
+        return not_modified
     from app.domains.hydration import models as hydration_models
-    logs = db.query(hydration_models.HydrationLog).filter(
+    query = db.query(hydration_models.HydrationLog).filter(
         hydration_models.HydrationLog.child_id == child_id
-    ).order_by(hydration_models.HydrationLog.created_at.desc()).offset(skip).limit(limit).all()
-    return logs
+    ).order_by(hydration_models.HydrationLog.created_at.desc()).offset(skip).limit(limit)
+    return listing_response(query, hydration_models.HydrationLog, fields, headers=response.headers)
 
 @router.get("/{child_id}/knowledge/")
-async def get_child_knowledge(child_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all knowledge entities for a specific child"""
-    from app.domains.knowledge import models as knowledge_models
-    entities = db.query(knowledge_models.Entity).filter(
+async def get_child_knowledge(child_id: str, request: Request, response: Response, skip: int = 0, limit: int = 100, fields: Optional[List[str]] = Depends(sparse_fields), summary: bool = False, db: Session = Depends(get_db)):
+    """Get all knowledge entities for a specific child; summary=true for the list view projection"""
+    not_modified = conditional_get(request, response, child_id, ("entities",), REFERENCE_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+    from app.domains.knowledge import models as knowledge_models, schemas as knowledge_schemas
+    query = db.query(knowledge_models.Entity).filter(
         knowledge_models.Entity.child_id == child_id
-    ).order_by(knowledge_models.Entity.created_at.desc()).offset(skip).limit(limit).all()
-    return entities
+    ).order_by(knowledge_models.Entity.created_at.desc()).offset(skip).limit(limit)
+    summary_fields = schema_fields(knowledge_schemas.EntitySummary, knowledge_models.Entity) if summary else None
+    return listing_response(query, knowledge_models.Entity, fields, summary_fields, headers=response.headers)
 
 @router.get("/{child_id}/location/")
-async def get_child_location_checks(child_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_child_location_checks(child_id: str, request: Request, response: Response, skip: int = 0, limit: int = 100, fields: Optional[List[str]] = Depends(sparse_fields), db: Session = Depends(get_db)):
     """Get all location checks for a specific child"""
+    not_modified = conditional_get(request, response, child_id, ("location_checks",))
+    if not_modified:
+        return not_modified
     from app.domains.activities import models as activity_models
-    checks = db.query(activity_models.LocationCheck).filter(
+    query = db.query(activity_models.LocationCheck).filter(
         activity_models.LocationCheck.child_id == child_id
-    ).order_by(activity_models.LocationCheck.created_at.desc()).offset(skip).limit(limit).all()
-    return checks 
+    ).order_by(activity_models.LocationCheck.created_at.desc()).offset(skip).limit(limit)
+    return listing_response(query, activity_models.LocationCheck, fields, headers=response.headers)
 
@@ -1,5 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional
+from app.core.domain_events import DomainEvent
 
 class ChildBase(BaseModel):
     name: str
@@ -12,3 +14,12 @@ class Child(ChildBase):
     created_at: datetime
     class Config:
         orm_mode = True
+
+class ChildEvent(DomainEvent):
+    id_field = "child_id"
+    name: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class GuardianEvent(DomainEvent):
+    user_id: Optional[str] = None
+    created_at: Optional[datetime] = None
@@ -0,0 +1,36 @@
+"""
+Domain events published after commit for every child-facing write.
+See app/core/domain_events.py; imported by the API and by Celery workers.
+"""
+from app.core.domain_events import register
+from app.domains.activities import models as activity_models, schemas as activity_schemas
+from app.domains.behavior import models as behavior_models, schemas as behavior_schemas
+from app.domains.chat import models as chat_models, schemas as chat_schemas
+from app.domains.children import models as child_models, schemas as child_schemas
+from app.domains.hydration import models as hydration_models, schemas as hydration_schemas
+from app.domains.knowledge import models as knowledge_models, schemas as knowledge_schemas
+from app.domains.meals import models as meal_models, schemas as meal_schemas
+from app.domains.sleep import models as sleep_models, schemas as sleep_schemas
+
+register(meal_models.Meal, meal_schemas.MealEvent,
+         created="meal_logged", updated="meal_updated", deleted="meal_deleted")
+register(behavior_models.BehaviorLog, behavior_schemas.BehaviorEvent,
+         created="behavior_logged", updated="behavior_updated", deleted="behavior_deleted")
+register(sleep_models.SleepLog, sleep_schemas.SleepEvent,
+         created="sleep_logged", updated="sleep_updated", deleted="sleep_deleted")
+register(hydration_models.HydrationLog, hydration_schemas.HydrationEvent,
+         created="hydration_logged", updated="hydration_updated", deleted="hydration_deleted")
+register(activity_models.Activity, activity_schemas.ActivityEvent,
+         created="activity_logged", updated="activity_updated", deleted="activity_deleted")
+register(activity_models.LocationCheck, activity_schemas.LocationCheckEvent,
+         created="location_checked", deleted="location_check_deleted")
+register(knowledge_models.Entity, knowledge_schemas.EntityEvent,
+         created="entity_created", updated="entity_updated", deleted="entity_deleted")
+register(chat_models.ChatSession, chat_schemas.ChatSessionEvent,
+         created="chat_session_started", updated="chat_session_updated")
+register(chat_models.ChatMessage, chat_schemas.ChatMessageEvent,
+         created="chat_message_created")
+register(child_models.Child, child_schemas.ChildEvent,
+         created="child_created", updated="child_updated", deleted="child_deleted")
+register(child_models.ChildGuardian, child_schemas.GuardianEvent,
+         created="guardian_added", deleted="guardian_removed")
@@ -1,9 +1,11 @@
-from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey
+from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, Index
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, change_xid_column
 
 class HydrationLog(Base):
     __tablename__ = "hydration_logs"
+    # Server defaults (created_at) are read back at flush for domain event payloads
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     child_id = Column(String(50), ForeignKey("children.id"), nullable=False)
@@ -11,3 +13,9 @@ class HydrationLog(Base):
     amount_ml = Column(Integer, nullable=False)
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    change_xid = change_xid_column()  # Delta sync watermark
+
+    __table_args__ = (
+        Index("ix_hydration_logs_child_xid", "child_id", "change_xid"),
+    )
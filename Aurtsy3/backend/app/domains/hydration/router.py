@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.core.database import get_db
+from app.core.responses import listing_response, schema_fields, sparse_fields
 from . import models, schemas
 
 router = APIRouter()
 
+LIST_FIELDS = schema_fields(schemas.HydrationLog, models.HydrationLog)
+
 @router.post("/", response_model=schemas.HydrationLog)
 def create_hydration_log(log: schemas.HydrationLogCreate, db: Session = Depends(get_db)):
     db_log = models.HydrationLog(**log.dict())
@@ -15,5 +18,6 @@ def create_hydration_log(log: schemas.HydrationLogCreate, db: Session = Depends(
     return db_log
 
 @router.get("/child/{child_id}", response_model=List[schemas.HydrationLog])
-def get_child_hydration_logs(child_id: str, db: Session = Depends(get_db)):
-    return db.query(models.HydrationLog).filter(models.HydrationLog.child_id == child_id).order_by(models.HydrationLog.created_at.desc()).all()
+def get_child_hydration_logs(child_id: str, fields: Optional[List[str]] = Depends(sparse_fields), db: Session = Depends(get_db)):
+    query = db.query(models.HydrationLog).filter(models.HydrationLog.child_id == child_id).order_by(models.HydrationLog.created_at.desc())
+    return listing_response(query, models.HydrationLog, fields, LIST_FIELDS)
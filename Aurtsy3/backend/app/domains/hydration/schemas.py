@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional
+from app.core.domain_events import DomainEvent
 
 class HydrationLogBase(BaseModel):
     child_id: str
@@ -17,3 +18,10 @@ class HydrationLog(HydrationLogBase):
 
     class Config:
         from_attributes = True
+
+class HydrationEvent(DomainEvent):
+    id_field = "hydration_log_id"
+    hydration_log_id: Optional[int] = None
+    fluid_type: Optional[str] = None
+    amount_ml: Optional[int] = None
+    created_at: Optional[datetime] = None
@@ -1,9 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Index, cast
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, preview_column, change_xid_column
 
 class Entity(Base):
     __tablename__ = "entities"
+    # Server defaults (created_at) are read back at flush for domain event payloads
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     child_id = Column(String(50), ForeignKey("children.id"), nullable=False)
@@ -13,4 +15,10 @@ class Entity(Base):
     context = Column(JSON, nullable=True)  # {"order": "orange chicken", "location": "..."}
     frequency = Column(Integer, default=1)  # How often this entity is referenced
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    change_xid = change_xid_column()  # Delta sync watermark
+    preview = preview_column(cast(context, Text))  # Summary listings
+
+    __table_args__ = (
+        Index("ix_entities_child_xid", "child_id", "change_xid"),
+    )
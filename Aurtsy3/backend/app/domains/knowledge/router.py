@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.domains.knowledge import schemas, service
+from app.core.http_cache import conditional_get, REFERENCE_CACHE_CONTROL
+from app.domains.knowledge import models, schemas, service
 
 router = APIRouter()
 
@@ -26,9 +27,22 @@ def create_entity(entity: schemas.EntityCreate, db: Session = Depends(get_db)):
     return service.knowledge_service.create_entity(db, entity)
 
 @router.get("/entities/{child_id}", response_model=list[schemas.Entity])
-def list_entities(child_id: str, db: Session = Depends(get_db)):
+def list_entities(child_id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     List all entities for a specific child.
     """
+    not_modified = conditional_get(request, response, child_id, ("entities",), REFERENCE_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
     entities = service.knowledge_service.list_entities(db, child_id)
     return [schemas.Entity.from_orm(e) for e in entities]
+
+@router.get("/entities/{child_id}/{entity_id}", response_model=schemas.Entity)
+def get_entity(child_id: str, entity_id: int, db: Session = Depends(get_db)):
+    """
+    Full entity, including the context left out of summaries.
+    """
+    entity = db.get(models.Entity, entity_id)
+    if entity is None or entity.child_id != child_id:
+        raise HTTPException(status_code=404, detail="Entity not found")
+    return entity
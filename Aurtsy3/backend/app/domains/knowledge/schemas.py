@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 from datetime import datetime
+from app.core.domain_events import DomainEvent
 
 class EntityBase(BaseModel):
     entity_type: str
@@ -21,6 +22,17 @@ class Entity(EntityBase):
     class Config:
         from_attributes = True
 
+class EntitySummary(BaseModel):
+    """List view row: the context is reduced to a short preview."""
+    id: int
+    child_id: str
+    entity_type: str
+    name: str
+    resolved_value: str
+    frequency: int
+    preview: Optional[str] = None
+    created_at: datetime
+
 class EntityResolveRequest(BaseModel):
     query: str
     child_id: str
@@ -30,3 +42,12 @@ class EntityResolveResponse(BaseModel):
     entity: Optional[Entity] = None
     confidence: float  # 0.0 to 1.0
     alternatives: list[Entity] = []
+
+class EntityEvent(DomainEvent):
+    id_field = "entity_id"
+    entity_id: Optional[int] = None
+    entity_type: Optional[str] = None
+    name: Optional[str] = None
+    frequency: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
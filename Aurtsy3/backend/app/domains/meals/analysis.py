@@ -0,0 +1,183 @@
+"""
+Dispatch meal photo analysis to the ai-worker.
+
+meal_logged (and meal_updated when the photo changes) enqueues an
+`ai_worker.analyze_meal` task on the MEAL_ANALYSIS_QUEUE Celery queue, which
+only the ai-worker consumes (see ai-worker/tasks.py). The worker caps
+concurrency, retries, and writes analysis_status/analysis_json back in bulk.
+
+Enqueued jobs are tracked in a Redis zset so the backlog is observable:
+  meal_analysis:pending  zset meal_id -> enqueue time, removed when the job finishes
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import logging
+import os
+import time
+
+from app.core.celery_app import celery_app
+from app.core.metrics import metrics
+from app.core.redis_client import get_redis
+from app.domains.meals import models
+from app.domains.media.service import variant_url
+
+logger = logging.getLogger(__name__)
+
+MEAL_ANALYSIS_QUEUE = os.getenv("MEAL_ANALYSIS_QUEUE", "meal_analysis")
+ANALYZE_MEAL_TASK = "ai_worker.analyze_meal"
+PENDING_KEY = "meal_analysis:pending"
+
+# Unfinished meals with a photo but no live job (lost broker message, worker
+# crash mid-job, meals from before dispatch existed) are re-enqueued after this long
+STALE_AFTER_SECONDS = 30 * 60
+UNFINISHED_STATUSES = ("PENDING", "PROCESSING")
+SWEEP_BATCH_SIZE = 500
+
+dispatched_total = metrics.counter(
+    "meal_analysis_dispatched_total",
+    "Meal analysis jobs enqueued for the ai-worker",
+    labelnames=("source",)
+)
+queue_depth = metrics.gauge(
+    "meal_analysis_queue_depth",
+    "Meal analysis jobs waiting in the broker queue"
+)
+jobs_pending = metrics.gauge(
+    "meal_analysis_jobs_pending",
+    "Meal analysis jobs enqueued and not finished (queued + running)"
+)
+oldest_job_age = metrics.gauge(
+    "meal_analysis_oldest_job_age_seconds",
+    "Age of the oldest unfinished meal analysis job"
+)
+
+class MealAnalysisDispatcher:
+    def register(self, bus):
+        bus.subscribe("meal_logged", self.on_meal_logged)
+        bus.subscribe("meal_updated", self.on_meal_updated)
+
+    def on_meal_logged(self, payload: Dict[str, Any]):
+        self.dispatch(
+            payload["meal_id"], payload.get("photo_url"), payload.get("meal_type"), payload.get("child_id"),
+            source="meal_logged"
+        )
+
+    def on_meal_updated(self, payload: Dict[str, Any]):
+        if "photo_url" in payload.get("changed", []):
+            self.dispatch(
+                payload["meal_id"], payload.get("photo_url"), payload.get("meal_type"), payload.get("child_id"),
+                source="photo_changed", replace=True
+            )
+
+    def dispatch(
+        self,
+        meal_id: int,
+        photo_url: Optional[str],
+        meal_type: Optional[str] = None,
+        child_id: Optional[str] = None,
+        source: str = "api",
+        replace: bool = False
+    ) -> bool:
+        """
+        Enqueue one analysis job. A meal that already has a live job is skipped
+        (redelivered events) unless replace is set. Costs one ZADD and one LPUSH.
+        """
+        if not photo_url:
+            return False
+        added = get_redis().zadd(PENDING_KEY, {str(meal_id): time.time()}, nx=not replace)
+        if not added and not replace:
+            return False
+        # Stored photos are analyzed from their pre-scaled inference variant
+        image_url = variant_url(photo_url, "inference")
+        # meal_type/child_id let the ai-worker pair PRE_MEAL and POST_MEAL photos
+        celery_app.send_task(
+            ANALYZE_MEAL_TASK,
+            args=[meal_id, image_url],
+            kwargs={"meal_type": getattr(meal_type, "value", meal_type), "child_id": child_id},
+            queue=MEAL_ANALYSIS_QUEUE
+        )
+        dispatched_total.inc(source=source)
+        return True
+
+    def requeue_stale(self, db, now: Optional[datetime] = None) -> int:
+        """
+        Re-enqueue unfinished meals with a photo whose job is missing, or older
+        than STALE_AFTER_SECONDS while the queue is not backlogged. With jobs
+        queued and the oldest unfinished one past STALE_AFTER_SECONDS, old jobs
+        are most likely still waiting in the broker; re-sending them would
+        duplicate the backlog on every sweep, so they wait for the queue to drain.
+        """
+        now = now or datetime.utcnow()
+        redis = get_redis()
+        cutoff = now - timedelta(seconds=STALE_AFTER_SECONDS)
+        stale_before = time.time() - STALE_AFTER_SECONDS
+        stats = self.queue_stats()
+        backlogged = stats["queue_depth"] > 0 and stats["oldest_job_age_seconds"] >= STALE_AFTER_SECONDS
+        if backlogged:
+            logger.warning(
+                f"Meal analysis queue backlogged ({stats['queue_depth']} queued, oldest job "
+                f"{stats['oldest_job_age_seconds']:.0f}s); only re-enqueueing meals without a job"
+            )
+
+        requeued = 0
+        last_id = 0
+        while True:
+            rows = db.query(
+                models.Meal.id, models.Meal.photo_url, models.Meal.meal_type, models.Meal.child_id
+            ).filter(
+                models.Meal.analysis_status.in_(UNFINISHED_STATUSES),
+                models.Meal.photo_url.isnot(None),
+                models.Meal.created_at < cutoff,
+                models.Meal.id > last_id
+            ).order_by(models.Meal.id).limit(SWEEP_BATCH_SIZE).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            pipe = redis.pipeline(transaction=False)
+            for row in rows:
+                pipe.zscore(PENDING_KEY, str(row.id))
+            scores = pipe.execute()
+            for row, enqueued_at in zip(rows, scores):
+                if enqueued_at is None or (enqueued_at < stale_before and not backlogged):
+                    self.dispatch(row.id, row.photo_url, row.meal_type, row.child_id, source="sweep", replace=True)
+                    requeued += 1
+
+        # Drop tracking entries whose job finished without clearing them (worker crash)
+        stale_ids = redis.zrangebyscore(PENDING_KEY, 0, stale_before)
+        if stale_ids:
+            unfinished = {
+                str(meal_id) for (meal_id,) in db.query(models.Meal.id).filter(
+                    models.Meal.id.in_([int(i) for i in stale_ids]),
+                    models.Meal.analysis_status.in_(UNFINISHED_STATUSES)
+                )
+            }
+            finished = [i for i in stale_ids if i not in unfinished]
+            if finished:
+                redis.zrem(PENDING_KEY, *finished)
+        return requeued
+
+    def queue_stats(self) -> Dict[str, Any]:
+        redis = get_redis()
+        pipe = redis.pipeline(transaction=False)
+        pipe.llen(MEAL_ANALYSIS_QUEUE)
+        pipe.zcard(PENDING_KEY)
+        pipe.zrange(PENDING_KEY, 0, 0, withscores=True)
+        depth, pending, oldest = pipe.execute()
+        age = round(time.time() - oldest[0][1], 1) if oldest else 0.0
+        return {
+            "queue": MEAL_ANALYSIS_QUEUE,
+            "queue_depth": depth,
+            "jobs_pending": pending,
+            "oldest_job_meal_id": int(oldest[0][0]) if oldest else None,
+            "oldest_job_age_seconds": age
+        }
+
+meal_analysis_dispatcher = MealAnalysisDispatcher()
+
+@metrics.collector
+def collect_meal_analysis_queue():
+    stats = meal_analysis_dispatcher.queue_stats()
+    queue_depth.set(stats["queue_depth"])
+    jobs_pending.set(stats["jobs_pending"])
+    oldest_job_age.set(stats["oldest_job_age_seconds"])
@@ -1,8 +1,8 @@
-from sqlalchemy import Column, String, Integer, Text, Enum, ForeignKey, JSON, DateTime
+from sqlalchemy import Column, String, Integer, Text, Enum, ForeignKey, JSON, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
-from app.core.database import Base
+from app.core.database import Base, preview_column, change_xid_column
 
 class MealType(str, enum.Enum):
     PRE_MEAL = "PRE_MEAL"
@@ -11,6 +11,8 @@ class MealType(str, enum.Enum):
 
 class Meal(Base):
     __tablename__ = "meals"
+    # Server defaults (created_at) are read back at flush for domain event payloads
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     child_id = Column(String(50), ForeignKey("children.id"), nullable=False)
@@ -21,10 +23,17 @@ class Meal(Base):
     notes = Column(Text, nullable=True)
     
     # AI Analysis Results
-    analysis_status = Column(String(20), default="PENDING") # PENDING, COMPLETED, FAILED
+    analysis_status = Column(String(20), default="PENDING") # PENDING, PROCESSING, COMPLETED, FAILED
     analysis_json = Column(JSON, nullable=True) # Store calories, food items detected
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    change_xid = change_xid_column()  # Delta sync watermark
+    preview = preview_column(notes)  # Summary listings
     
     child = relationship("app.domains.children.models.Child", back_populates="meals")
     user = relationship("app.domains.users.models.User")
+
+    __table_args__ = (
+        Index("ix_meals_child_xid", "child_id", "change_xid"),
+    )
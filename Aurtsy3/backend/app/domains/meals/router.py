@@ -2,14 +2,21 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
-from . import schemas, service
+from . import models, schemas, service
+from .analysis import meal_analysis_dispatcher
 
 router = APIRouter()
 
 @router.post("/", response_model=schemas.Meal)
-async def create_meal(meal: schemas.MealCreate, user_id: str = Query(...), db: Session = Depends(get_db)):
-    # In real app, user_id comes from auth token
-    return await service.create_meal(db=db, meal=meal, user_id=user_id)
+def create_meal(meal: schemas.MealCreate, user_id: str = Query(...), db: Session = Depends(get_db)):
+    # In real app, user_id comes from auth token. Sync so the commit (and the
+    # handlers meal_logged runs after it) stays off the event loop
+    return service.create_meal(db=db, meal=meal, user_id=user_id)
+
+@router.get("/analysis/queue")
+def read_analysis_queue():
+    """Backlog of photo analysis jobs: broker queue depth and age of the oldest unfinished job."""
+    return meal_analysis_dispatcher.queue_stats()
 
 @router.get("/", response_model=List[schemas.Meal])
 def read_meals(child_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
@@ -19,3 +26,11 @@ def read_meals(child_id: str, skip: int = 0, limit: int = 100, db: Session = Dep
 @router.get("/children/{child_id}/meals/", response_model=List[schemas.Meal])
 def read_child_meals(child_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return service.get_meals(db, child_id=child_id, skip=skip, limit=limit)
+
+@router.get("/{meal_id}", response_model=schemas.Meal)
+def read_meal(meal_id: int, db: Session = Depends(get_db)):
+    """Full meal, including the analysis left out of summaries."""
+    db_meal = db.get(models.Meal, meal_id)
+    if db_meal is None:
+        raise HTTPException(status_code=404, detail="Meal not found")
+    return db_meal
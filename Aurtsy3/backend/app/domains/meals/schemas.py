@@ -2,6 +2,7 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 from .models import MealType
+from app.core.domain_events import DomainEvent
 
 class MealBase(BaseModel):
     child_id: str
@@ -20,3 +21,24 @@ class Meal(MealBase):
     created_at: datetime
     class Config:
         orm_mode = True
+
+class MealSummary(BaseModel):
+    """List view row: no analysis_json, and the notes are reduced to a short preview."""
+    id: int
+    child_id: str
+    user_id: str
+    meal_type: MealType
+    photo_url: Optional[str] = None
+    analysis_status: str
+    preview: Optional[str] = None
+    created_at: datetime
+
+class MealEvent(DomainEvent):
+    id_field = "meal_id"
+    meal_id: Optional[int] = None
+    user_id: Optional[str] = None
+    meal_type: Optional[MealType] = None
+    photo_url: Optional[str] = None
+    notes: Optional[str] = None
+    analysis_status: Optional[str] = None
+    created_at: Optional[datetime] = None
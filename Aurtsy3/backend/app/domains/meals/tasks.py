@@ -0,0 +1,17 @@
+from celery import shared_task
+import logging
+from app.core.database import SessionLocal
+from app.domains.meals.analysis import meal_analysis_dispatcher
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def requeue_stale_meal_analyses():
+    """Re-enqueue meal photos stuck in PENDING without a live ai-worker job."""
+    db = SessionLocal()
+    try:
+        requeued = meal_analysis_dispatcher.requeue_stale(db)
+        logger.info(f"Re-enqueued {requeued} meal analyses")
+        return {"success": True, "requeued": requeued}
+    finally:
+        db.close()
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.core.database import get_db
+from app.domains.meals import models as meal_models
+from . import schemas
+from .service import photo_store, PhotoTooLarge, UnsupportedPhotoType, EXTENSION_TYPES
+from .streaming import stream_into, InvalidUpload
+
+router = APIRouter()
+
+# Blobs are content-addressed and never change; children's photos stay out of shared caches
+PHOTO_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+@router.post("/photos", response_model=schemas.PhotoUpload)
+async def upload_photo(request: Request, meal_id: Optional[int] = Query(None), db: Session = Depends(get_db)):
+    """
+    Upload a photo as multipart/form-data ("file" field) or a raw image/* body.
+    Identical bytes are stored once. With meal_id, the photo becomes the meal's
+    photo_url, which queues it for analysis.
+    """
+    meal = None
+    if meal_id is not None:
+        meal = db.query(meal_models.Meal).filter(meal_models.Meal.id == meal_id).first()
+        if not meal:
+            raise HTTPException(status_code=404, detail="Meal not found")
+
+    ingest = photo_store.begin()
+    try:
+        await stream_into(request, ingest)
+        stored = await run_in_threadpool(photo_store.commit, ingest)
+    except PhotoTooLarge as e:
+        ingest.discard()
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidUpload as e:
+        ingest.discard()
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedPhotoType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except BaseException:
+        ingest.discard()
+        raise
+
+    if meal is not None:
+        meal.photo_url = stored["url"]
+        # meal_updated (photo_url changed) queues analysis from inside the commit; keep it off the loop
+        await run_in_threadpool(db.commit)
+        stored["meal_id"] = meal.id
+    return stored
+
+@router.api_route("/photos/{prefix}/{sha256}/{name}", methods=["GET", "HEAD"])
+def get_photo(prefix: str, sha256: str, name: str, request: Request):
+    """Serve an original or variant. Supports If-None-Match and Range (partial content)."""
+    path = photo_store.resolve(prefix, sha256, name)
+    if not path:
+        raise HTTPException(status_code=404, detail="Photo not found")
+
+    etag = f'"{sha256}-{name.partition(".")[0]}"'
+    headers = {"ETag": etag, "Cache-Control": PHOTO_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    media_type = EXTENSION_TYPES.get(name.rpartition(".")[2], "application/octet-stream")
+    # FileResponse handles Range/If-Range (206, 416) and streams from disk
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class PhotoUpload(BaseModel):
+    sha256: str
+    content_type: str
+    size_bytes: int
+    width: int
+    height: int
+    deduplicated: bool  # True when identical bytes were already stored
+    url: str
+    thumbnail_url: str
+    inference_url: str
+    meal_id: Optional[int] = None
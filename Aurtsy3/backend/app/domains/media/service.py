@@ -0,0 +1,220 @@
+"""
+Content-addressed photo store on the local media volume.
+
+Uploads are hashed while they are written to a temp file, then moved to a
+path derived from their SHA-256, so identical photos are stored once:
+
+  {MEDIA_ROOT}/photos/{sha[:2]}/{sha}/original.{jpg,png,webp}
+  {MEDIA_ROOT}/photos/{sha[:2]}/{sha}/thumb.jpg       feed thumbnail
+  {MEDIA_ROOT}/photos/{sha[:2]}/{sha}/inference.jpg   ai-worker input
+
+URLs mirror the layout (/media/photos/...), so the ai-worker, which mounts the
+same volume, resolves them to files directly. Blobs never change once written;
+variants are generated once, when the original is first stored.
+"""
+from typing import Optional, Tuple
+import hashlib
+import os
+import re
+import tempfile
+
+from PIL import Image, ImageOps
+
+from app.core.metrics import metrics
+
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", "/data/media")
+MEDIA_URL_PREFIX = "/media"
+PHOTOS_DIR = "photos"
+
+MAX_PHOTO_BYTES = 25 * 1024 * 1024
+THUMBNAIL_SIZE = 320
+INFERENCE_SIZE = 640  # ai-worker model input
+
+# Leading bytes -> (content type, extension)
+SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", "png"),
+)
+EXTENSION_TYPES = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+VARIANTS = {"thumb": "thumb.jpg", "inference": "inference.jpg"}
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+PHOTO_URL_RE = re.compile(rf"^{MEDIA_URL_PREFIX}/{PHOTOS_DIR}/[0-9a-f]{{2}}/([0-9a-f]{{64}})/[a-z]+\.[a-z]+$")
+
+uploads_total = metrics.counter(
+    "media_uploads_total",
+    "Photo uploads by outcome (stored, deduplicated, rejected)",
+    labelnames=("result",)
+)
+upload_bytes_total = metrics.counter(
+    "media_upload_bytes_total",
+    "Bytes received by the photo upload endpoint"
+)
+
+class PhotoTooLarge(Exception):
+    pass
+
+class UnsupportedPhotoType(Exception):
+    pass
+
+def sniff_type(head: bytes) -> Optional[Tuple[str, str]]:
+    for signature, content_type, extension in SIGNATURES:
+        if head.startswith(signature):
+            return content_type, extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", "webp"
+    return None
+
+class PhotoIngest:
+    """
+    One upload in progress: every chunk is hashed and appended to a temp file
+    on the media volume, so memory use stays at one chunk whatever the size.
+    """
+    def __init__(self, root: str = MEDIA_ROOT):
+        tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=".upload")
+        self._file = os.fdopen(fd, "wb")
+        self._sha = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > MAX_PHOTO_BYTES:
+            raise PhotoTooLarge(f"Photo exceeds {MAX_PHOTO_BYTES // (1024 * 1024)}MB")
+        if len(self.head) < 16:
+            self.head += chunk[:16 - len(self.head)]
+        self._sha.update(chunk)
+        # Page-cache writes of one chunk are fast enough to do on the event loop
+        self._file.write(chunk)
+
+    def close(self) -> str:
+        self._file.close()
+        return self._sha.hexdigest()
+
+    def discard(self):
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+class PhotoStore:
+    def __init__(self, root: str = MEDIA_ROOT):
+        self.root = root
+
+    def begin(self) -> PhotoIngest:
+        return PhotoIngest(self.root)
+
+    def blob_dir(self, sha256: str) -> str:
+        return os.path.join(self.root, PHOTOS_DIR, sha256[:2], sha256)
+
+    def find_original(self, sha256: str) -> Optional[str]:
+        directory = self.blob_dir(sha256)
+        for extension in EXTENSION_TYPES:
+            path = os.path.join(directory, f"original.{extension}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def commit(self, ingest: PhotoIngest) -> dict:
+        """
+        Finish an upload: reject non-images, drop duplicates, otherwise
+        generate the variants and move the original into place. CPU-bound
+        (image decode); run it in a worker thread.
+        """
+        sha256 = ingest.close()
+        sniffed = sniff_type(ingest.head)
+        if sniffed is None:
+            ingest.discard()
+            uploads_total.inc(result="rejected")
+            raise UnsupportedPhotoType("Only JPEG, PNG and WebP photos are supported")
+        content_type, extension = sniffed
+        upload_bytes_total.inc(ingest.size)
+
+        existing = self.find_original(sha256)
+        if existing:
+            ingest.discard()
+            uploads_total.inc(result="deduplicated")
+            with Image.open(existing) as image:
+                width, height = _display_size(image)
+            return self._describe(sha256, os.path.basename(existing), content_type, ingest.size, width, height, True)
+
+        directory = self.blob_dir(sha256)
+        os.makedirs(directory, exist_ok=True)
+        try:
+            width, height = self._write_variants(ingest.tmp_path, directory)
+        except Exception:
+            ingest.discard()
+            uploads_total.inc(result="rejected")
+            raise UnsupportedPhotoType("Photo could not be decoded")
+        # The original appears last: its presence means every variant exists
+        original = f"original.{extension}"
+        os.replace(ingest.tmp_path, os.path.join(directory, original))
+        uploads_total.inc(result="stored")
+        return self._describe(sha256, original, content_type, ingest.size, width, height, False)
+
+    def _write_variants(self, source: str, directory: str) -> Tuple[int, int]:
+        with Image.open(source) as image:
+            width, height = _display_size(image)
+            # JPEG: let libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full resolution
+            image.draft("RGB", (INFERENCE_SIZE, INFERENCE_SIZE))
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            image.thumbnail((INFERENCE_SIZE, INFERENCE_SIZE), Image.BILINEAR)
+            _save_atomic(image, os.path.join(directory, VARIANTS["inference"]), quality=85)
+            image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.BILINEAR)
+            _save_atomic(image, os.path.join(directory, VARIANTS["thumb"]), quality=80)
+        return width, height
+
+    def _describe(self, sha256: str, original: str, content_type: str, size: int, width: int, height: int, deduplicated: bool) -> dict:
+        base = f"{MEDIA_URL_PREFIX}/{PHOTOS_DIR}/{sha256[:2]}/{sha256}"
+        return {
+            "sha256": sha256,
+            "content_type": content_type,
+            "size_bytes": size,
+            "width": width,
+            "height": height,
+            "deduplicated": deduplicated,
+            "url": f"{base}/{original}",
+            "thumbnail_url": f"{base}/{VARIANTS['thumb']}",
+            "inference_url": f"{base}/{VARIANTS['inference']}"
+        }
+
+    def resolve(self, prefix: str, sha256: str, name: str) -> Optional[str]:
+        """File path for a photo URL, or None if it is malformed or missing."""
+        if not SHA256_RE.match(sha256) or prefix != sha256[:2]:
+            return None
+        stem, _, extension = name.partition(".")
+        if not ((stem == "original" and extension in EXTENSION_TYPES) or name in VARIANTS.values()):
+            return None
+        path = os.path.join(self.blob_dir(sha256), name)
+        return path if os.path.isfile(path) else None
+
+def variant_url(photo_url: Optional[str], variant: str) -> Optional[str]:
+    """Map a stored photo URL to one of its variants; other URLs are returned unchanged."""
+    match = PHOTO_URL_RE.match(photo_url or "")
+    if not match:
+        return photo_url
+    sha256 = match.group(1)
+    return f"{MEDIA_URL_PREFIX}/{PHOTOS_DIR}/{sha256[:2]}/{sha256}/{VARIANTS[variant]}"
+
+def _save_atomic(image: Image.Image, path: str, quality: int):
+    # Unique temp name: concurrent uploads of the same new photo write the same variants
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            image.save(tmp, format="JPEG", quality=quality, optimize=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _display_size(image: Image.Image) -> Tuple[int, int]:
+    width, height = image.size
+    # EXIF orientations 5-8 are displayed rotated a quarter turn
+    if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+        return height, width
+    return width, height
+
+photo_store = PhotoStore()
@@ -0,0 +1,101 @@
+"""
+Stream an upload request body into a PhotoIngest without buffering it.
+
+Accepts multipart/form-data (the photo in a "file" field, parsed
+incrementally with python-multipart) or a raw image body (Content-Type
+image/*), which lets iOS background upload tasks send the file directly.
+"""
+from typing import Optional
+
+from fastapi import Request
+
+try:
+    from python_multipart.exceptions import ParseError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.exceptions import ParseError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from app.domains.media.service import PhotoIngest
+
+FILE_FIELD = "file"
+
+class InvalidUpload(Exception):
+    pass
+
+class _FilePartCollector:
+    """MultipartParser callbacks: route the "file" part's bytes into the ingest."""
+    def __init__(self, ingest: PhotoIngest):
+        self.ingest = ingest
+        self.found = False
+        self._in_file = False
+        self._header_field = b""
+        self._header_value = b""
+        self._headers = {}
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition"))
+        if options.get(b"name") == FILE_FIELD.encode() and b"filename" in options:
+            if self.found:
+                raise InvalidUpload("Only one photo per upload")
+            self.found = self._in_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self.ingest.write(data[start:end])
+
+    def on_part_end(self):
+        self._in_file = False
+
+async def stream_into(request: Request, ingest: PhotoIngest):
+    """Write the photo in the request body to ingest, chunk by chunk."""
+    content_type, options = parse_options_header(request.headers.get("content-type"))
+
+    if content_type == b"multipart/form-data":
+        boundary: Optional[bytes] = options.get(b"boundary")
+        if not boundary:
+            raise InvalidUpload("Missing multipart boundary")
+        collector = _FilePartCollector(ingest)
+        parser = MultipartParser(boundary, collector.callbacks())
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+            parser.finalize()
+        except ParseError as e:
+            raise InvalidUpload(f"Malformed multipart body: {e}")
+        if not collector.found:
+            raise InvalidUpload(f"No '{FILE_FIELD}' file field in upload")
+
+    elif content_type.startswith(b"image/"):
+        async for chunk in request.stream():
+            ingest.write(chunk)
+
+    else:
+        raise InvalidUpload("Send multipart/form-data or an image/* body")
+
+    if ingest.size == 0:
+        raise InvalidUpload("Empty upload")
@@ -1,10 +1,12 @@
-from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey
+from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, change_xid_column
 
 class SleepLog(Base):
     __tablename__ = "sleep_logs"
+    # Server defaults (created_at) are read back at flush for domain event payloads
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     child_id = Column(String(50), ForeignKey("children.id"), nullable=False)
@@ -13,5 +15,11 @@ class SleepLog(Base):
     quality_rating = Column(Integer, nullable=True) # 1-5
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    change_xid = change_xid_column()  # Delta sync watermark
 
     child = relationship("app.domains.children.models.Child")
+
+    __table_args__ = (
+        Index("ix_sleep_logs_child_xid", "child_id", "change_xid"),
+    )
@@ -1,15 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.core.database import get_db
+from app.core.responses import listing_response, schema_fields, sparse_fields
+from app.domains.analytics.service import analytics_service
 from . import models, schemas
 
 router = APIRouter()
 
+LIST_FIELDS = schema_fields(schemas.SleepLog, models.SleepLog)
+
 @router.post("/", response_model=schemas.SleepLog)
 def create_sleep_log(log: schemas.SleepLogCreate, db: Session = Depends(get_db)):
     db_log = models.SleepLog(**log.dict())
     db.add(db_log)
+    db.flush()
+    analytics_service.record_sleep(db, db_log)
     db.commit()
     db.refresh(db_log)
     return db_log
@@ -30,10 +36,13 @@ def update_sleep_log(log_id: int, log_update: schemas.SleepLogUpdate, db: Sessio
     for key, value in log_update.dict(exclude_unset=True).items():
         setattr(db_log, key, value)
     
+    db.flush()
+    analytics_service.record_sleep(db, db_log)
     db.commit()
     db.refresh(db_log)
     return db_log
 
 @router.get("/child/{child_id}", response_model=List[schemas.SleepLog])
-def get_child_sleep_logs(child_id: str, db: Session = Depends(get_db)):
-    return db.query(models.SleepLog).filter(models.SleepLog.child_id == child_id).order_by(models.SleepLog.start_time.desc()).all()
+def get_child_sleep_logs(child_id: str, fields: Optional[List[str]] = Depends(sparse_fields), db: Session = Depends(get_db)):
+    query = db.query(models.SleepLog).filter(models.SleepLog.child_id == child_id).order_by(models.SleepLog.start_time.desc())
+    return listing_response(query, models.SleepLog, fields, LIST_FIELDS)
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional
+from app.core.domain_events import DomainEvent
 
 class SleepLogBase(BaseModel):
     child_id: str
@@ -23,3 +24,11 @@ class SleepLog(SleepLogBase):
 
     class Config:
         from_attributes = True
+
+class SleepEvent(DomainEvent):
+    id_field = "sleep_log_id"
+    sleep_log_id: Optional[int] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    quality_rating: Optional[int] = None
+    created_at: Optional[datetime] = None
@@ -0,0 +1,158 @@
+"""
+Per-child change feed for delta sync (GET /children/{child_id}/changes).
+
+Every synced table has a `change_xid` column holding the id of the
+transaction that last wrote the row (pg_current_xact_id()) and a
+(child_id, change_xid) index; deletes leave a SyncTombstone. A client keeps
+the watermark from its last response and asks for rows stamped after it.
+
+The watermark is the snapshot xmin: every transaction with a lower id has
+finished, so no row stamped below it can still appear. Unlike a clock it
+only waits for transactions that have written something; sessions reading
+or sitting idle in a read-only transaction hold nothing back. It never
+moves backwards, and a client that receives a row twice just upserts it
+again.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Query, Session, undefer
+
+from app.domains.activities.models import Activity, LocationCheck
+from app.domains.alerts.models import Alert
+from app.domains.behavior.models import BehaviorLog
+from app.domains.hydration.models import HydrationLog
+from app.domains.knowledge.models import Entity
+from app.domains.meals.models import Meal
+from app.domains.sleep.models import SleepLog
+from app.domains.sync import models, schemas
+
+# Feed name -> model; names match the /children/{child_id}/<name>/ listings
+CHANGE_FEEDS = {
+    "meals": Meal,
+    "behavior": BehaviorLog,
+    "sleep": SleepLog,
+    "hydration": HydrationLog,
+    "activities": Activity,
+    "location": LocationCheck,
+    "knowledge": Entity,
+    "alerts": Alert,
+}
+FEED_BY_MODEL = {model: name for name, model in CHANGE_FEEDS.items()}
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+TOMBSTONE_RETENTION_DAYS = 90
+# Clients whose watermark is below this may have missed pruned tombstones and must resync in full
+TOMBSTONES_PRUNED = "tombstones_pruned"
+
+# Oldest transaction id that may still be running, or the next one to be assigned
+SETTLED_XID = text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+class ChangeFeed:
+    def changes_since(self, db: Session, child_id: str, since: Optional[int] = None,
+                      limit: int = DEFAULT_PAGE_SIZE) -> schemas.ChangeSet:
+        """
+        Rows of every feed changed after `since`, and ids deleted after it.
+        With has_more, call again with the returned watermark for the next page.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        # Everything stamped at or below `safe` has committed or rolled back
+        safe = db.execute(SETTLED_XID).scalar() - 1
+
+        reset = False
+        pruned = db.get(models.SyncCheckpoint, TOMBSTONES_PRUNED)
+        if since is not None and (since > safe or (pruned is not None and since < pruned.xid)):
+            # Too old for the retained tombstones, or not a watermark this feed issued
+            since, reset = None, True
+        since = since or 0
+        if safe <= since:
+            return schemas.ChangeSet(watermark=since, has_more=False, reset=reset, changes={}, deleted={})
+
+        pages: Dict[str, Tuple[list, Optional[int]]] = {}
+        for name, model in CHANGE_FEEDS.items():
+            query = db.query(model).options(undefer(model.change_xid)).filter(
+                model.child_id == child_id, model.change_xid <= safe
+            )
+            pages[name] = _page(query, model.change_xid, model.id, since, limit)
+        tombstones, tombstone_cut = _page(
+            db.query(models.SyncTombstone).options(undefer(models.SyncTombstone.change_xid)).filter(
+                models.SyncTombstone.child_id == child_id, models.SyncTombstone.change_xid <= safe
+            ),
+            models.SyncTombstone.change_xid, models.SyncTombstone.id, since, limit
+        )
+
+        # A feed that filled its page stops at `cut` (never past `safe`); hold
+        # every feed to the earliest such point so the next page can resume
+        # from one watermark, which therefore always moves forward
+        cuts = [cut for _, cut in pages.values() if cut] + ([tombstone_cut] if tombstone_cut else [])
+        cut = min(cuts) if cuts else None
+        watermark = cut if cut else safe
+
+        changes: Dict[str, List[Dict[str, Any]]] = {}
+        for name, (rows, _) in pages.items():
+            rows = [row for row in rows if cut is None or row.change_xid <= cut]
+            if rows:
+                changes[name] = [_row_dict(row) for row in rows]
+        deleted: Dict[str, List[int]] = {}
+        for tombstone in tombstones:
+            if cut is None or tombstone.change_xid <= cut:
+                deleted.setdefault(tombstone.entity, []).append(tombstone.record_id)
+
+        return schemas.ChangeSet(
+            watermark=watermark,
+            has_more=cut is not None,
+            reset=reset,
+            changes=changes,
+            deleted=deleted
+        )
+
+    def prune_tombstones(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Delete tombstones past retention; clients still behind the newest of them get a full resync."""
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+        pruned_through = db.execute(
+            select(func.max(models.SyncTombstone.change_xid)).where(models.SyncTombstone.deleted_at < cutoff)
+        ).scalar()
+        if pruned_through is None:
+            return 0
+        deleted = db.query(models.SyncTombstone).filter(
+            models.SyncTombstone.change_xid <= pruned_through,
+            models.SyncTombstone.deleted_at < cutoff
+        ).delete(synchronize_session=False)
+        stmt = pg_insert(models.SyncCheckpoint).values(name=TOMBSTONES_PRUNED, xid=pruned_through)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["name"], set_={"xid": func.greatest(models.SyncCheckpoint.xid, stmt.excluded.xid)}
+        ))
+        db.commit()
+        return deleted
+
+def _page(query: Query, stamp, id_column, since: int, limit: int) -> Tuple[list, Optional[int]]:
+    """
+    Up to `limit` rows stamped after `since`, oldest first, never splitting
+    rows that share a stamp. Returns (rows, cut); cut is the last stamp
+    returned when more rows remain, else None.
+    """
+    rows = query.filter(stamp > since).order_by(stamp, id_column).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    boundary = getattr(rows[limit], stamp.key)
+    kept = [row for row in rows[:limit] if getattr(row, stamp.key) < boundary]
+    if kept:
+        return kept, getattr(kept[-1], stamp.key)
+    # One transaction wrote more than a page: send all of its rows together
+    return query.filter(stamp == boundary).order_by(id_column).all(), boundary
+
+def _row_dict(row) -> Dict[str, Any]:
+    # Deferred attributes are derived (summary previews); reading them would query per row
+    return {attr.key: getattr(row, attr.key) for attr in inspect(row).mapper.column_attrs if not attr.deferred}
+
+@event.listens_for(Session, "before_flush")
+def _record_tombstones(session: Session, flush_context, instances):
+    for obj in session.deleted:
+        feed = FEED_BY_MODEL.get(type(obj))
+        if feed:
+            session.add(models.SyncTombstone(child_id=obj.child_id, entity=feed, record_id=obj.id))
+
+change_feed = ChangeFeed()
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Index
+from sqlalchemy.sql import func
+from app.core.database import Base, change_xid_column
+
+class SyncReceipt(Base):
+    """One row per client idempotency key accepted by /sync/batch."""
+    __tablename__ = "sync_receipts"
+
+    idempotency_key = Column(String(100), primary_key=True)
+    entry_type = Column(String(20), nullable=False)  # sleep, hydration, activity, location
+    record_id = Column(Integer, nullable=True)  # Row created for the key
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_sync_receipts_created", "created_at"),
+    )
+
+class SyncTombstone(Base):
+    """A deleted row, kept so delta sync can tell clients to drop it."""
+    __tablename__ = "sync_tombstones"
+
+    id = Column(BigInteger, primary_key=True)
+    child_id = Column(String(50), nullable=False)  # No foreign key: outlives the child's rows
+    entity = Column(String(30), nullable=False)  # Change feed name, e.g. "meals"
+    record_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    change_xid = change_xid_column()  # Delta sync watermark
+
+    __table_args__ = (
+        Index("ix_sync_tombstones_child_xid", "child_id", "change_xid"),
+        Index("ix_sync_tombstones_deleted", "deleted_at"),  # Pruning
+    )
+
+class SyncCheckpoint(Base):
+    """A named delta sync mark, e.g. the newest pruned tombstone's change_xid."""
+    __tablename__ = "sync_checkpoints"
+
+    name = Column(String(50), primary_key=True)
+    xid = Column(BigInteger, nullable=False)
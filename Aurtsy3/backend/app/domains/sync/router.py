@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from . import schemas
+from .service import sync_service, MAX_BATCH_ENTRIES
+
+router = APIRouter()
+
+@router.post("/batch", response_model=schemas.SyncBatchResult)
+def sync_batch(batch: schemas.SyncBatch, db: Session = Depends(get_db)):
+    """
+    Ingest sleep, hydration, activity and location logs recorded offline.
+    Each entry has a "type" and a client-generated "idempotency_key"; resending
+    a batch is safe. Results are returned per entry, in request order.
+    """
+    if len(batch.entries) > MAX_BATCH_ENTRIES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_ENTRIES} entries per batch")
+    return sync_service.ingest_batch(db, batch.entries)
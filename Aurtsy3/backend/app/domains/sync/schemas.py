@@ -0,0 +1,48 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+from app.domains.sleep.schemas import SleepLogCreate
+from app.domains.hydration.schemas import HydrationLogCreate
+from app.domains.activities.schemas import ActivityCreate, LocationCheckCreate
+
+class SyncEntryFields(BaseModel):
+    # Client-generated (UUID); replays return the original record. Bounded by sync_receipts.idempotency_key
+    idempotency_key: str = Field(..., min_length=1, max_length=100)
+    created_at: Optional[datetime] = None  # When it was logged on the device; defaults to now
+
+class SleepEntry(SleepLogCreate, SyncEntryFields):
+    type: Literal["sleep"]
+
+class HydrationEntry(HydrationLogCreate, SyncEntryFields):
+    type: Literal["hydration"]
+
+class ActivityEntry(ActivityCreate, SyncEntryFields):
+    type: Literal["activity"]
+
+class LocationEntry(LocationCheckCreate, SyncEntryFields):
+    type: Literal["location"]
+
+class SyncBatch(BaseModel):
+    # Raw dicts: each entry is validated on its own so one bad entry doesn't reject the batch
+    entries: List[Dict[str, Any]]
+
+class SyncItemResult(BaseModel):
+    index: int
+    idempotency_key: Optional[str] = None
+    type: Optional[str] = None
+    status: str  # created, duplicate, invalid
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class SyncBatchResult(BaseModel):
+    created: int
+    duplicates: int
+    invalid: int
+    results: List[SyncItemResult]
+
+class ChangeSet(BaseModel):
+    watermark: int  # Pass back as ?since= on the next call
+    has_more: bool  # More changes past this page; fetch again right away
+    reset: bool = False  # Watermark too old: this is a full snapshot, drop the local replica first
+    changes: Dict[str, List[Dict[str, Any]]]  # Feed name -> rows created or updated
+    deleted: Dict[str, List[int]]  # Feed name -> ids deleted
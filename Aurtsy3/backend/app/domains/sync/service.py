@@ -0,0 +1,193 @@
+"""
+Bulk ingestion for devices syncing logs recorded offline.
+
+A batch is validated entry by entry in one pass (bad entries are reported,
+not fatal), then written in a single transaction:
+  1. claim every idempotency key with one INSERT .. ON CONFLICT DO NOTHING
+     RETURNING; keys already claimed are replays and return their record
+  2. one executemany INSERT .. RETURNING per log table
+  3. one executemany UPDATE recording each receipt's record id
+Claiming keys first makes concurrent retries of the same batch safe: the
+second transaction waits on the first's receipt rows and then sees them.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.domain_events import queue_created
+from app.core.http_cache import touch
+from app.core.metrics import metrics
+from app.domains.activities.models import Activity, LocationCheck
+from app.domains.analytics.service import analytics_service
+from app.domains.children.models import Child
+from app.domains.hydration.models import HydrationLog
+from app.domains.sleep.models import SleepLog
+from app.domains.sync import models, schemas
+
+MAX_BATCH_ENTRIES = 1000
+RECEIPT_RETENTION_DAYS = 30
+
+ENTRY_TYPES = {
+    "sleep": (schemas.SleepEntry, SleepLog),
+    "hydration": (schemas.HydrationEntry, HydrationLog),
+    "activity": (schemas.ActivityEntry, Activity),
+    "location": (schemas.LocationEntry, LocationCheck),
+}
+SYNC_FIELDS = {"type", "idempotency_key", "created_at"}
+
+entries_total = metrics.counter(
+    "sync_batch_entries_total",
+    "Entries received by /sync/batch",
+    labelnames=("type", "status")
+)
+
+class SyncService:
+    def ingest_batch(self, db: Session, entries: List[Dict[str, Any]]) -> schemas.SyncBatchResult:
+        results: List[Optional[schemas.SyncItemResult]] = [None] * len(entries)
+        valid, repeats = self._validate(db, entries, results)
+
+        if valid:
+            new = self._claim_keys(db, valid, results)
+            created_ids = self._insert_logs(db, new, results)
+            if created_ids:
+                db.execute(update(models.SyncReceipt), [
+                    {"idempotency_key": key, "record_id": record_id} for key, record_id in created_ids.items()
+                ])
+            self._record_sleep(db, [entry for _, entry in new if entry.type == "sleep"])
+            db.commit()
+
+        # Repeats of a key inside the batch point at the first occurrence's record
+        for index, first in repeats.items():
+            original = results[first]
+            results[index] = schemas.SyncItemResult(
+                index=index, idempotency_key=original.idempotency_key, type=original.type,
+                status="duplicate" if original.status != "invalid" else "invalid",
+                id=original.id, error=original.error
+            )
+
+        counts = defaultdict(int)
+        for result in results:
+            counts[result.status] += 1
+            entries_total.inc(type=result.type or "unknown", status=result.status)
+        return schemas.SyncBatchResult(
+            created=counts["created"], duplicates=counts["duplicate"], invalid=counts["invalid"], results=results
+        )
+
+    def prune_receipts(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Forget idempotency keys older than the retry horizon."""
+        cutoff = (now or datetime.utcnow()) - timedelta(days=RECEIPT_RETENTION_DAYS)
+        deleted = db.query(models.SyncReceipt).filter(models.SyncReceipt.created_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def _validate(self, db: Session, entries: List[Dict[str, Any]], results) -> Tuple[List[Tuple[int, BaseModel]], Dict[int, int]]:
+        valid: List[Tuple[int, BaseModel]] = []
+        first_index: Dict[str, int] = {}
+        repeats: Dict[int, int] = {}
+
+        for index, raw in enumerate(entries):
+            entry_type = raw.get("type")
+            key = raw.get("idempotency_key")
+            spec = ENTRY_TYPES.get(entry_type) if isinstance(entry_type, str) else None
+            if spec is None:
+                results[index] = _invalid(index, key, entry_type, f"Unknown entry type: {entry_type}")
+                continue
+            try:
+                entry = spec[0].parse_obj(raw)
+            except ValidationError as e:
+                error = e.errors()[0]
+                results[index] = _invalid(index, key, entry_type, f"{'.'.join(str(p) for p in error['loc'])}: {error['msg']}")
+                continue
+            if entry.idempotency_key in first_index:
+                repeats[index] = first_index[entry.idempotency_key]
+                continue
+            first_index[entry.idempotency_key] = index
+            valid.append((index, entry))
+
+        # Unknown children would fail the foreign key and abort the whole transaction
+        child_ids = {entry.child_id for _, entry in valid}
+        known = {child_id for (child_id,) in db.query(Child.id).filter(Child.id.in_(child_ids))} if child_ids else set()
+        checked = []
+        for index, entry in valid:
+            if entry.child_id in known:
+                checked.append((index, entry))
+            else:
+                results[index] = _invalid(index, entry.idempotency_key, entry.type, "Child not found")
+        return checked, repeats
+
+    def _claim_keys(self, db: Session, valid: List[Tuple[int, BaseModel]], results) -> List[Tuple[int, BaseModel]]:
+        claimed = set(db.execute(
+            pg_insert(models.SyncReceipt)
+            .values([{"idempotency_key": entry.idempotency_key, "entry_type": entry.type} for _, entry in valid])
+            .on_conflict_do_nothing(index_elements=["idempotency_key"])
+            .returning(models.SyncReceipt.idempotency_key)
+        ).scalars())
+
+        replayed = [(index, entry) for index, entry in valid if entry.idempotency_key not in claimed]
+        if replayed:
+            receipts = {
+                receipt.idempotency_key: receipt for receipt in db.query(models.SyncReceipt).filter(
+                    models.SyncReceipt.idempotency_key.in_([entry.idempotency_key for _, entry in replayed])
+                )
+            }
+            for index, entry in replayed:
+                receipt = receipts[entry.idempotency_key]
+                if receipt.entry_type != entry.type:
+                    results[index] = _invalid(
+                        index, entry.idempotency_key, entry.type,
+                        f"Idempotency key already used for a {receipt.entry_type} entry"
+                    )
+                else:
+                    results[index] = schemas.SyncItemResult(
+                        index=index, idempotency_key=entry.idempotency_key, type=entry.type,
+                        status="duplicate", id=receipt.record_id
+                    )
+        return [(index, entry) for index, entry in valid if entry.idempotency_key in claimed]
+
+    def _insert_logs(self, db: Session, new: List[Tuple[int, BaseModel]], results) -> Dict[str, int]:
+        by_type: Dict[str, List[Tuple[int, BaseModel]]] = defaultdict(list)
+        for index, entry in new:
+            by_type[entry.type].append((index, entry))
+
+        now = datetime.now(timezone.utc)
+        created_ids: Dict[str, int] = {}
+        for entry_type, group in by_type.items():
+            model = ENTRY_TYPES[entry_type][1]
+            # Every row carries the same keys so the driver can batch them into multi-row INSERTs
+            rows = [dict(entry.dict(exclude=SYNC_FIELDS), created_at=entry.created_at or now) for _, entry in group]
+            inserted = db.execute(
+                insert(model).returning(model.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+
+            for (index, entry), record_id in zip(group, inserted):
+                results[index] = schemas.SyncItemResult(
+                    index=index, idempotency_key=entry.idempotency_key, type=entry_type, status="created", id=record_id
+                )
+                created_ids[entry.idempotency_key] = record_id
+            queue_created(db, model, [dict(row, id=record_id) for row, record_id in zip(rows, inserted)])
+            touch(db, model.__tablename__, {row["child_id"] for row in rows})
+        return created_ids
+
+    def _record_sleep(self, db: Session, sleeps: List[BaseModel]):
+        """Feed each child's latest completed sleep to the regulation battery, once per child."""
+        latest: Dict[str, BaseModel] = {}
+        for sleep in sleeps:
+            if sleep.end_time and (sleep.child_id not in latest or sleep.start_time > latest[sleep.child_id].start_time):
+                latest[sleep.child_id] = sleep
+        for sleep in latest.values():
+            analytics_service.record_sleep(
+                db, SleepLog(child_id=sleep.child_id, start_time=sleep.start_time, end_time=sleep.end_time)
+            )
+
+def _invalid(index: int, key: Optional[str], entry_type: Optional[str], error: str) -> schemas.SyncItemResult:
+    return schemas.SyncItemResult(
+        index=index, idempotency_key=key if isinstance(key, str) else None,
+        type=entry_type if isinstance(entry_type, str) else None, status="invalid", error=error
+    )
+
+sync_service = SyncService()
@@ -0,0 +1,29 @@
+from celery import shared_task
+import logging
+from app.core.database import SessionLocal
+from app.domains.sync.changes import change_feed
+from app.domains.sync.service import sync_service
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def prune_sync_receipts():
+    """Drop idempotency keys past the client retry horizon."""
+    db = SessionLocal()
+    try:
+        deleted = sync_service.prune_receipts(db)
+        logger.info(f"Pruned {deleted} sync receipts")
+        return {"success": True, "deleted": deleted}
+    finally:
+        db.close()
+
+@shared_task
+def prune_sync_tombstones():
+    """Drop tombstones older than any watermark a client may still resume from."""
+    db = SessionLocal()
+    try:
+        deleted = change_feed.prune_tombstones(db)
+        logger.info(f"Pruned {deleted} sync tombstones")
+        return {"success": True, "deleted": deleted}
+    finally:
+        db.close()
@@ -1,5 +1,9 @@
 from fastapi import FastAPI
+import os
+from fastapi.responses import PlainTextResponse
 from app.core.database import engine, Base
+from app.core.compression import CompressionMiddleware
+from app.core.responses import FastJSONResponse
 from app.domains.users import router as users_router, models as user_models
 from app.domains.children import router as children_router, models as child_models
 from app.domains.meals import router as meals_router, models as meal_models
@@ -10,15 +14,21 @@ from app.domains.sleep import router as sleep_router, models as sleep_models
 from app.domains.behavior import router as behavior_router, models as behavior_models
 from app.domains.activities import router as activity_router, models as activity_models
 from app.domains.hydration import router as hydration_router, models as hydration_models
-from app.domains.analytics import router as analytics_router, schemas as analytics_schemas
+from app.domains.analytics import router as analytics_router, schemas as analytics_schemas, models as analytics_models
 from app.domains.chat import router as chat_router, models as chat_models
+from app.domains.media import router as media_router
+from app.domains.sync import router as sync_router, models as sync_models
+from app.domains import events as domain_events  # Publishes domain events after each commit
+from app.domains.sync import changes as sync_changes  # Records tombstones for deleted rows
 
 # Create tables (in a real app, use Alembic migrations)
 # Import all models to ensure they are registered with Base
 from app.core.database import Base
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Aurtsy API", version="0.3.0")
+app = FastAPI(title="Aurtsy API", version="0.3.0", default_response_class=FastJSONResponse)
+# brotli/gzip for bodies of 1KB and up; listings of notes and analysis JSON shrink 5-10x
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
 
 # Include Routers
 app.include_router(users_router.router, prefix="/users", tags=["users"])
@@ -33,6 +43,8 @@ app.include_router(children_router.router, prefix="/children", tags=["children"]
 # "let url = URL(string: "\(baseURL)/meals/?user_id=\(currentUser?.id ?? "unknown")")"
 # So it uses /meals directly.
 app.include_router(meals_router.router, prefix="/meals", tags=["meals"])
+app.include_router(media_router.router, prefix="/media", tags=["media"])
+app.include_router(sync_router.router, prefix="/sync", tags=["sync"])
 app.include_router(ai_router.router, prefix="/ai", tags=["ai"])
 app.include_router(knowledge_router.router, prefix="/knowledge", tags=["knowledge"])
 app.include_router(alerts_router.router, prefix="/alerts", tags=["alerts"])
@@ -43,6 +55,26 @@ app.include_router(hydration_router.router, prefix="/hydration", tags=["hydratio
 app.include_router(analytics_router.router, prefix="/analytics", tags=["analytics"])
 app.include_router(chat_router.router, prefix="/chat", tags=["chat"])
 
+# Real-time alert rules listen to the write-path events
+from app.core.events import event_bus
+from app.domains.alerts.rules import alert_rule_engine
+alert_rule_engine.register(event_bus)
+from app.domains.meals.analysis import meal_analysis_dispatcher
+meal_analysis_dispatcher.register(event_bus)
+
+# Durable backend only: consume in every API worker unless a dedicated
+# consumer process is used (EVENT_BUS_CONSUMERS=0, see run_event_consumers.py)
+if os.getenv("EVENT_BUS_CONSUMERS", "1") == "1":
+    app.on_event("startup")(event_bus.start)
+    app.on_event("shutdown")(event_bus.stop)
+
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    from app.core.llm import ollama_client
+    # Circuit state only; no request is made to the backends
+    return {"status": "healthy", "llm_backends": ollama_client.backend_states()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    from app.core.metrics import metrics
+    return metrics.render()
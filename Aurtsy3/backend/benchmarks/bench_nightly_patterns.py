@@ -0,0 +1,126 @@
+"""
+Benchmark the nightly pattern analysis: the old per-child loop (one query and
+one commit per alert) against the chunked path used by the Celery chord.
+
+Seeds synthetic children and meals into DATABASE_URL, runs both variants and
+removes everything it created. Point it at a scratch database:
+
+    DATABASE_URL=postgresql://... python benchmarks/bench_nightly_patterns.py --children 10000
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+import app.main  # noqa: F401  Registers every model and creates the tables
+from app.core.database import SessionLocal
+from app.domains.alerts import models as alert_models
+from app.domains.alerts.service import alert_service
+from app.domains.alerts.tasks import analyze_patterns_chunk, CHILDREN_PER_CHUNK
+from app.domains.children import models as child_models
+from app.domains.meals import models as meal_models
+from app.domains.users import models as user_models
+
+PREFIX = "bench_np_"
+USER_ID = f"{PREFIX}user"
+
+
+def seed(db, children: int):
+    now = datetime.utcnow()
+    db.execute(insert(user_models.User), [{
+        "id": USER_ID, "email": f"{USER_ID}@example.com", "role": user_models.RoleEnum.CAREGIVER
+    }])
+    child_ids = [f"{PREFIX}{i:06d}" for i in range(children)]
+    db.execute(insert(child_models.Child), [{"id": cid, "name": f"Synthetic {cid}"} for cid in child_ids])
+
+    meals = []
+    for cid in child_ids:
+        for _ in range(random.randint(0, 21)):
+            meals.append({
+                "child_id": cid,
+                "user_id": USER_ID,
+                "meal_type": meal_models.MealType.SNACK,
+                "created_at": now - timedelta(minutes=random.randint(0, 7 * 24 * 60))
+            })
+    db.execute(insert(meal_models.Meal), meals)
+    db.commit()
+    return child_ids, len(meals)
+
+
+def clear_alerts(db, child_ids):
+    db.query(alert_models.Alert).filter(alert_models.Alert.child_id.in_(child_ids)).delete(synchronize_session=False)
+    db.commit()
+
+
+def cleanup(db, child_ids):
+    clear_alerts(db, child_ids)
+    db.query(meal_models.Meal).filter(meal_models.Meal.user_id == USER_ID).delete(synchronize_session=False)
+    db.query(child_models.Child).filter(child_models.Child.id.in_(child_ids)).delete(synchronize_session=False)
+    db.query(user_models.User).filter(user_models.User.id == USER_ID).delete(synchronize_session=False)
+    db.commit()
+
+
+def run_serial_per_child(db, child_ids):
+    """The original task body: one query per child, one commit per alert."""
+    created = 0
+    for child_id in child_ids:
+        for alert_data in alert_service.analyze_patterns(db, child_id):
+            alert_service.create_alert(db, alert_data)
+            created += 1
+    return created
+
+
+def run_chunked(child_ids, run_key, workers):
+    chunks = [child_ids[i:i + CHILDREN_PER_CHUNK] for i in range(0, len(child_ids), CHILDREN_PER_CHUNK)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda chunk: analyze_patterns_chunk(chunk, run_key), chunks))
+    return sum(r["alerts_created"] for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--children", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=4, help="Simulated Celery worker concurrency")
+    parser.add_argument("--skip-serial", action="store_true", help="Skip the slow per-child baseline")
+    args = parser.parse_args()
+
+    random.seed(42)
+    db = SessionLocal()
+    print(f"Seeding {args.children} children...")
+    child_ids, meal_count = seed(db, args.children)
+    print(f"Seeded {len(child_ids)} children, {meal_count} meals")
+
+    try:
+        if not args.skip_serial:
+            start = time.perf_counter()
+            created = run_serial_per_child(db, child_ids)
+            elapsed = time.perf_counter() - start
+            print(f"serial per-child: {elapsed:8.2f}s  {created} alerts  {len(child_ids) / elapsed:8.0f} children/s")
+            clear_alerts(db, child_ids)
+
+        for workers in (1, args.workers):
+            run_key = f"{PREFIX}run_{workers}"
+            start = time.perf_counter()
+            created = run_chunked(child_ids, run_key, workers)
+            elapsed = time.perf_counter() - start
+            print(f"chunked x{workers:<2}:      {elapsed:8.2f}s  {created} alerts  {len(child_ids) / elapsed:8.0f} children/s")
+
+            start = time.perf_counter()
+            rerun_created = run_chunked(child_ids, run_key, workers)
+            elapsed = time.perf_counter() - start
+            print(f"  rerun (same run_key): {elapsed:6.2f}s  {rerun_created} duplicate alerts")
+            clear_alerts(db, child_ids)
+    finally:
+        cleanup(db, child_ids)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
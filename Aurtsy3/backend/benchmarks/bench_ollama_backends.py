@@ -0,0 +1,135 @@
+"""
+Benchmark OllamaClient routing across several backends, against local fake
+Ollama servers (fake_ollama.py), so no model or GPU is needed:
+
+- tail latency: one backend vs two least-loaded vs two with hedging, where
+  every request has a small chance of being slow, and how many extra
+  requests the hedges cost;
+- outage: one backend answering 503, then refusing connections, then both
+  down: requests the failing backend still receives, caller errors, and
+  how fast a call gives up once every circuit is open;
+- recovery: the backend comes back and its circuit closes after a probe.
+
+Calls go through the scheduler and in-flight tracking, so REDIS_URL must
+be reachable:
+
+    python benchmarks/bench_ollama_backends.py --requests 400 --concurrency 2
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OLLAMA_CIRCUIT_RESET_SECONDS", "2")
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core import llm
+from app.core.llm import BackendUnavailable, OllamaClient
+from benchmarks.fake_ollama import FakeOllama
+
+MESSAGES = [{"role": "user", "content": "How was lunch today?"}]
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def run(client, count, concurrency):
+    """Latencies of successful calls and the number of failed ones."""
+    def call(_):
+        start = time.perf_counter()
+        try:
+            client.chat(MESSAGES, priority=llm.NEAR_REAL_TIME)
+        except Exception:
+            return None
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(call, range(count)))
+    latencies = [r for r in results if r is not None]
+    return latencies, len(results) - len(latencies)
+
+
+def tail_latency(args):
+    print(f"Tail latency, {args.requests} calls x {args.concurrency} threads, "
+          f"{args.latency * 1000:.0f} ms with {args.slow_rate:.0%} at {args.slow_latency * 1000:.0f} ms:")
+    print(f"  {'':<26} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'sent':>6}")
+    for label, backends, hedge in (("one backend", 1, False), ("two, least-loaded", 2, False), ("two, hedged at p95", 2, True)):
+        fakes = [FakeOllama(latency=args.latency, slow_rate=args.slow_rate, slow_latency=args.slow_latency, seed=i).start()
+                 for i in range(backends)]
+        try:
+            client = OllamaClient(base_urls=[fake.url for fake in fakes], hedge=hedge)
+            latencies, failed = run(client, args.requests, args.concurrency)
+            time.sleep(args.slow_latency)  # Let dropped hedge losers finish before counting
+            cells = " ".join(f"{percentile(latencies, q) * 1000:8.0f}" for q in (0.5, 0.95, 0.99, 1.0))
+            sent = sum(fake.requests for fake in fakes)
+            print(f"  {label:<26} {cells} {sent:>6}" + (f"  ({failed} failed)" if failed else ""))
+        finally:
+            for fake in fakes:
+                fake.stop()
+
+
+def outage(args):
+    print(f"\nOutage (breaker opens after {llm.CIRCUIT_FAILURES} failures, probes after {llm.CIRCUIT_RESET_SECONDS:.0f}s):")
+    healthy = FakeOllama(latency=args.latency).start()
+    flaky = FakeOllama(latency=args.latency).start()
+    client = OllamaClient(base_urls=[healthy.url, flaky.url])
+    count = 100
+    try:
+        for label, break_it in (("503s", lambda: setattr(flaky, "failing", True)), ("connection refused", flaky.stop)):
+            flaky.requests = 0
+            break_it()
+            latencies, failed = run(client, count, args.concurrency)
+            print(f"  flaky backend {label:<20} it got {flaky.requests:>3} of {count} calls, "
+                  f"{failed} failed, p95 {percentile(latencies, 0.95) * 1000:.0f} ms  {client.backend_states()}")
+
+        healthy.stop()
+        start = time.perf_counter()
+        for _ in range(llm.CIRCUIT_FAILURES + 1):
+            try:
+                client.chat(MESSAGES)
+            except BackendUnavailable:
+                break
+            except Exception:
+                pass
+        fail_fast = time.perf_counter()
+        try:
+            client.chat(MESSAGES)
+        except BackendUnavailable:
+            pass
+        print(f"  both down: tripped in {(fail_fast - start) * 1000:.0f} ms, "
+              f"then calls fail in {(time.perf_counter() - fail_fast) * 1e6:.0f} us")
+
+        healthy.start()
+        flaky.failing = False
+        flaky.start()
+        start = time.perf_counter()
+        while any(state != "closed" for state in client.backend_states().values()) and time.perf_counter() - start < 30:
+            try:
+                client.chat(MESSAGES)
+            except BackendUnavailable:
+                pass
+            time.sleep(0.1)
+        print(f"  recovery: {client.backend_states()} after {time.perf_counter() - start:.1f}s")
+    finally:
+        healthy.stop()
+        flaky.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--slow-rate", type=float, default=0.02)
+    parser.add_argument("--slow-latency", type=float, default=1.0)
+    args = parser.parse_args()
+
+    tail_latency(args)
+    outage(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark listing responses: serialization time of the old path (pydantic
+models through jsonable_encoder and the stdlib JSONResponse) against
+FastJSONResponse, and payload size on the wire, identity vs gzip vs brotli,
+with and without a ?fields= sparse fieldset.
+
+Seeds behavior logs with realistic notes and analysis_data under a synthetic
+child, runs in-process through TestClient against DATABASE_URL and removes
+everything it created. Point it at a scratch database:
+
+    DATABASE_URL=postgresql://... python benchmarks/bench_response_payloads.py --logs 500
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.compression import brotli
+from app.core.database import SessionLocal
+from app.core.responses import FastJSONResponse, row_dict, schema_fields
+from app.domains.analytics import models as analytics_models
+from app.domains.behavior import models as behavior_models
+from app.domains.behavior import schemas as behavior_schemas
+from app.domains.children import models as child_models
+
+PREFIX = "bench_payload_"
+SPARSE_FIELDS = "id,behavior_type,mood_rating,created_at"
+
+WORDS = (
+    "transition", "lunch", "sensory", "noise", "calm", "corner", "break", "timer",
+    "visual", "schedule", "sibling", "tablet", "bedtime", "shoes", "car", "hungry",
+)
+
+
+def sentence(length):
+    return " ".join(random.choice(WORDS) for _ in range(length)).capitalize() + "."
+
+
+def make_logs(child_id, count):
+    now = datetime.utcnow()
+    return [
+        behavior_models.BehaviorLog(
+            child_id=child_id,
+            behavior_type=random.choice(["meltdown", "positive", "anxiety", "shutdown"]),
+            mood_rating=random.randint(1, 5),
+            incident_description=" ".join(sentence(14) for _ in range(4)),
+            notes=" ".join(sentence(12) for _ in range(6)),
+            analysis_data={
+                "antecedent": sentence(10),
+                "behavior": sentence(10),
+                "consequence": sentence(10),
+                "triggers": random.sample(WORDS, 4),
+                "strategies": [{"name": sentence(3), "effective": random.random() > 0.5} for _ in range(3)],
+                "status": "completed"
+            },
+            created_at=now - timedelta(minutes=random.randint(0, 30 * 24 * 60))
+        )
+        for _ in range(count)
+    ]
+
+
+def time_render(label, render, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        body = render()
+    elapsed = (time.perf_counter() - start) / repeats
+    print(f"  {label:<34} {elapsed * 1000:8.2f} ms  {len(body):>9} bytes")
+
+
+def wire_size(client, path, encoding):
+    response = client.get(path, headers={"Accept-Encoding": encoding})
+    response.raise_for_status()
+    # TestClient decodes the body; Content-Length is what went over the wire
+    return int(response.headers["content-length"]), response.headers.get("content-encoding", "identity")
+
+
+def cleanup(db, child_id):
+    db.query(behavior_models.BehaviorLog).filter(behavior_models.BehaviorLog.child_id == child_id).delete(synchronize_session=False)
+    db.query(analytics_models.RegulationBatteryState).filter(analytics_models.RegulationBatteryState.child_id == child_id).delete(synchronize_session=False)
+    db.query(child_models.Child).filter(child_models.Child.id == child_id).delete(synchronize_session=False)
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logs", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(42)
+    client = TestClient(app)
+    db = SessionLocal()
+    child_id = f"{PREFIX}child"
+    db.add(child_models.Child(id=child_id, name="Synthetic payload child"))
+    db.commit()
+    db.add_all(make_logs(child_id, args.logs))
+    db.commit()
+
+    try:
+        rows = db.query(behavior_models.BehaviorLog).filter(behavior_models.BehaviorLog.child_id == child_id).all()
+        print(f"Serializing {len(rows)} behavior logs (mean of {args.repeats}):")
+        time_render(
+            "pydantic + jsonable_encoder + json",
+            lambda: JSONResponse(jsonable_encoder([behavior_schemas.BehaviorLog.from_orm(row) for row in rows])).body,
+            args.repeats
+        )
+        # Same columns as the schema, so both bodies carry the same data
+        columns = schema_fields(behavior_schemas.BehaviorLog, behavior_models.BehaviorLog)
+        time_render("FastJSONResponse (orjson, rows)", lambda: FastJSONResponse([row_dict(row, columns) for row in rows]).body, args.repeats)
+
+        encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+        print(f"\nWire size of /children/{{id}}/behavior/?limit={args.logs}:")
+        for label, query in (("all columns", ""), (f"fields={SPARSE_FIELDS}", f"&fields={SPARSE_FIELDS}")):
+            path = f"/children/{child_id}/behavior/?limit={args.logs}{query}"
+            sizes = [wire_size(client, path, encoding) for encoding in encodings]
+            cells = "  ".join(f"{encoding}: {size:>9}" for size, encoding in sizes)
+            print(f"  {label:<52} {cells}")
+        if brotli is None:
+            print("  (brotli not installed: br omitted, the server falls back to gzip)")
+    finally:
+        cleanup(db, child_id)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
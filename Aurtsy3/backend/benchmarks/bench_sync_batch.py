@@ -0,0 +1,128 @@
+"""
+Benchmark offline-sync ingestion: one POST per log (what the app did before
+/sync/batch) against /sync/batch, plus an idempotent replay of the batches.
+
+Runs in-process through TestClient against DATABASE_URL and removes
+everything it created. Point it at a scratch database:
+
+    DATABASE_URL=postgresql://... python benchmarks/bench_sync_batch.py --entries 2000
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.database import SessionLocal
+from app.domains.activities import models as activity_models
+from app.domains.analytics import models as analytics_models
+from app.domains.children import models as child_models
+from app.domains.hydration import models as hydration_models
+from app.domains.sleep import models as sleep_models
+from app.domains.sync import models as sync_models
+from app.domains.sync.service import MAX_BATCH_ENTRIES
+
+PREFIX = "bench_sync_"
+ENDPOINTS = {"sleep": "/sleep/", "hydration": "/hydration/", "activity": "/activities/"}
+LOG_MODELS = (sleep_models.SleepLog, hydration_models.HydrationLog, activity_models.Activity)
+
+
+def make_entries(child_ids, count):
+    now = datetime.utcnow()
+    entries = []
+    for _ in range(count):
+        child_id = random.choice(child_ids)
+        logged_at = now - timedelta(minutes=random.randint(0, 3 * 24 * 60))
+        entry_type = random.choice(list(ENDPOINTS))
+        if entry_type == "sleep":
+            fields = {
+                "start_time": logged_at.isoformat(),
+                "end_time": (logged_at + timedelta(minutes=random.randint(20, 600))).isoformat()
+            }
+        elif entry_type == "hydration":
+            fields = {"fluid_type": random.choice(["WATER", "MILK", "JUICE"]), "amount_ml": random.randint(50, 300)}
+        else:
+            fields = {"activity_type": random.choice(["PLAY", "READING", "OUTDOOR"]), "details": {"duration_minutes": random.randint(5, 90)}}
+        entries.append(dict(fields, type=entry_type, child_id=child_id))
+    return entries
+
+
+def run_per_row(client, entries):
+    for entry in entries:
+        body = {k: v for k, v in entry.items() if k != "type"}
+        response = client.post(ENDPOINTS[entry["type"]], json=body)
+        response.raise_for_status()
+
+
+def run_batched(client, entries, batch_size):
+    totals = {"created": 0, "duplicates": 0, "invalid": 0}
+    for i in range(0, len(entries), batch_size):
+        response = client.post("/sync/batch", json={"entries": entries[i:i + batch_size]})
+        response.raise_for_status()
+        for key in totals:
+            totals[key] += response.json()[key]
+    return totals
+
+
+def cleanup(db, child_ids, keys=()):
+    for model in LOG_MODELS:
+        db.query(model).filter(model.child_id.in_(child_ids)).delete(synchronize_session=False)
+    if keys:
+        db.query(sync_models.SyncReceipt).filter(sync_models.SyncReceipt.idempotency_key.in_(keys)).delete(synchronize_session=False)
+    db.query(analytics_models.RegulationBatteryState).filter(analytics_models.RegulationBatteryState.child_id.in_(child_ids)).delete(synchronize_session=False)
+    db.query(child_models.Child).filter(child_models.Child.id.in_(child_ids)).delete(synchronize_session=False)
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--children", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    batch_size = min(args.batch_size, MAX_BATCH_ENTRIES)
+
+    random.seed(42)
+    client = TestClient(app)
+    db = SessionLocal()
+    child_ids = [f"{PREFIX}{i:04d}" for i in range(args.children)]
+    db.add_all([child_models.Child(id=cid, name=f"Synthetic {cid}") for cid in child_ids])
+    db.commit()
+
+    entries = make_entries(child_ids, args.entries)
+    keys = []
+    try:
+        start = time.perf_counter()
+        run_per_row(client, entries)
+        elapsed = time.perf_counter() - start
+        print(f"per-row POSTs:     {elapsed:8.2f}s  {len(entries) / elapsed:8.0f} entries/s")
+        cleanup(db, child_ids)
+        db.add_all([child_models.Child(id=cid, name=f"Synthetic {cid}") for cid in child_ids])
+        db.commit()
+
+        for entry in entries:
+            entry["idempotency_key"] = f"{PREFIX}{uuid.uuid4()}"
+            keys.append(entry["idempotency_key"])
+        start = time.perf_counter()
+        totals = run_batched(client, entries, batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"/sync/batch x{batch_size:<4}: {elapsed:8.2f}s  {len(entries) / elapsed:8.0f} entries/s  {totals}")
+
+        start = time.perf_counter()
+        totals = run_batched(client, entries, batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"  replay:          {elapsed:8.2f}s  {len(entries) / elapsed:8.0f} entries/s  {totals}")
+    finally:
+        cleanup(db, child_ids, keys)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
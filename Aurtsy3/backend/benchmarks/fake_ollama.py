@@ -0,0 +1,123 @@
+"""
+A stand-in Ollama server for exercising OllamaClient without a model:
+answers /api/tags, /api/chat and /api/generate after a configurable delay
+with an occasional slow tail, and can be switched to answer 503 or be
+stopped outright (connection refused) to trip circuit breakers.
+
+Used in-process by bench_ollama_backends.py, or standalone to point the API
+at a few of them:
+
+    python benchmarks/fake_ollama.py --port 11501 --latency 0.2 --slow-rate 0.05 --slow-latency 4 &
+    python benchmarks/fake_ollama.py --port 11502 --latency 0.2 --slow-rate 0.05 --slow-latency 4 &
+    OLLAMA_BASE_URLS=http://localhost:11501,http://localhost:11502 OLLAMA_HEDGE=true uvicorn app.main:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_MODEL = "qwen2.5-coder:14b-instruct"
+DEFAULT_REPLY = '{"summary": "Calm afternoon", "items": []}'
+
+
+class FakeOllama:
+    def __init__(self, port: int = 0, latency: float = 0.2, slow_rate: float = 0.0, slow_latency: float = 2.0,
+                 models=(DEFAULT_MODEL,), reply: str = DEFAULT_REPLY, seed=None):
+        self.port = port
+        self.latency = latency
+        self.slow_rate = slow_rate  # Fraction of requests that take slow_latency instead
+        self.slow_latency = slow_latency
+        self.models = list(models)
+        self.reply = reply
+        self.failing = False  # Answer 503 while set
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "FakeOllama":
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]  # Keep the port across stop()/start()
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _delay(self) -> float:
+        with self._lock:
+            slow = self._random.random() < self.slow_rate
+        return self.slow_latency if slow else self.latency
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/api/tags":
+                    return self._send(404, {"error": "not found"})
+                self._send(200, {"models": [{"name": name} for name in fake.models]})
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with fake._lock:
+                    fake.requests += 1
+                if fake.failing:
+                    return self._send(503, {"error": "server busy"})
+                if payload.get("model") not in fake.models:
+                    return self._send(404, {"error": f"model '{payload.get('model')}' not found"})
+                time.sleep(fake._delay())
+                if self.path == "/api/chat":
+                    self._send(200, {"model": payload["model"], "message": {"role": "assistant", "content": fake.reply}, "done": True})
+                elif self.path == "/api/generate":
+                    self._send(200, {"model": payload["model"], "response": fake.reply, "done": True})
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    parser.add_argument("--model", action="append", help="Model to serve (repeatable)")
+    args = parser.parse_args()
+
+    fake = FakeOllama(args.port, args.latency, args.slow_rate, args.slow_latency, args.model or [DEFAULT_MODEL]).start()
+    print(f"Fake Ollama on {fake.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
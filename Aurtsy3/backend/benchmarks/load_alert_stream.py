@@ -0,0 +1,154 @@
+"""
+Load test for GET /alerts/stream/{user_id}: holds thousands of idle SSE
+connections, then publishes alert events through Redis and measures how long
+fan-out takes to reach every client.
+
+Seeds one guardian user per connection into DATABASE_URL and removes them
+afterwards. Start the API separately (raise the fd limit first), e.g.:
+
+    ulimit -n 65536
+    uvicorn app.main:app --workers 4 --port 8000
+    python benchmarks/load_alert_stream.py --url http://localhost:8000 --connections 5000
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlparse
+
+from sqlalchemy import insert
+
+import app.main  # noqa: F401  Registers every model and creates the tables
+from app.core.database import SessionLocal
+from app.domains.alerts.stream import alert_stream_hub
+from app.domains.children import models as child_models
+from app.domains.users import models as user_models
+
+PREFIX = "bench_as_"
+
+def seed(db, count: int):
+    user_ids = [f"{PREFIX}u{i:06d}" for i in range(count)]
+    child_ids = [f"{PREFIX}c{i:06d}" for i in range(count)]
+    db.execute(insert(user_models.User), [
+        {"id": uid, "email": f"{uid}@example.com", "role": user_models.RoleEnum.CAREGIVER} for uid in user_ids
+    ])
+    db.execute(insert(child_models.Child), [{"id": cid, "name": cid} for cid in child_ids])
+    db.execute(insert(child_models.ChildGuardian), [
+        {"user_id": uid, "child_id": cid} for uid, cid in zip(user_ids, child_ids)
+    ])
+    db.commit()
+    return user_ids, child_ids
+
+def cleanup(db):
+    db.query(child_models.ChildGuardian).filter(child_models.ChildGuardian.user_id.like(f"{PREFIX}%")).delete(synchronize_session=False)
+    db.query(child_models.Child).filter(child_models.Child.id.like(f"{PREFIX}%")).delete(synchronize_session=False)
+    db.query(user_models.User).filter(user_models.User.id.like(f"{PREFIX}%")).delete(synchronize_session=False)
+    db.commit()
+
+class Client:
+    def __init__(self, host: str, port: int, user_id: str):
+        self.host, self.port, self.user_id = host, port, user_id
+        self.latencies = []
+        self.ready = asyncio.Event()
+
+    async def run(self, stop: asyncio.Event):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write(
+            f"GET /alerts/stream/{self.user_id} HTTP/1.1\r\nHost: {self.host}\r\nAccept: text/event-stream\r\n\r\n".encode()
+        )
+        await writer.drain()
+        read_line = asyncio.ensure_future(reader.readline())
+        stopped = asyncio.ensure_future(stop.wait())
+        try:
+            while True:
+                done, _ = await asyncio.wait({read_line, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                if stopped in done:
+                    return
+                line = read_line.result()
+                if not line:
+                    return
+                if line.startswith(b"event: ready"):
+                    self.ready.set()
+                elif line.startswith(b"data: ") and b"sent_at" in line:
+                    # Chunked framing may prefix the data line; the JSON is everything after "data: "
+                    payload = json.loads(line.split(b"data: ", 1)[1])
+                    self.latencies.append(time.time() - payload["sent_at"])
+                read_line = asyncio.ensure_future(reader.readline())
+        finally:
+            read_line.cancel()
+            stopped.cancel()
+            writer.close()
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+async def run_load(args, user_ids, child_ids):
+    url = urlparse(args.url)
+    stop = asyncio.Event()
+    clients = [Client(url.hostname, url.port or 80, uid) for uid in user_ids]
+    tasks = []
+
+    start = time.perf_counter()
+    for i in range(0, len(clients), args.ramp):
+        tasks.extend(asyncio.ensure_future(c.run(stop)) for c in clients[i:i + args.ramp])
+        await asyncio.sleep(0.05)
+    try:
+        await asyncio.wait_for(asyncio.gather(*(c.ready.wait() for c in clients)), timeout=args.connect_timeout)
+    except asyncio.TimeoutError:
+        pass
+    connected = sum(1 for c in clients if c.ready.is_set())
+    print(f"connected {connected}/{len(clients)} streams in {time.perf_counter() - start:.1f}s")
+
+    print(f"idling {args.idle}s...")
+    await asyncio.sleep(args.idle)
+
+    for round_no in range(args.rounds):
+        events = [{
+            "event": "alert_created",
+            "child_id": cid,
+            "alert": {"id": -1, "child_id": cid, "title": "load test", "sent_at": time.time()}
+        } for cid in child_ids]
+        publish_start = time.perf_counter()
+        await asyncio.to_thread(alert_stream_hub.publish, events)
+        print(f"round {round_no + 1}: published {len(events)} events in {time.perf_counter() - publish_start:.2f}s")
+        await asyncio.sleep(args.settle)
+
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies = [l for c in clients for l in c.latencies]
+    expected = connected * args.rounds
+    print(f"delivered {len(latencies)}/{expected} events")
+    print(
+        f"delivery latency p50 {percentile(latencies, 0.5) * 1000:.1f}ms  "
+        f"p95 {percentile(latencies, 0.95) * 1000:.1f}ms  p99 {percentile(latencies, 0.99) * 1000:.1f}ms  "
+        f"max {max(latencies, default=float('nan')) * 1000:.1f}ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--ramp", type=int, default=250, help="Connections opened per 50ms step")
+    parser.add_argument("--idle", type=float, default=30.0, help="Seconds to hold connections idle before publishing")
+    parser.add_argument("--rounds", type=int, default=3, help="Alert events published per child")
+    parser.add_argument("--settle", type=float, default=3.0, help="Seconds to wait for delivery after each round")
+    parser.add_argument("--connect-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    cleanup(db)
+    user_ids, child_ids = seed(db, args.connections)
+    try:
+        asyncio.run(run_load(args, user_ids, child_ids))
+    finally:
+        cleanup(db)
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, inspect
 from datetime import datetime, timedelta
 import models, schemas
 
@@ -161,6 +161,10 @@ def delete_hydration_log(db: Session, hydration_id: int):
         db.commit()
     return db_hydration
 
+def _row_dict(row):
+    # Column values only: __dict__ also carries _sa_instance_state and lazy relationships
+    return {attr.key: getattr(row, attr.key) for attr in inspect(row).mapper.column_attrs}
+
 def get_activity_feed(db: Session, child_id: str):
     """Aggregate all logs for a child into a dict matching ActivityFeed schema."""
     sleep_logs = db.query(models.SleepLog).filter(models.SleepLog.child_id == child_id).order_by(models.SleepLog.created_at.desc()).all()
@@ -170,9 +174,9 @@ def get_activity_feed(db: Session, child_id: str):
     activities = db.query(models.Activity).filter(models.Activity.child_id == child_id).order_by(models.Activity.created_at.desc()).all()
     return {
         "child_id": child_id,
-        "sleep_logs": [s.__dict__ for s in sleep_logs],
-        "behavior_logs": [b.__dict__ for b in behavior_logs],
-        "hydration_logs": [h.__dict__ for h in hydration_logs],
-        "location_checks": [l.__dict__ for l in location_checks],
-        "activities": [a.__dict__ for a in activities],
+        "sleep_logs": [_row_dict(s) for s in sleep_logs],
+        "behavior_logs": [_row_dict(b) for b in behavior_logs],
+        "hydration_logs": [_row_dict(h) for h in hydration_logs],
+        "location_checks": [_row_dict(l) for l in location_checks],
+        "activities": [_row_dict(a) for a in activities],
     }
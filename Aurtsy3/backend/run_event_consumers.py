@@ -0,0 +1,21 @@
+"""
+Dedicated event consumer process for the Redis Streams event bus.
+Run alongside the API when it is started with EVENT_BUS_CONSUMERS=0:
+
+    EVENT_BUS_BACKEND=redis python run_event_consumers.py
+"""
+import signal
+import threading
+
+import app.main  # noqa: F401  Registers models and event subscribers
+from app.core.events import event_bus
+
+if __name__ == "__main__":
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+
+    event_bus.start()
+    print("Event consumers running")
+    stopped.wait()
+    event_bus.stop()
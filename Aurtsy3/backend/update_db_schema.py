@@ -2,9 +2,11 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import text
 from app.core.database import engine, Base
 from app.domains.behavior.models import BehaviorLog
 from app.domains.children.models import Child # Required for ForeignKey resolution
+from app.domains.sync.models import SyncCheckpoint
 
 def reset_behavior_table():
     print("Dropping behavior_logs table...")
@@ -13,5 +15,93 @@ def reset_behavior_table():
     BehaviorLog.__table__.create(engine)
     print("Done!")
 
+def upgrade_alerts_table():
+    """
+    Add alert fingerprint columns in place, fold existing duplicate live alerts
+    into one row per fingerprint, then add the unique index. Safe to rerun.
+    """
+    statements = [
+        "ALTER TABLE alerts ADD COLUMN IF NOT EXISTS rule_key VARCHAR(100)",
+        "ALTER TABLE alerts ADD COLUMN IF NOT EXISTS occurrence_count INTEGER NOT NULL DEFAULT 1",
+        "ALTER TABLE alerts ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+        # Same derivation as alerts.service.rule_key_for
+        """
+        UPDATE alerts SET
+            rule_key = COALESCE(pattern_data->>'rule', trim(both '_' from regexp_replace(lower(title), '[^a-z0-9]+', '_', 'g'))),
+            last_seen_at = created_at
+        WHERE rule_key IS NULL
+        """,
+        """
+        WITH ranked AS (
+            SELECT id,
+                   row_number() OVER w AS rn,
+                   count(*) OVER (PARTITION BY child_id, alert_type, rule_key) AS n,
+                   min(created_at) OVER (PARTITION BY child_id, alert_type, rule_key) AS first_seen
+            FROM alerts
+            WHERE NOT is_acknowledged
+            WINDOW w AS (PARTITION BY child_id, alert_type, rule_key ORDER BY created_at DESC, id DESC)
+        ), keep AS (
+            UPDATE alerts a SET occurrence_count = r.n, created_at = r.first_seen
+            FROM ranked r WHERE a.id = r.id AND r.rn = 1 AND r.n > 1
+        )
+        DELETE FROM alerts a USING ranked r WHERE a.id = r.id AND r.rn > 1
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_alerts_live_fingerprint ON alerts (child_id, alert_type, rule_key) WHERE NOT is_acknowledged",
+        "DROP INDEX IF EXISTS ix_alerts_child_created",
+        "CREATE INDEX IF NOT EXISTS ix_alerts_child_live_seen ON alerts (child_id, last_seen_at, id) WHERE NOT is_acknowledged",
+    ]
+    print("Upgrading alerts table...")
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+    print("Done!")
+
+SYNCED_TABLES = (
+    "meals", "behavior_logs", "sleep_logs", "hydration_logs",
+    "activities", "location_checks", "entities", "alerts",
+)
+
+def upgrade_sync_columns():
+    """
+    Add the delta sync change_xid column and (child_id, change_xid) index to
+    every synced table and to sync_tombstones. Existing rows are stamped with
+    this transaction, so clients resync them once. Safe to rerun.
+    """
+    xid = "pg_current_xact_id()::text::bigint"  # app.core.database.CURRENT_XID
+    print("Adding change_xid to synced tables...")
+    with engine.begin() as conn:
+        for table in SYNCED_TABLES + ("sync_tombstones",):
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS change_xid BIGINT"))
+            conn.execute(text(f"UPDATE {table} SET change_xid = {xid} WHERE change_xid IS NULL"))
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN change_xid SET DEFAULT {xid}"))
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN change_xid SET NOT NULL"))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_child_xid ON {table} (child_id, change_xid)"))
+            conn.execute(text(f"DROP INDEX IF EXISTS ix_{table}_child_updated"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sync_tombstones_deleted ON sync_tombstones (deleted_at)"))
+        conn.execute(text("DROP INDEX IF EXISTS ix_sync_tombstones_child_deleted"))
+    Base.metadata.create_all(bind=engine, tables=[SyncCheckpoint.__table__])
+    print("Done!")
+
+def upgrade_chat_tables():
+    """Add the chat history keyset index and the rolling summary columns. Safe to rerun."""
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_chat_messages_session_created ON chat_messages (session_id, created_at, id)",
+        "ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS summary TEXT",
+        "ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS summarized_through_id INTEGER",
+    ]
+    print("Upgrading chat tables...")
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+    print("Done!")
+
+COMMANDS = {
+    "reset-behavior": reset_behavior_table,
+    "alerts": upgrade_alerts_table,
+    "sync": upgrade_sync_columns,
+    "chat": upgrade_chat_tables,
+}
+
 if __name__ == "__main__":
-    reset_behavior_table()
+    # Default kept for existing deploy scripts
+    COMMANDS[sys.argv[1] if len(sys.argv) > 1 else "reset-behavior"]()